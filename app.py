@@ -7,6 +7,9 @@ from views.pedido_historico_view import PedidoHistoricoView
 from views.pedido_form_view import PedidoFormView, CacheManager
 from views.configuracoes_view import ConfiguracoesView
 from views.pedido_dashboard_gerencial import mostrar_dashboard_gerencial
+from utils.instrumentacao import iniciar_log_periodico, registrar_rerun
+from utils.perfil_rerun import iniciar_rerun, finalizar_rerun, secao, marco, mostrar_perfil_sidebar
+import time
 from pathlib import Path
 
 # Caminho do arquivo local correto (usando Path para garantir o caminho correto..)
@@ -161,7 +164,13 @@ def estilizar_sidebar():    st.sidebar.markdown("""
     """, unsafe_allow_html=True)
 
 def main():
+    inicio_rerun = time.perf_counter()
+    # Modo perfil (PEDIDOS_PERFIL=1 ou ?perfil=1): tempo por seção e perfil dos reruns mais lentos
+    perfil = iniciar_rerun(st.session_state.get('menu_atual', ''))
     try:
+        # Log periódico das métricas (PEDIDOS_METRICAS=1 e PEDIDOS_METRICAS_LOG=<segundos>)
+        iniciar_log_periodico()
+
         # Estilizar sidebar
         estilizar_sidebar()
         
@@ -233,15 +242,20 @@ def main():
         pedido_form_view = PedidoFormView(pedido_controller)
         historico_view = PedidoHistoricoView(pedido_controller)
         configuracoes_view = ConfiguracoesView(pedido_controller)
+        marco("inicializacao")
+        mostrar_perfil_sidebar()
         # Mostrar interface baseado na seleção do menu
         # if "Novo Pedido" in st.session_state.menu_atual:
         #     pedido_form_view.mostrar_interface()
         if "Histórico" in st.session_state.menu_atual:
             st.markdown("## Resumo Pedidos")
-            mostrar_dashboard_gerencial(pedido_controller)
-            historico_view.mostrar_interface()
+            with secao("dashboard_gerencial"):
+                mostrar_dashboard_gerencial(pedido_controller)
+            with secao("historico"):
+                historico_view.mostrar_interface()
         else:
-            configuracoes_view.mostrar_interface()
+            with secao("configuracoes"):
+                configuracoes_view.mostrar_interface()
         
     except Exception as e:
         # Mensagem de erro clara para planilha de mapeamento e Google Sheets
@@ -250,6 +264,9 @@ def main():
         Verifique se o arquivo local existe: {PLANILHA_LOCAL}
         Detalhes: {str(e)}
         """)
+    finally:
+        registrar_rerun(time.perf_counter() - inicio_rerun, st.session_state.get('menu_atual', ''))
+        finalizar_rerun(perfil)
 
 if __name__ == "__main__":
     main()
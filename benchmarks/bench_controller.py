@@ -0,0 +1,154 @@
+"""
+Benchmark dos caminhos críticos do PedidoController com históricos realistas.
+
+Para cada tamanho de histórico (pedidos.xlsx sintético) mede salvar_pedido,
+buscar_pedidos, atualizar_status_pedido, get_pedido_detalhes,
+_verificar_serial_mesmo_lote, carregar_local_paco e os geradores de PDF de
+etiquetas, e grava o resultado em benchmarks/resultados/controller_<data>.json.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_controller                       # 1k, 10k e 100k pedidos (lento)
+    python -m benchmarks.bench_controller --tamanhos 1000 10000 --repeticoes 5
+    python -m benchmarks.bench_controller --comparar benchmarks/resultados/controller_<data>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.dados_sinteticos import preparar_ambiente
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+
+def _medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(i)
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        'min': min(tempos),
+        'mediana': statistics.median(tempos),
+        'media': statistics.mean(tempos),
+        'repeticoes': repeticoes
+    }
+
+
+def _geradores_pdf():
+    """Geradores de etiqueta da tela de histórico (não usam o estado da view)"""
+    from views.pedido_historico_view import PedidoHistoricoView
+    return {
+        'etiquetas_pdf': lambda pedidos, df: PedidoHistoricoView._gerar_packlist_pdf(None, pedidos),
+        'pdf_visual_pedidos': lambda pedidos, df: PedidoHistoricoView._gerar_pdf_visual_pedidos(None, df)
+    }
+
+
+def executar_tamanho(diretorio: str, n_pedidos: int, n_paco: int, repeticoes: int, n_etiquetas: int) -> dict:
+    print(f"\nPreparando {n_pedidos} pedidos ({n_paco} itens no paco)...")
+    inicio = time.perf_counter()
+    controller = preparar_ambiente(diretorio, n_paco, n_pedidos, reservados=repeticoes)
+    print(f"  dados gerados em {time.perf_counter() - inicio:.1f}s")
+
+    indice = controller._indice_paco()
+    itens = list(indice.values())
+    numero_existente = f"REQ-{max(n_pedidos // 2, 1):03d}"
+    item_existente = itens[0]
+    status = ['PROCESSO', 'PENDENTE']
+
+    def salvar(i):
+        # Seriais reservados (sem pedido no histórico): um pedido recusado invalidaria a medição
+        item = itens[-(i + 1)]
+        controller.salvar_pedido({**item, 'solicitante': 'Benchmark', 'observacoes': '', 'urgente': 'Não'})
+
+    operacoes = {
+        'carregar_local_paco': lambda i: controller.carregar_local_paco(),
+        'buscar_pedidos': lambda i: controller.buscar_pedidos(),
+        'buscar_pedidos_status': lambda i: controller.buscar_pedidos(status='PENDENTE'),
+        'get_pedido_detalhes': lambda i: controller.get_pedido_detalhes(numero_existente),
+        '_verificar_serial_mesmo_lote': lambda i: controller._verificar_serial_mesmo_lote(
+            item_existente['serial'], item_existente['maquina'], item_existente['posto'], item_existente['coordenada']
+        ),
+        'atualizar_status_pedido': lambda i: controller.atualizar_status_pedido(
+            numero_existente, status[i % 2], 'Benchmark'
+        ),
+        'salvar_pedido': salvar,
+    }
+
+    df_etiquetas = controller.buscar_pedidos().head(n_etiquetas)
+    pedidos = df_etiquetas.astype(str).to_dict('records')
+    for nome, gerador in _geradores_pdf().items():
+        operacoes[f"{nome}_{n_etiquetas}"] = lambda i, g=gerador: g(pedidos, df_etiquetas)
+
+    resultados = {}
+    for nome, funcao in operacoes.items():
+        resultados[nome] = _medir(funcao, repeticoes)
+        print(f"  {nome:<32} mediana {resultados[nome]['mediana'] * 1000:10.1f} ms"
+              f"  (min {resultados[nome]['min'] * 1000:.1f} ms)")
+    return resultados
+
+
+def _versao_git() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def comparar(anterior: dict, atual: dict):
+    print(f"\nComparação com {anterior.get('versao') or anterior.get('data')} (mediana, atual/anterior):")
+    for tamanho, operacoes in atual['resultados'].items():
+        base = anterior.get('resultados', {}).get(tamanho, {})
+        for nome, medida in operacoes.items():
+            if nome in base and base[nome]['mediana'] > 0:
+                razao = medida['mediana'] / base[nome]['mediana']
+                alerta = "  <-- regressão" if razao > 1.2 else ""
+                print(f"  {tamanho:>7} {nome:<32} {razao:6.2f}x{alerta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Quantidades de pedidos no histórico")
+    parser.add_argument("--paco", type=int, default=5000, help="Itens na aba Paco")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções de cada operação")
+    parser.add_argument("--etiquetas", type=int, default=100, help="Pedidos por PDF de etiquetas")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de saída")
+    parser.add_argument("--comparar", default=None, help="Resultado anterior (JSON) para comparação")
+    args = parser.parse_args()
+
+    agora = datetime.now()
+    relatorio = {
+        'data': agora.isoformat(timespec='seconds'),
+        'versao': _versao_git(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {'paco': args.paco, 'repeticoes': args.repeticoes, 'etiquetas': args.etiquetas},
+        'resultados': {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.tamanhos:
+            relatorio['resultados'][str(n)] = executar_tamanho(
+                os.path.join(tmp, str(n)), n, args.paco, args.repeticoes, args.etiquetas
+            )
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"controller_{agora.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(json.load(f), relatorio)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark da criação de pedidos em lote ("Sincronizar Pedidos (Lote)").
+
+Compara salvar_pedido chamado serial a serial com salvar_pedidos_lote.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_lote --codigos 500 --historico 1000
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.dados_sinteticos import preparar_ambiente
+
+
+def _seriais(n: int):
+    return [f"SER{i:07d}" for i in range(n)]
+
+
+def medir_sequencial(diretorio: str, n_codigos: int, n_historico: int, n_paco: int) -> float:
+    controller = preparar_ambiente(diretorio, n_paco, n_historico)
+    indice = controller._indice_paco()
+    inicio = time.perf_counter()
+    for serial in _seriais(n_codigos):
+        pedido_info = {
+            **indice[serial.upper()],
+            "solicitante": "Sistema Automático",
+            "observacoes": "",
+            "urgente": "Não"
+        }
+        try:
+            controller.salvar_pedido(pedido_info)
+        except ValueError:
+            pass
+    return time.perf_counter() - inicio
+
+
+def medir_lote(diretorio: str, n_codigos: int, n_historico: int, n_paco: int) -> float:
+    controller = preparar_ambiente(diretorio, n_paco, n_historico)
+    inicio = time.perf_counter()
+    controller.salvar_pedidos_lote(_seriais(n_codigos))
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codigos", type=int, default=500, help="Quantidade de códigos no lote")
+    parser.add_argument("--historico", type=int, default=1000, help="Pedidos já existentes no pedidos.xlsx")
+    parser.add_argument("--sequencial", type=int, default=50,
+                        help="Códigos para o caminho serial a serial (0 para pular; é lento)")
+    args = parser.parse_args()
+    n_paco = max(args.codigos, args.sequencial) * 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t_lote = medir_lote(f"{tmp}/lote", args.codigos, args.historico, n_paco)
+        print(f"salvar_pedidos_lote: {args.codigos} códigos em {t_lote:.2f}s "
+              f"({t_lote / args.codigos * 1000:.1f} ms/código)")
+
+        if args.sequencial:
+            t_seq = medir_sequencial(f"{tmp}/seq", args.sequencial, args.historico, n_paco)
+            por_codigo = t_seq / args.sequencial
+            print(f"salvar_pedido (serial a serial): {args.sequencial} códigos em {t_seq:.2f}s "
+                  f"({por_codigo * 1000:.1f} ms/código, ~{por_codigo * args.codigos:.0f}s estimados "
+                  f"para {args.codigos})")
+
+
+if __name__ == "__main__":
+    main()
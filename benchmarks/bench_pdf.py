@@ -0,0 +1,68 @@
+"""
+Benchmark da geração em paralelo dos PDFs de etiquetas e do relatório de pedidos.
+
+Gera o mesmo lote com 1, 2, 4... processos (utils/pdf_paralelo.py), mostra o
+tempo de cada um e confere que o PDF é idêntico byte a byte em todos.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_pdf --etiquetas 5000 --processos 1 2 4 8
+    python -m benchmarks.bench_pdf --etiquetas 5000 --bloco 250
+"""
+import argparse
+import hashlib
+import os
+import time
+
+from utils.pdf_pedidos import gerar_packlist_pdf, gerar_relatorio_pedidos_pdf
+
+
+def _pedidos(n: int):
+    return [{
+        'Numero_Pedido': f"REQ-{i:06d}",
+        'Data': "19/10/2026 08:30",
+        'Maquina': f"MAQ-{i % 40:02d}",
+        'Coordenada': f"C{i % 12}",
+        'Posto': f"P{i % 7}",
+        'Pagoda': f"PG{i % 30}",
+        'Semiacabado': f"SEMI{i % 500:04d}",
+        'Serial': f"SER{i:07d}",
+        'Modelo': "MODELO-X",
+        'Status': "PENDENTE",
+    } for i in range(n)]
+
+
+def _medir(nome: str, gerar, itens: list, lista_processos) -> None:
+    referencia = None
+    for processos in lista_processos:
+        inicio = time.perf_counter()
+        pdf = gerar(itens, processos=processos)
+        tempo = time.perf_counter() - inicio
+        assinatura = hashlib.sha256(pdf).hexdigest()
+        referencia = referencia or assinatura
+        print(f"{nome}: {len(itens)} itens, {processos} processo(s) em {tempo:.2f}s "
+              f"({len(pdf) / 1024:.0f} KB, sha256 {assinatura[:12]})")
+        if assinatura != referencia:
+            print(f"  ATENÇÃO: PDF diferente do gerado com {lista_processos[0]} processo(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--etiquetas", type=int, default=5000, help="Quantidade de etiquetas no lote")
+    parser.add_argument("--relatorio", type=int, default=2000, help="Pedidos no relatório (0 para pular)")
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4], help="Quantidades de processos")
+    parser.add_argument("--bloco", type=int, help="Itens por bloco (padrão: PEDIDOS_PDF_BLOCO ou 500)")
+    args = parser.parse_args()
+    if args.bloco:
+        # Lido na importação de utils.pdf_paralelo (também pelos processos filhos)
+        os.environ["PEDIDOS_PDF_BLOCO"] = str(args.bloco)
+        import utils.pdf_paralelo
+        utils.pdf_paralelo.TAMANHO_BLOCO = args.bloco
+
+    print(f"Núcleos na máquina: {os.cpu_count()}")
+    _medir("etiquetas", gerar_packlist_pdf, _pedidos(args.etiquetas), args.processos)
+    if args.relatorio:
+        _medir("relatório", gerar_relatorio_pedidos_pdf, _pedidos(args.relatorio), args.processos)
+
+
+if __name__ == "__main__":
+    main()
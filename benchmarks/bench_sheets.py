@@ -0,0 +1,114 @@
+"""
+Benchmark do tráfego com o Google Sheets usando o gspread em memória (utils/fake_gspread.py).
+
+Mede quantas requisições e quanto tempo custam salvar_pedido_completo (pedido a pedido
+e em lote), registrar_leitura_barcode e atualizar_status_pedido_sheets, e quantas
+operações falham com 429 sob a cota de escrita por minuto.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_sheets --pedidos 50 --latencia 0.05
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_paco, gerar_pedidos
+from utils.fake_gspread import FakeGspreadClient
+from utils.sheets_pedidos_sync import SheetsPedidosSync
+
+URL = "https://docs.google.com/spreadsheets/d/benchmark"
+
+
+def preparar_sync(n_paco: int, n_historico: int, **opcoes_cliente):
+    """Cria o cliente falso com as abas paco e Pedidos preenchidas e um SheetsPedidosSync apontando para ele"""
+    cliente = FakeGspreadClient(**opcoes_cliente)
+    planilha = cliente.criar_planilha(URL)
+    df_paco = gerar_paco(n_paco)
+    planilha.carregar_aba("paco", [df_paco.columns.tolist()] + df_paco.values.tolist())
+    df_historico = gerar_pedidos(n_historico, df_paco).reindex(columns=SheetsPedidosSync.PEDIDOS_PADRAO).fillna("")
+    planilha.carregar_aba("Pedidos", [SheetsPedidosSync.PEDIDOS_PADRAO] + df_historico.values.tolist())
+    planilha.carregar_aba("Itens", [["Numero_Pedido", "Serial", "Quantidade"]])
+
+    sync = SheetsPedidosSync(enable_sheets=False)
+    sync.client = cliente
+    sync.SPREADSHEET_URL = URL
+    return sync, cliente, df_paco
+
+
+def _novos_pedidos(df_paco: pd.DataFrame, inicio: int, n: int):
+    df = gerar_pedidos(n, df_paco, semente=inicio)
+    df["Numero_Pedido"] = [f"REQ-{inicio + i:03d}" for i in range(n)]
+    df["Chave_Idempotencia"] = [f"bench-{inicio + i}" for i in range(n)]
+    df_itens = pd.DataFrame({"Numero_Pedido": df["Numero_Pedido"], "Serial": df["Serial"], "Quantidade": 1})
+    return df, df_itens
+
+
+def _medir(nome: str, cliente: FakeGspreadClient, operacoes: int, funcao):
+    cliente.zerar_contadores()
+    inicio = time.perf_counter()
+    falhas = funcao()
+    duracao = time.perf_counter() - inicio
+    resumo = cliente.resumo()
+    print(f"\n{nome}")
+    print(f"  {operacoes} operação(ões) em {duracao:.2f}s | requisições: {resumo['total']} "
+          f"({resumo['total'] / max(operacoes, 1):.1f}/operação; {resumo['leituras']} leitura, "
+          f"{resumo['escritas']} escrita) | 429: {resumo['erros_429']} | falhas: {falhas}")
+    print("  " + ", ".join(f"{k}={v}" for k, v in sorted(resumo['chamadas'].items())))
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pedidos", type=int, default=50, help="Operações por cenário")
+    parser.add_argument("--historico", type=int, default=1000, help="Pedidos já existentes na aba Pedidos")
+    parser.add_argument("--paco", type=int, default=2000, help="Itens na aba paco")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência simulada por requisição (s)")
+    parser.add_argument("--escritas-por-minuto", type=int, default=60, help="Cota de escrita do cenário de cota")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Probabilidade de 429 injetado por requisição")
+    args = parser.parse_args()
+    n = args.pedidos
+    opcoes = dict(latencia=args.latencia, taxa_429=args.taxa_429, semente=1)
+
+    sync, cliente, df_paco = preparar_sync(args.paco, args.historico, **opcoes)
+    proximo = args.historico + 1
+
+    def um_a_um():
+        falhas = 0
+        for i in range(n):
+            df, df_itens = _novos_pedidos(df_paco, proximo + i, 1)
+            falhas += not sync.salvar_pedido_completo(df, df_itens)[0]
+        return falhas
+    _medir("salvar_pedido_completo (um pedido por chamada)", cliente, n, um_a_um)
+
+    def em_lote():
+        df, df_itens = _novos_pedidos(df_paco, proximo + n, n)
+        return int(not sync.salvar_pedido_completo(df, df_itens)[0])
+    _medir("salvar_pedido_completo (lote único)", cliente, n, em_lote)
+
+    def reenvio():
+        df, df_itens = _novos_pedidos(df_paco, proximo + n, n)
+        return int(not sync.salvar_pedido_completo(df, df_itens)[0])
+    _medir("salvar_pedido_completo (reenvio do lote, idempotente)", cliente, n, reenvio)
+
+    def leituras():
+        return sum(not sync.registrar_leitura_barcode(f"SER{i:07d}")[0] for i in range(n))
+    _medir("registrar_leitura_barcode", cliente, n, leituras)
+
+    def status():
+        agora = time.strftime('%d/%m/%Y %H:%M')
+        return sum(
+            not sync.atualizar_status_pedido_sheets(f"REQ-{i + 1:03d}", "PROCESSO", agora, "Benchmark")[0]
+            for i in range(n)
+        )
+    _medir("atualizar_status_pedido_sheets", cliente, n, status)
+
+    # Cota: pedidos enviados um a um contra a cota de escrita por minuto
+    opcoes_cota = dict(opcoes, escritas_por_minuto=args.escritas_por_minuto)
+    sync, cliente, df_paco = preparar_sync(args.paco, args.historico, **opcoes_cota)
+    _medir(f"salvar_pedido_completo um a um com cota de {args.escritas_por_minuto} escritas/min",
+           cliente, n, um_a_um)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Geração de dados sintéticos para os benchmarks (planilha paco e pedidos.xlsx).
+
+Os arquivos são criados em um diretório temporário, sem tocar na pasta 'pedidos' do projeto.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from controllers.pedido_controller import PedidoController, COLUNAS_PEDIDOS
+
+MAQUINAS = [f"MAQ-{i:02d}" for i in range(1, 21)]
+STATUS = ['PENDENTE', 'PROCESSO', 'CONCLUÍDO']
+
+
+def gerar_paco(n_itens: int, semente: int = 42) -> pd.DataFrame:
+    """Gera a aba 'Paco' com n_itens seriais únicos"""
+    rnd = random.Random(semente)
+    linhas = []
+    for i in range(n_itens):
+        linhas.append({
+            'Serial': f"SER{i:07d}",
+            'Maquina': rnd.choice(MAQUINAS),
+            'Posto': f"P{rnd.randint(1, 12):02d}",
+            'Coordenada': f"{rnd.choice('ABCDEFGH')}{rnd.randint(1, 30)}",
+            'Modelo': f"MOD-{rnd.randint(100, 999)}",
+            'OT': f"OT{rnd.randint(10000, 99999)}",
+            'Semiacabado': f"SEMI-{rnd.randint(1000, 9999)}",
+            'Pagoda': f"PG-{rnd.randint(1, 99):02d}"
+        })
+    return pd.DataFrame(linhas)
+
+
+def gerar_pedidos(n_pedidos: int, df_paco: pd.DataFrame, semente: int = 42) -> pd.DataFrame:
+    """Gera um histórico de n_pedidos distribuídos nos últimos 30 dias"""
+    rnd = random.Random(semente)
+    inicio = datetime.now() - timedelta(days=30)
+    passo = timedelta(days=30) / max(n_pedidos, 1)
+    itens = df_paco.to_dict('records')
+    linhas = []
+    for i in range(n_pedidos):
+        item = itens[rnd.randrange(len(itens))]
+        data = (inicio + passo * i).strftime("%Y-%m-%d %H:%M:%S")
+        linhas.append({
+            "Numero_Pedido": f"REQ-{i + 1:03d}",
+            "Data": data,
+            "Serial": item['Serial'],
+            "Maquina": item['Maquina'],
+            "Posto": item['Posto'],
+            "Coordenada": item['Coordenada'],
+            "Modelo": item['Modelo'],
+            "OT": item['OT'],
+            "Semiacabado": item['Semiacabado'],
+            "Pagoda": item['Pagoda'],
+            "Solicitante": "Benchmark",
+            "Observacoes": "",
+            "Urgente": "Não",
+            "Status": rnd.choice(STATUS),
+            "Ultima_Atualizacao": data,
+            "Responsavel_Atualizacao": "Benchmark"
+        })
+    return pd.DataFrame(linhas, columns=COLUNAS_PEDIDOS)
+
+
+def preparar_ambiente(diretorio: str, n_itens_paco: int, n_pedidos: int,
+                      reservados: int = 0) -> PedidoController:
+    """
+    Cria a planilha de paco e o pedidos.xlsx sintéticos em 'diretorio' e
+    retorna um PedidoController (sem Google Sheets) apontando para eles.
+    Os últimos 'reservados' itens do paco ficam fora do histórico (sem pedido),
+    para medir a criação de pedidos sem cair na validação de duplicidade.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    df_paco = gerar_paco(n_itens_paco)
+    caminho_planilha = os.path.join(diretorio, 'paco.xlsx')
+    df_paco.to_excel(caminho_planilha, sheet_name='Paco', index=False)
+
+    diretorio_pedidos = os.path.join(diretorio, 'pedidos')
+    os.makedirs(diretorio_pedidos, exist_ok=True)
+    if n_pedidos:
+        gerar_pedidos(n_pedidos, df_paco.iloc[:len(df_paco) - reservados]).to_excel(
+            os.path.join(diretorio_pedidos, 'pedidos.xlsx'), index=False
+        )
+    return PedidoController(caminho_planilha, enable_sheets=False, diretorio_pedidos=diretorio_pedidos,
+                            usar_servico=False)
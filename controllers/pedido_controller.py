@@ -1,22 +1,49 @@
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, time as dt_time
 from models.pedido import Pedido
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import streamlit as st
 import os
-import shutil
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.backup_pedidos import BackupPedidos
 import webbrowser
 import pathlib
 import base64
+import uuid
+import tempfile
+import threading
+import contextlib
+import hashlib
+import json
+from collections import OrderedDict
+from utils.file_lock import FileLock, FileLockTimeout
+from utils.cliente_servico import obter_cliente_servico
+from utils.instrumentacao import cronometrado, registrar_cache
+from utils.indice_pedidos import IndicePedidos
+from utils.contadores_pedidos import ContadoresPedidos, aplicar_alteracoes, calcular_contadores
+
+# Colunas do arquivo local de pedidos (pedidos.xlsx)
+COLUNAS_PEDIDOS = [
+    "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada",
+    "Modelo", "OT", "Semiacabado", "Pagoda", "Solicitante", "Observacoes",
+    "Urgente", "Status", "Ultima_Atualizacao", "Responsavel_Atualizacao",
+    "Chave_Idempotencia"
+]
+
+# Colunas pelas quais o histórico paginado pode ser ordenado
+COLUNAS_ORDENACAO = ["Data", "Numero_Pedido", "Status", "Maquina", "Semiacabado"]
 
 class PedidoController:
-    def __init__(self, caminho_planilha: str, enable_sheets: bool = False):
+    def __init__(self, caminho_planilha: str, enable_sheets: bool = False, diretorio_pedidos: Optional[str] = None,
+                 usar_servico: bool = True):
         """
         Inicializa o controlador com o caminho da planilha de localizações
         Args:
             caminho_planilha: Caminho da planilha que contém as localizações (definido no .env)
             enable_sheets: Se True, inicializa o SheetsPedidosSync
+            diretorio_pedidos: Diretório do arquivo de pedidos e backups (padrão: pasta 'pedidos' do projeto)
+            usar_servico: Se True e PEDIDOS_SERVICE_URL estiver definida, criação, atualização e consulta
+                de pedidos são feitas pelo serviço local de pedidos (servico_pedidos.py)
         """
         # Normalizar o caminho da planilha
         self.caminho_planilha = os.path.abspath(caminho_planilha)
@@ -24,13 +51,21 @@ class PedidoController:
         
         # Definir caminho do arquivo de pedidos
         self.diretorio_base = os.path.dirname(os.path.abspath(__file__))
-        self.diretorio_pedidos = os.path.join(os.path.dirname(self.diretorio_base), 'pedidos')
+        self.diretorio_pedidos = diretorio_pedidos or os.path.join(os.path.dirname(self.diretorio_base), 'pedidos')
         self.arquivo_pedidos = os.path.join(self.diretorio_pedidos, 'pedidos.xlsx')
         self.diretorio_backup = os.path.join(self.diretorio_pedidos, 'backup')
 
         # Criar diretórios se não existirem
         os.makedirs(self.diretorio_pedidos, exist_ok=True)
         os.makedirs(self.diretorio_backup, exist_ok=True)
+        self.backup = BackupPedidos(self.diretorio_backup)
+        self.contadores = ContadoresPedidos(self.diretorio_pedidos)
+
+        # Serviço local de pedidos (único escritor do pedidos.xlsx e da sincronização com o Sheets)
+        self.servico = obter_cliente_servico() if usar_servico else None
+        # Consultas ao serviço já feitas por este controlador (o app cria um por rerun);
+        # descartadas a cada alteração enviada ao serviço
+        self._consultas_servico = {}
 
         # Inicializar Google Sheets Sync
         self.sheets_sync = None
@@ -120,30 +155,211 @@ class PedidoController:
         self.pedidos = self._carregar_planilha(self.caminho_planilha)
         return self.pedidos
 
-    def _fazer_backup(self):
-        """Faz backup do arquivo antes de modificá-lo"""
+    # Métricas de espera pelo lock do arquivo de pedidos (compartilhadas entre as
+    # instâncias do processo, já que o Streamlit cria um controlador por rerun)
+    TIMEOUT_TRAVA = 30.0
+    _metricas_trava = {'aquisicoes': 0, 'timeouts': 0, 'espera_total': 0.0, 'espera_max': 0.0, 'espera_ultima': 0.0}
+    _metricas_trava_lock = threading.Lock()
+
+    # Comprovantes em PDF já gerados, por hash do conteúdo (também compartilhados entre instâncias)
+    MAX_COMPROVANTES_EM_CACHE = 50
+    _cache_comprovantes = OrderedDict()
+    _cache_comprovantes_lock = threading.Lock()
+
+    # Último pedidos.xlsx lido, por caminho: (assinatura do arquivo, DataFrame como no arquivo,
+    # DataFrame com 'Data' já convertida, índices dos filtros). Compartilhado entre sessões e reruns; qualquer gravação
+    # (deste ou de outro processo) muda a assinatura e força uma nova leitura
+    _snapshots_pedidos = {}
+    _snapshots_pedidos_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _travar_pedidos(self):
+        """
+        Garante um único escritor do arquivo de pedidos (entre processos e sessões).
+        Toda leitura-modificação-gravação do pedidos.xlsx deve ocorrer dentro deste bloco.
+        """
+        trava = FileLock(self.arquivo_pedidos + '.lock', timeout=self.TIMEOUT_TRAVA)
         try:
-            if os.path.exists(self.arquivo_pedidos):
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                backup_path = os.path.join(
-                    self.diretorio_backup, 
-                    f"pedidos_backup_{timestamp}.xlsx"
-                )
-                
-                # Copiar arquivo atual para backup
-                shutil.copy2(self.arquivo_pedidos, backup_path)
-                
-                # Manter apenas os últimos 10 backups
-                backups = sorted([
-                    os.path.join(self.diretorio_backup, f) 
-                    for f in os.listdir(self.diretorio_backup)
-                    if f.endswith('.xlsx')
-                ])
-                while len(backups) > 10:
-                    os.remove(backups.pop(0))
+            trava.acquire()
+        except FileLockTimeout:
+            with self._metricas_trava_lock:
+                self._metricas_trava['timeouts'] += 1
+            raise
+        with self._metricas_trava_lock:
+            metricas = self._metricas_trava
+            metricas['aquisicoes'] += 1
+            metricas['espera_total'] += trava.tempo_espera
+            metricas['espera_max'] = max(metricas['espera_max'], trava.tempo_espera)
+            metricas['espera_ultima'] = trava.tempo_espera
+        try:
+            yield
+        finally:
+            trava.release()
+
+    @classmethod
+    def estatisticas_trava(cls) -> dict:
+        """Tempo de espera pelo lock do arquivo de pedidos (segundos) neste processo"""
+        with cls._metricas_trava_lock:
+            metricas = dict(cls._metricas_trava)
+        metricas['espera_media'] = metricas['espera_total'] / metricas['aquisicoes'] if metricas['aquisicoes'] else 0.0
+        return metricas
+
+    def _assinatura_arquivo_pedidos(self) -> Optional[tuple]:
+        try:
+            info = os.stat(self.arquivo_pedidos)
+        except FileNotFoundError:
+            return None
+        # _escrever_pedidos troca o arquivo inteiro (os.replace), então o inode também muda
+        return info.st_mtime_ns, info.st_size, info.st_ino
+
+    @cronometrado()
+    def _snapshot_pedidos(self) -> tuple:
+        """(DataFrame como no arquivo, DataFrame com 'Data' convertida, IndicePedidos) compartilhados: não alterar"""
+        # Assinatura antes da leitura: se o arquivo mudar no meio, a próxima chamada relê
+        assinatura = self._assinatura_arquivo_pedidos()
+        with self._snapshots_pedidos_lock:
+            snapshot = self._snapshots_pedidos.get(self.arquivo_pedidos)
+            valido = snapshot is not None and snapshot[0] == assinatura
+            registrar_cache("snapshot_pedidos", valido)
+            if not valido:
+                df = pd.read_excel(self.arquivo_pedidos)
+                df_datas = df.copy()
+                if 'Data' in df_datas.columns:
+                    df_datas['Data'] = pd.to_datetime(df_datas['Data'], errors='coerce')
+                snapshot = (assinatura, df, df_datas, IndicePedidos(df_datas))
+                self._snapshots_pedidos[self.arquivo_pedidos] = snapshot
+        return snapshot[1:]
+
+    @cronometrado()
+    def _ler_arquivo_pedidos(self) -> pd.DataFrame:
+        """Lê o arquivo local de pedidos (pedidos.xlsx); cópia do snapshot, pode ser alterada"""
+        return self._snapshot_pedidos()[0].copy()
+
+    @cronometrado()
+    def _escrever_pedidos(self, df: pd.DataFrame, novos: Optional[List[dict]] = None,
+                          transicoes: Optional[List[Tuple[dict, str]]] = None):
+        """
+        Grava o arquivo de pedidos de forma atômica: escreve em um arquivo temporário
+        no mesmo diretório, força a gravação em disco e substitui o original.
+        Um leitor nunca vê o arquivo pela metade.
+
+        novos/transicoes (pedidos criados; linha antes da mudança e novo status) atualizam
+        os contadores do dashboard sem recontar a tabela; sem eles, os contadores são recalculados.
+        """
+        assinatura_anterior = self._assinatura_arquivo_pedidos()
+        fd, temporario = tempfile.mkstemp(prefix='.pedidos_', suffix='.xlsx', dir=self.diretorio_pedidos)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                df.to_excel(f, index=False, engine='openpyxl')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_pedidos)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        self._atualizar_contadores(df, assinatura_anterior, novos, transicoes)
+
+    def _atualizar_contadores(self, df: pd.DataFrame, assinatura_anterior: Optional[tuple],
+                              novos: Optional[List[dict]], transicoes: Optional[List[Tuple[dict, str]]]):
+        """Contadores do dashboard para o arquivo recém-gravado (chamado com a trava dos pedidos)"""
+        try:
+            contadores = None
+            if novos is not None or transicoes is not None:
+                contadores = self.contadores.carregar(assinatura_anterior)
+            if contadores is None:
+                contadores = calcular_contadores(df)
+            else:
+                aplicar_alteracoes(contadores, novos or (), transicoes or ())
+            self.contadores.salvar(contadores, self._assinatura_arquivo_pedidos())
+        except Exception as e:
+            # O dashboard recalcula a partir da tabela quando os contadores não conferem
+            st.warning(f"Não foi possível atualizar os contadores de pedidos: {str(e)}")
+
+    @cronometrado()
+    def contadores_pedidos(self) -> dict:
+        """
+        Totais por status, por máquina e por hora de criação ({'total', 'status', 'maquina', 'hora'}),
+        lidos dos contadores mantidos a cada gravação em vez de percorrer o histórico
+        """
+        if self.servico:
+            try:
+                return self.servico.contadores()
+            except Exception as e:
+                st.error(f"Erro ao buscar contadores de pedidos: {str(e)}")
+                return calcular_contadores(pd.DataFrame())
+        # Com o Google Sheets ativo os pedidos vêm de lá, e os contadores locais não valem
+        if (self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL) \
+                or not os.path.exists(self.arquivo_pedidos):
+            return calcular_contadores(self.buscar_pedidos())
+
+        assinatura = self._assinatura_arquivo_pedidos()
+        contadores = self.contadores.carregar(assinatura)
+        registrar_cache("contadores_pedidos", contadores is not None)
+        if contadores is None:
+            # Arquivo alterado por fora (ou contadores ainda não criados): recalcula uma vez e grava.
+            # A assinatura é anterior à leitura: se uma gravação acontecer no meio, os contadores
+            # ficam marcados como antigos e são recalculados de novo, nunca o contrário
+            contadores = calcular_contadores(self._snapshot_pedidos()[0])
+            try:
+                self.contadores.salvar(contadores, assinatura)
+            except OSError as e:
+                st.warning(f"Não foi possível gravar os contadores de pedidos: {str(e)}")
+        return contadores
+
+    @cronometrado()
+    def _fazer_backup(self, df: Optional[pd.DataFrame] = None):
+        """
+        Garante um snapshot base antes de modificar o arquivo.
+        O snapshot completo só é gravado quando o intervalo configurado já passou;
+        nas demais gravações basta o registro da alteração (_registrar_alteracao).
+        """
+        try:
+            if os.path.exists(self.arquivo_pedidos) and self.backup.precisa_snapshot():
+                if df is None:
+                    df = self._ler_arquivo_pedidos()
+                self.backup.criar_snapshot(df)
         except Exception as e:
             st.warning(f"Não foi possível fazer backup: {str(e)}")
 
+    def _registrar_alteracao(self, operacao: str, registros: List[dict]):
+        """Registra as linhas alteradas no log de backup"""
+        try:
+            self.backup.registrar_alteracao(operacao, registros)
+        except Exception as e:
+            st.warning(f"Não foi possível registrar a alteração no backup: {str(e)}")
+
+    @cronometrado()
+    def reconstruir_pedidos(self, momento: datetime) -> pd.DataFrame:
+        """Retorna a tabela de pedidos como estava em 'momento' (sem alterar o arquivo)"""
+        return self.backup.reconstruir(momento)
+
+    def previsualizar_restauracao(self, momento: datetime) -> pd.DataFrame:
+        """Diferenças entre os pedidos atuais e o estado em 'momento'"""
+        df_restaurado = self.reconstruir_pedidos(momento)
+        df_atual = self._ler_arquivo_pedidos() if os.path.exists(self.arquivo_pedidos) else pd.DataFrame()
+        return self.backup.diferencas(df_atual, df_restaurado)
+
+    @cronometrado()
+    def restaurar_para(self, momento: datetime):
+        """
+        Restaura os pedidos para o estado em 'momento'.
+        Não é destrutivo: o estado atual é salvo em um snapshot antes, então a
+        restauração pode ser desfeita restaurando para um momento anterior a ela.
+        """
+        df_restaurado = self.reconstruir_pedidos(momento)
+        with self._travar_pedidos():
+            if os.path.exists(self.arquivo_pedidos):
+                self.backup.criar_snapshot(self._ler_arquivo_pedidos())
+            self._escrever_pedidos(df_restaurado)
+            # Novo snapshot: as alterações seguintes partem do estado restaurado
+            self.backup.criar_snapshot(df_restaurado)
+
+    def restaurar_snapshot(self, caminho_snapshot: str):
+        """Restaura o arquivo de pedidos a partir de um snapshot (o snapshot é mantido)"""
+        momento = next(m for m, c in self.backup.listar_snapshots() if c == caminho_snapshot)
+        self.restaurar_para(momento)
+
     def _ler_pedidos(self) -> pd.DataFrame:
         """Lê a aba 'Pedidos' do Google Sheets com cache"""
         try:
@@ -206,22 +422,25 @@ class PedidoController:
         try:
             if not os.path.exists(self.arquivo_pedidos):
                 return "REQ-001"
-            df = pd.read_excel(self.arquivo_pedidos)
-            if df.empty or 'Numero_Pedido' not in df.columns:
-                return "REQ-001"
-            # Garante que pega o último número válido
-            numeros = df['Numero_Pedido'].dropna().tolist()
-            if not numeros:
-                return "REQ-001"
-            ultimo_numero = numeros[-1]
-            try:
-                numero = int(ultimo_numero.split("-")[-1]) + 1
-            except Exception:
-                numero = len(numeros) + 1
-            return f"REQ-{numero:03d}"
+            df = self._ler_arquivo_pedidos()
+            return f"REQ-{self._proximo_numero(df):03d}"
         except Exception:
             return "REQ-001"
 
+    def _proximo_numero(self, df: pd.DataFrame) -> int:
+        """Retorna o próximo número sequencial de pedido a partir do DataFrame de pedidos"""
+        if df.empty or 'Numero_Pedido' not in df.columns:
+            return 1
+        # Garante que pega o último número válido
+        numeros = df['Numero_Pedido'].dropna().tolist()
+        if not numeros:
+            return 1
+        ultimo_numero = numeros[-1]
+        try:
+            return int(str(ultimo_numero).split("-")[-1]) + 1
+        except Exception:
+            return len(numeros) + 1
+
     def _normalizar_status(self, status: str) -> str:
         """Normaliza o status para maiúsculo e garante que seja um dos valores válidos."""
         status_upper = status.upper()
@@ -229,6 +448,7 @@ class PedidoController:
             raise ValueError(f"Status inválido: {status}. Status permitidos: PENDENTE, PROCESSO, CONCLUÍDO")
         return status_upper
 
+    @cronometrado()
     def _verificar_serial_mesmo_lote(self, serial: str, maquina: str, posto: str, coordenada: str) -> bool:
         """
         Verifica se já existe um pedido PENDENTE com o mesmo serial, máquina, posto e coordenada
@@ -237,7 +457,7 @@ class PedidoController:
             if not os.path.exists(self.arquivo_pedidos):
                 return False
 
-            df = pd.read_excel(self.arquivo_pedidos)
+            df = self._ler_arquivo_pedidos()
             if df.empty:
                 return False
 
@@ -255,6 +475,7 @@ class PedidoController:
             st.error(f"Erro ao verificar serial: {str(e)}")
             return False
 
+    @cronometrado()
     def salvar_pedido(self, pedido_info: dict) -> str:
         """
         Salva um novo pedido no arquivo Excel e sincroniza com o Google Sheets
@@ -265,67 +486,54 @@ class PedidoController:
         Returns:
             str: Número do pedido criado
         """
+        if self.servico:
+            self._consultas_servico.clear()
+            # O pedido vai completo: máquina, posto, coordenada etc. escolhidos pelo usuário
+            return self.servico.criar_pedido(pedido_info)
+
         try:
-            # Verificar se o arquivo existe
-            if not os.path.exists(self.arquivo_pedidos):
-                # Criar DataFrame vazio com as colunas corretas
-                df = pd.DataFrame(columns=[
-                    "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada",
-                    "Modelo", "OT", "Semiacabado", "Pagoda", "Solicitante", "Observacoes",
-                    "Urgente", "Status", "Ultima_Atualizacao", "Responsavel_Atualizacao"
-                ])
-                # Salvar arquivo vazio
-                df.to_excel(self.arquivo_pedidos, index=False)
-
-            # Verificar se o serial já existe no mesmo lote
-            if self._verificar_serial_mesmo_lote(
-                pedido_info['serial'],
-                pedido_info['maquina'],
-                pedido_info['posto'],
-                pedido_info['coordenada']
-            ):
-                raise ValueError("Este serial já existe em um pedido ativo com as mesmas informações de máquina, posto e coordenada.")
-
-            # Gerar número do pedido
-            numero_pedido = self._gerar_numero_pedido()
-
-            # Fazer backup antes de modificar
-            self._fazer_backup()
-
-            # Ler o arquivo atual
-            df = pd.read_excel(self.arquivo_pedidos)
-
-            # Preparar novo pedido
-            novo_pedido = {
-                "Numero_Pedido": numero_pedido,
-                "Data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Serial": pedido_info['serial'],
-                "Maquina": pedido_info['maquina'],
-                "Posto": pedido_info['posto'],
-                "Coordenada": pedido_info['coordenada'],
-                "Modelo": pedido_info['modelo'],
-                "OT": pedido_info['ot'],
-                "Semiacabado": pedido_info['semiacabado'],
-                "Pagoda": pedido_info['pagoda'],
-                "Solicitante": pedido_info['solicitante'],
-                "Observacoes": pedido_info['observacoes'],
-                "Urgente": pedido_info['urgente'],
-                "Status": "PENDENTE",
-                "Ultima_Atualizacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Responsavel_Atualizacao": pedido_info['solicitante']
-            }
+            # Leitura, validação e gravação protegidas contra outros processos/sessões
+            with self._travar_pedidos():
+                # Verificar se o arquivo existe
+                if not os.path.exists(self.arquivo_pedidos):
+                    # Criar DataFrame vazio com as colunas corretas
+                    df = pd.DataFrame(columns=COLUNAS_PEDIDOS)
+                    # Salvar arquivo vazio
+                    self._escrever_pedidos(df)
+
+                # Verificar se o serial já existe no mesmo lote
+                if self._verificar_serial_mesmo_lote(
+                    pedido_info['serial'],
+                    pedido_info['maquina'],
+                    pedido_info['posto'],
+                    pedido_info['coordenada']
+                ):
+                    raise ValueError("Este serial já existe em um pedido ativo com as mesmas informações de máquina, posto e coordenada.")
+
+                # Gerar número do pedido
+                numero_pedido = self._gerar_numero_pedido()
+
+                # Ler o arquivo atual
+                df = self._ler_arquivo_pedidos()
 
-            # Adicionar novo pedido ao DataFrame
-            df = pd.concat([df, pd.DataFrame([novo_pedido])], ignore_index=True)
+                # Fazer backup antes de modificar
+                self._fazer_backup(df)
 
-            # Salvar no arquivo local
-            df.to_excel(self.arquivo_pedidos, index=False)
+                # Preparar novo pedido
+                novo_pedido = self._montar_registro_pedido(numero_pedido, pedido_info)
+
+                # Adicionar novo pedido ao DataFrame
+                df = pd.concat([df, pd.DataFrame([novo_pedido])], ignore_index=True)
+
+                # Salvar no arquivo local
+                self._escrever_pedidos(df, novos=[novo_pedido])
+                self._registrar_alteracao('inserir', [novo_pedido])
 
             # Sincronizar com Google Sheets se habilitado
             if self.sheets_sync and self.sheets_sync.client:
                 try:
-                    # Preparar dados para o Google Sheets
-                    df_pedidos = df.copy()
+                    # Enviar apenas o pedido novo (não todo o histórico)
+                    df_pedidos = pd.DataFrame([novo_pedido])
                     df_itens = pd.DataFrame([{
                         "Numero_Pedido": numero_pedido,
                         "Serial": pedido_info['serial'],
@@ -345,43 +553,249 @@ class PedidoController:
             st.error(f"Erro ao salvar pedido: {str(e)}")
             raise
 
-    def buscar_pedidos(self, numero_pedido: Optional[str] = None, status: Optional[str] = None) -> pd.DataFrame:
+    def _montar_registro_pedido(self, numero_pedido: str, pedido_info: dict) -> dict:
+        """Monta a linha do arquivo de pedidos para um novo pedido"""
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return {
+            "Numero_Pedido": numero_pedido,
+            "Data": agora,
+            "Serial": pedido_info['serial'],
+            "Maquina": pedido_info['maquina'],
+            "Posto": pedido_info['posto'],
+            "Coordenada": pedido_info['coordenada'],
+            "Modelo": pedido_info['modelo'],
+            "OT": pedido_info['ot'],
+            "Semiacabado": pedido_info['semiacabado'],
+            "Pagoda": pedido_info['pagoda'],
+            "Solicitante": pedido_info['solicitante'],
+            "Observacoes": pedido_info['observacoes'],
+            "Urgente": pedido_info['urgente'],
+            "Status": "PENDENTE",
+            "Ultima_Atualizacao": agora,
+            "Responsavel_Atualizacao": pedido_info['solicitante'],
+            # Identifica o pedido no Google Sheets: reenvios não duplicam a linha
+            "Chave_Idempotencia": uuid.uuid4().hex
+        }
+
+    @cronometrado()
+    def _indice_paco(self, sheets_sync: Optional[SheetsPedidosSync] = None) -> dict:
         """
-        Busca pedidos com base em filtros opcionais
+        Monta um índice {serial normalizado: dados do item} da aba 'paco'
+        (Google Sheets se disponível, senão arquivo local)
         """
+        sheets_sync = sheets_sync or self.sheets_sync
+        if sheets_sync and sheets_sync.client:
+            pedidos_paco = self.carregar_paco_google_sheets(sheets_sync)
+        else:
+            pedidos_paco = self.carregar_local_paco()
+
+        indice = {}
+        for p in pedidos_paco:
+            serial_norm = str(p.serial).strip().upper()
+            # Mantém a primeira ocorrência, igual à busca linha a linha
+            if serial_norm and serial_norm not in indice:
+                indice[serial_norm] = {
+                    'serial': str(p.serial).strip(),
+                    'maquina': str(p.maquina).strip(),
+                    'posto': str(p.posto).strip(),
+                    'coordenada': str(p.coordenada).strip(),
+                    'modelo': str(p.modelo).strip(),
+                    'ot': str(p.ot).strip(),
+                    'semiacabado': str(p.semiacabado).strip(),
+                    'pagoda': str(p.pagoda).strip()
+                }
+        return indice
+
+    @cronometrado()
+    def salvar_pedidos_lote(self, seriais: List[str], solicitante: str = "Sistema Automático",
+                            observacoes: str = "", urgente: str = "Não",
+                            indice_paco: Optional[dict] = None) -> List[dict]:
+        """
+        Cria pedidos para vários seriais de uma vez: resolve os seriais na aba paco em uma
+        passada, valida duplicidade em memória, reserva os números em bloco, grava o arquivo
+        local uma única vez, faz um backup e uma sincronização com o Google Sheets.
+
+        Args:
+            indice_paco: índice já carregado (ver _indice_paco); se omitido, a aba paco é lida
+
+        Returns:
+            List[dict]: um resultado por serial com as chaves
+                'serial', 'sucesso', 'numero_pedido' e 'mensagem'
+        """
+        if self.servico:
+            self._consultas_servico.clear()
+            return self.servico.criar_pedidos(seriais, solicitante=solicitante,
+                                              observacoes=observacoes, urgente=urgente)
+
+        resultados = []
+        try:
+            if indice_paco is None:
+                indice_paco = self._indice_paco()
+
+            # Leitura, validação e gravação protegidas contra outros processos/sessões
+            with self._travar_pedidos():
+                if os.path.exists(self.arquivo_pedidos):
+                    df = self._ler_arquivo_pedidos()
+                else:
+                    df = pd.DataFrame(columns=COLUNAS_PEDIDOS)
+
+                # Chaves dos pedidos PENDENTES já existentes (mesma regra de _verificar_serial_mesmo_lote)
+                pendentes = set()
+                if not df.empty:
+                    df_pendentes = df[df['Status'] == 'PENDENTE']
+                    pendentes = set(zip(
+                        df_pendentes['Serial'].astype(str),
+                        df_pendentes['Maquina'].astype(str),
+                        df_pendentes['Posto'].astype(str),
+                        df_pendentes['Coordenada'].astype(str)
+                    ))
+
+                proximo = self._proximo_numero(df)
+                novos_pedidos = []
+                for codigo in seriais:
+                    item = indice_paco.get(str(codigo).strip().upper())
+                    if not item:
+                        resultados.append({'serial': codigo, 'sucesso': False, 'numero_pedido': None,
+                                           'mensagem': "Serial não encontrado na planilha"})
+                        continue
+
+                    chave = (item['serial'], item['maquina'], item['posto'], item['coordenada'])
+                    if chave in pendentes:
+                        resultados.append({'serial': codigo, 'sucesso': False, 'numero_pedido': None,
+                                           'mensagem': "Erro ao criar pedido: Este serial já existe em um pedido ativo "
+                                                       "com as mesmas informações de máquina, posto e coordenada."})
+                        continue
+
+                    numero_pedido = f"REQ-{proximo:03d}"
+                    proximo += 1
+                    pendentes.add(chave)
+                    pedido_info = {
+                        **item,
+                        "solicitante": solicitante,
+                        "observacoes": observacoes,
+                        "urgente": urgente
+                    }
+                    novos_pedidos.append(self._montar_registro_pedido(numero_pedido, pedido_info))
+                    resultados.append({'serial': codigo, 'sucesso': True, 'numero_pedido': numero_pedido,
+                                       'mensagem': f"Pedido {numero_pedido} criado com sucesso"})
+
+                if not novos_pedidos:
+                    return resultados
+
+                # Backup, gravação e sincronização uma única vez para o lote
+                self._fazer_backup(df)
+                df_novos = pd.DataFrame(novos_pedidos)
+                df = pd.concat([df, df_novos], ignore_index=True) if not df.empty else df_novos
+                self._escrever_pedidos(df, novos=novos_pedidos)
+                self._registrar_alteracao('inserir', novos_pedidos)
+
+            if self.sheets_sync and self.sheets_sync.client:
+                try:
+                    df_itens = pd.DataFrame([{
+                        "Numero_Pedido": p["Numero_Pedido"],
+                        "Serial": p["Serial"],
+                        "Quantidade": 1
+                    } for p in novos_pedidos])
+                    success, message = self.sheets_sync.salvar_pedido_completo(df_novos, df_itens)
+                    if not success:
+                        st.warning(f"Aviso: {message}")
+                except Exception as e:
+                    st.warning(f"Aviso: Erro ao sincronizar com Google Sheets: {str(e)}")
+
+            return resultados
+        except Exception as e:
+            st.error(f"Erro ao salvar pedidos em lote: {str(e)}")
+            raise
+
+    @cronometrado()
+    def buscar_pedidos(self, numero_pedido: Optional[str] = None, status: Optional[str] = None,
+                       maquina: Optional[str] = None, data_inicial: Optional[date] = None,
+                       data_final: Optional[date] = None, hora_inicial: Optional[dt_time] = None,
+                       hora_final: Optional[dt_time] = None) -> pd.DataFrame:
+        """
+        Busca pedidos com base em filtros opcionais (hora_inicial/hora_final: horário do dia, inclusive)
+        """
+        filtros = dict(numero_pedido=numero_pedido, status=status, maquina=maquina, data_inicial=data_inicial,
+                       data_final=data_final, hora_inicial=hora_inicial, hora_final=hora_final)
+        if self.servico:
+            # Dashboard, filtro de máquinas e histórico pedem a mesma consulta no mesmo rerun
+            consulta = tuple(filtros.values())
+            if consulta in self._consultas_servico:
+                return self._consultas_servico[consulta].copy()
+            try:
+                df = pd.DataFrame(self.servico.buscar_pedidos(**filtros))
+                if 'Data' in df.columns:
+                    df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+                self._consultas_servico[consulta] = df
+                return df.copy()
+            except Exception as e:
+                st.error(f"Erro ao buscar pedidos: {str(e)}")
+                return pd.DataFrame()
+
         try:
             # Se integração com Google Sheets está ativa, lê de lá
             if self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL:
                 df = self._ler_pedidos()
-            # Senão, lê do arquivo local
+                # Converter a coluna de data para datetime
+                if 'Data' in df.columns:
+                    df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+                indice = IndicePedidos(df)
+            # Senão, usa o snapshot do arquivo local (datas convertidas e índices montados uma vez por alteração)
             elif os.path.exists(self.arquivo_pedidos):
-                df = pd.read_excel(self.arquivo_pedidos)
+                indice = self._snapshot_pedidos()[2]
             else:
                 return pd.DataFrame()
 
-            # Converter a coluna de data para datetime
-            if 'Data' in df.columns:
-                df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-
-            # Aplicar filtros se fornecidos
-            if numero_pedido:
-                df = df[df['Numero_Pedido'] == numero_pedido]
-            if status:
-                df = df[df['Status'] == status]
-
-            return df
+            # Filtros resolvidos nos índices; só as linhas encontradas são copiadas
+            return indice.filtrar(**filtros)
         except Exception as e:
             st.error(f"Erro ao buscar pedidos: {str(e)}")
             return pd.DataFrame()
 
+    @cronometrado()
+    def buscar_pedidos_pagina(self, pagina: int = 1, tamanho_pagina: int = 50, ordenar_por: str = 'Data',
+                              decrescente: bool = True, **filtros) -> Tuple[pd.DataFrame, int]:
+        """
+        Uma página dos pedidos filtrados e ordenados e o total de pedidos que atendem aos filtros.
+        Filtros, ordenação e corte são feitos aqui (ou no serviço), e a tela só recebe a página.
+        """
+        if ordenar_por not in COLUNAS_ORDENACAO:
+            raise ValueError(f"Coluna de ordenação inválida: {ordenar_por}")
+        pagina = max(int(pagina), 1)
+        if self.servico:
+            try:
+                registros, total = self.servico.buscar_pedidos_pagina(
+                    pagina=pagina, tamanho_pagina=tamanho_pagina, ordenar_por=ordenar_por,
+                    decrescente=decrescente, **filtros
+                )
+                df = pd.DataFrame(registros)
+                if 'Data' in df.columns:
+                    df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+                return df, total
+            except Exception as e:
+                st.error(f"Erro ao buscar pedidos: {str(e)}")
+                return pd.DataFrame(), 0
+
+        df = self.buscar_pedidos(**filtros)
+        if df.empty or ordenar_por not in df.columns:
+            return df, len(df)
+        # Ordenação estável: a mesma consulta sempre corta as páginas nos mesmos pedidos
+        df = df.sort_values(ordenar_por, ascending=not decrescente, kind='mergesort', na_position='last')
+        inicio = (pagina - 1) * tamanho_pagina
+        return df.iloc[inicio:inicio + tamanho_pagina].reset_index(drop=True), len(df)
+
+    @cronometrado()
     def get_pedido_detalhes(self, numero_pedido: str) -> dict:
         """Retorna os detalhes completos de um pedido do arquivo."""
+        if self.servico:
+            return self.servico.get_pedido(numero_pedido)
+
         try:
             if not os.path.exists(self.arquivo_pedidos):
                 return {}
             
             # Ler arquivo de pedidos
-            df_pedidos = pd.read_excel(self.arquivo_pedidos)
+            df_pedidos = self._ler_arquivo_pedidos()
             
             # Buscar pedido específico
             pedido = df_pedidos[df_pedidos["Numero_Pedido"] == numero_pedido].iloc[0]
@@ -407,8 +821,18 @@ class PedidoController:
             st.error(f"Erro ao buscar detalhes do pedido: {str(e)}")
             return {}
 
+    @cronometrado()
     def atualizar_status_pedido(self, numero_pedido: str, novo_status: str, responsavel: str):
         """Atualiza o status de um pedido no arquivo."""
+        if self.servico:
+            self._consultas_servico.clear()
+            try:
+                self.servico.atualizar_status(numero_pedido, novo_status, responsavel)
+                return
+            except Exception as e:
+                st.error(f"Erro ao atualizar status: {str(e)}")
+                raise
+
         try:
             # Normalizar o status para maiúsculo
             novo_status = self._normalizar_status(novo_status)
@@ -417,12 +841,39 @@ class PedidoController:
             if not os.path.exists(self.arquivo_pedidos):
                 raise Exception("Arquivo de pedidos não encontrado")
             
-            df_pedidos = pd.read_excel(self.arquivo_pedidos)
-            
-            # Encontrar o índice do pedido no DataFrame
-            pedidos_encontrados = df_pedidos[
-                df_pedidos['Numero_Pedido'].astype(str).str.strip().str.upper() == str(numero_pedido).strip().upper()
-            ]
+            # Leitura e gravação protegidas contra outros processos/sessões
+            with self._travar_pedidos():
+                df_pedidos = self._ler_arquivo_pedidos()
+                
+                # Encontrar o índice do pedido no DataFrame
+                pedidos_encontrados = df_pedidos[
+                    df_pedidos['Numero_Pedido'].astype(str).str.strip().str.upper() == str(numero_pedido).strip().upper()
+                ]
+                if not pedidos_encontrados.empty:
+                    idx = pedidos_encontrados.index[0]
+
+                    # Fazer backup antes de modificar
+                    self._fazer_backup(df_pedidos)
+                    transicao = (df_pedidos.loc[idx].to_dict(), novo_status)
+                    
+                    # Atualizar status e informações básicas
+                    ultima_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M')
+                    df_pedidos.loc[idx, 'Status'] = novo_status
+                    df_pedidos.loc[idx, 'Ultima_Atualizacao'] = ultima_atualizacao
+                    df_pedidos.loc[idx, 'Responsavel_Atualizacao'] = responsavel
+                    
+                    # Atualizar informações específicas baseado no status
+                    if novo_status == "PROCESSO":
+                        df_pedidos.loc[idx, 'Responsavel_Separacao'] = responsavel
+                        df_pedidos.loc[idx, 'Data_Separacao'] = ultima_atualizacao
+                    elif novo_status == "CONCLUÍDO":
+                        df_pedidos.loc[idx, 'Responsavel_Coleta'] = responsavel
+                        df_pedidos.loc[idx, 'Data_Coleta'] = ultima_atualizacao
+                    
+                    # Salvar alterações
+                    self._escrever_pedidos(df_pedidos, transicoes=[transicao])
+                    self._registrar_alteracao('atualizar', [df_pedidos.loc[idx].to_dict()])
+
             if pedidos_encontrados.empty:
                 # Tenta atualizar direto no Google Sheets
                 if hasattr(self, 'sheets_sync') and self.sheets_sync:
@@ -441,25 +892,6 @@ class PedidoController:
                 else:
                     raise Exception(f"Pedido com número {numero_pedido} não encontrado localmente nem no Google Sheets.")
             
-            idx = pedidos_encontrados.index[0]
-            
-            # Atualizar status e informações básicas
-            ultima_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M')
-            df_pedidos.loc[idx, 'Status'] = novo_status
-            df_pedidos.loc[idx, 'Ultima_Atualizacao'] = ultima_atualizacao
-            df_pedidos.loc[idx, 'Responsavel_Atualizacao'] = responsavel
-            
-            # Atualizar informações específicas baseado no status
-            if novo_status == "PROCESSO":
-                df_pedidos.loc[idx, 'Responsavel_Separacao'] = responsavel
-                df_pedidos.loc[idx, 'Data_Separacao'] = ultima_atualizacao
-            elif novo_status == "CONCLUÍDO":
-                df_pedidos.loc[idx, 'Responsavel_Coleta'] = responsavel
-                df_pedidos.loc[idx, 'Data_Coleta'] = ultima_atualizacao
-            
-            # Salvar alterações
-            df_pedidos.to_excel(self.arquivo_pedidos, index=False)
-            
             # Se houver integração com Google Sheets, atualizar lá também
             if hasattr(self, 'sheets_sync') and self.sheets_sync:
                 success, message = self.sheets_sync.atualizar_status_pedido_sheets(
@@ -474,6 +906,83 @@ class PedidoController:
             st.error(f"Erro ao atualizar status: {str(e)}")
             raise
 
+    @cronometrado()
+    def atualizar_status_pedidos(self, alteracoes: Dict[str, str], responsavel: str) -> Dict[str, str]:
+        """
+        Atualiza o status de vários pedidos ({número: novo status}) com uma única leitura
+        e gravação do arquivo. Retorna {número: erro} dos pedidos que não foram atualizados.
+        """
+        erros = {}
+        if not alteracoes:
+            return erros
+        if self.servico:
+            self._consultas_servico.clear()
+            for numero_pedido, novo_status in alteracoes.items():
+                try:
+                    self.servico.atualizar_status(numero_pedido, novo_status, responsavel)
+                except Exception as e:
+                    erros[numero_pedido] = str(e)
+            return erros
+
+        if not os.path.exists(self.arquivo_pedidos):
+            raise Exception("Arquivo de pedidos não encontrado")
+
+        pedidos = {}
+        for numero_pedido, novo_status in alteracoes.items():
+            try:
+                pedidos[str(numero_pedido).strip().upper()] = (numero_pedido, self._normalizar_status(novo_status))
+            except ValueError as e:
+                erros[numero_pedido] = str(e)
+        if not pedidos:
+            return erros
+        ultima_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M')
+        try:
+            with self._travar_pedidos():
+                df_pedidos = self._ler_arquivo_pedidos()
+                chaves = df_pedidos['Numero_Pedido'].astype(str).str.strip().str.upper()
+                novos_status = chaves.map({chave: status for chave, (_, status) in pedidos.items()})
+                # Como em atualizar_status_pedido, só a primeira linha de cada número
+                alterar = novos_status.notna() & ~chaves.duplicated()
+                if alterar.any():
+                    self._fazer_backup(df_pedidos)
+                    transicoes = list(zip(df_pedidos.loc[alterar, ['Maquina', 'Data', 'Status']].to_dict('records'),
+                                          novos_status[alterar]))
+                    df_pedidos.loc[alterar, 'Status'] = novos_status[alterar]
+                    df_pedidos.loc[alterar, 'Ultima_Atualizacao'] = ultima_atualizacao
+                    df_pedidos.loc[alterar, 'Responsavel_Atualizacao'] = responsavel
+                    processo = alterar & (novos_status == "PROCESSO")
+                    if processo.any():
+                        df_pedidos.loc[processo, 'Responsavel_Separacao'] = responsavel
+                        df_pedidos.loc[processo, 'Data_Separacao'] = ultima_atualizacao
+                    concluido = alterar & (novos_status == "CONCLUÍDO")
+                    if concluido.any():
+                        df_pedidos.loc[concluido, 'Responsavel_Coleta'] = responsavel
+                        df_pedidos.loc[concluido, 'Data_Coleta'] = ultima_atualizacao
+                    self._escrever_pedidos(df_pedidos, transicoes=transicoes)
+                    self._registrar_alteracao('atualizar', df_pedidos.loc[alterar].to_dict('records'))
+        except Exception as e:
+            st.error(f"Erro ao atualizar status: {str(e)}")
+            raise
+
+        encontrados = set(chaves[alterar])
+        para_sheets = {}
+        for chave, (numero_pedido, novo_status) in pedidos.items():
+            if chave in encontrados:
+                para_sheets[numero_pedido] = novo_status
+                continue
+            # Fora do arquivo local: mesmo caminho do pedido avulso (tenta o Google Sheets)
+            try:
+                self.atualizar_status_pedido(numero_pedido, novo_status, responsavel)
+            except Exception as e:
+                erros[numero_pedido] = str(e)
+        if para_sheets and hasattr(self, 'sheets_sync') and self.sheets_sync:
+            success, message, _ = self.sheets_sync.atualizar_status_pedidos_sheets(
+                para_sheets, ultima_atualizacao, responsavel
+            )
+            if not success:
+                st.warning(f"Aviso: {message}")
+        return erros
+
     @staticmethod
     @st.cache_data
     def filtrar_dados(pedidos: List[Pedido], rack: Optional[str] = None) -> List[Pedido]:
@@ -492,83 +1001,67 @@ class PedidoController:
         """Busca pedidos por rack apenas, ignorando cliente"""
         return self.filtrar_dados(self.pedidos, rack=rack)
 
-    def imprimir_pedido(self, numero_pedido: str, view=None):
-        """Gera um PDF do comprovante do pedido (layout texto) e retorna o link de download para o usuário"""
-        try:
-            # Buscar detalhes do pedido
-            detalhes = self.get_pedido_detalhes(numero_pedido)
-            if not detalhes:
-                return None
-
-            # Gerar texto do comprovante usando o método da view
-            if view and hasattr(view, 'formatar_pedido_para_impressao'):
-                texto = view.formatar_pedido_para_impressao(detalhes)
-            else:
-                # Fallback: texto básico se a view não estiver disponível
-                texto = f"""
-                PEDIDO DE REQUISIÇÃO #{detalhes['info']['Numero_Pedido']}
-                Data: {detalhes['info']['Data']}
-                
-                INFORMAÇÕES DO PEDIDO
-                --------------------
-                Cliente: {detalhes['info']['Cliente']}
-                RACK: {detalhes['info']['RACK']}
-                Localização: {detalhes['info']['Localizacao']}
-                Solicitante: {detalhes['info']['Solicitante']}
-                Status: {detalhes['status']}
-                
-                ITENS DO PEDIDO
-                --------------
-                """
-                for idx, item in enumerate(detalhes['itens'], 1):
-                    texto += f"""
-                Item {idx}:
-                - CÓD Yazaki: {item['cod_yazaki']}
-                - Código Cabo: {item['codigo_cabo']}
-                - Seção: {item['seccao']}
-                - Cor: {item['cor']}
-                - Quantidade: {item['quantidade']}
-                """
-
-            # Gerar PDF
-            from fpdf import FPDF
-            import tempfile
-            import base64
-            import os
-            import time
-
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            
-            # Ajustar o texto para remover espaços extras no início das linhas
-            linhas = [linha.strip() for linha in texto.split('\n')]
-            for linha in linhas:
-                if linha:  # Só adiciona linhas não vazias
-                    pdf.cell(0, 10, txt=linha, ln=True)
-
-            # Salvar PDF temporário
-            temp_dir = os.path.join(os.getcwd(), 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
-            pdf_path = os.path.join(temp_dir, f"comprovante_{numero_pedido}_{int(time.time())}.pdf")
-            pdf.output(pdf_path)
-
-            # Ler PDF e gerar link base64
-            with open(pdf_path, "rb") as f:
-                pdf_bytes = f.read()
-                b64 = base64.b64encode(pdf_bytes).decode()
-
-            href = f'data:application/pdf;base64,{b64}'
-            link_html = (
-                f'<a href="{href}" target="_blank" download="comprovante_{numero_pedido}.pdf" '
-                'style="font-size:18px;color:#007bff;font-weight:bold;">'
-                '🔗 Baixar comprovante em PDF</a>'
-            )
-            return link_html
-        except Exception as e:
-            st.error(f"Erro ao gerar comprovante: {str(e)}")
+    @cronometrado()
+    def _texto_comprovante(self, detalhes: dict, view=None) -> str:
+        """Texto do comprovante: usa o layout da view quando disponível"""
+        if view and hasattr(view, 'formatar_pedido_para_impressao'):
+            return view.formatar_pedido_para_impressao({'info': detalhes, 'status': detalhes.get('Status', '')})
+        return "\n".join([
+            f"PEDIDO DE REQUISIÇÃO #{detalhes.get('Numero_Pedido', '')}",
+            f"Data: {detalhes.get('Data', '')}",
+            "",
+            "INFORMAÇÕES DO PEDIDO",
+            "--------------------",
+            f"Serial: {detalhes.get('Serial', '')}",
+            f"Máquina: {detalhes.get('Maquina', '')}",
+            f"Posto: {detalhes.get('Posto', '')}",
+            f"Coordenada: {detalhes.get('Coordenada', '')}",
+            f"Semiacabado: {detalhes.get('Semiacabado', '')}",
+            f"Pagoda: {detalhes.get('Pagoda', '')}",
+            f"Status: {detalhes.get('Status', '')}",
+        ])
+
+    @cronometrado()
+    def gerar_comprovante_pdf(self, numero_pedido: str, view=None) -> Optional[bytes]:
+        """
+        Gera o PDF do comprovante do pedido em memória.
+        O PDF é reaproveitado enquanto os campos do pedido não mudarem (ex.: mudança de status);
+        a chave não usa o texto gerado, que traz o horário da impressão.
+        """
+        detalhes = self.get_pedido_detalhes(numero_pedido)
+        if not detalhes:
             return None
 
+        layout = type(view).__qualname__ if view and hasattr(view, 'formatar_pedido_para_impressao') else ''
+        campos = json.dumps(detalhes, sort_keys=True, default=str, ensure_ascii=False)
+        chave = hashlib.sha256(f"{layout}\n{campos}".encode('utf-8')).hexdigest()
+        with self._cache_comprovantes_lock:
+            pdf_bytes = self._cache_comprovantes.get(chave)
+            if pdf_bytes is not None:
+                self._cache_comprovantes.move_to_end(chave)
+        registrar_cache("comprovante_pdf", pdf_bytes is not None)
+        if pdf_bytes is not None:
+            return pdf_bytes
+
+        texto = self._texto_comprovante(detalhes, view)
+        from fpdf import FPDF
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", size=12)
+        # Ajustar o texto para remover espaços extras no início das linhas
+        for linha in (linha.strip() for linha in texto.split('\n')):
+            if linha:  # Só adiciona linhas não vazias
+                pdf.cell(0, 10, txt=linha, ln=True)
+        # dest='S': o PDF é retornado como texto latin-1, sem passar pelo disco
+        pdf_bytes = pdf.output(dest='S').encode('latin-1')
+
+        with self._cache_comprovantes_lock:
+            self._cache_comprovantes[chave] = pdf_bytes
+            while len(self._cache_comprovantes) > self.MAX_COMPROVANTES_EM_CACHE:
+                self._cache_comprovantes.popitem(last=False)
+        return pdf_bytes
+
+    @cronometrado()
     def carregar_local_paco(self) -> List[Pedido]:
         """
         Carrega os dados da aba 'Paco' do arquivo local, usando as colunas corretas.
@@ -619,15 +1112,17 @@ class PedidoController:
                 return p
         return None
 
-    def carregar_paco_google_sheets(self) -> List[Pedido]:
+    @cronometrado()
+    def carregar_paco_google_sheets(self, sheets_sync: Optional[SheetsPedidosSync] = None) -> List[Pedido]:
         """
         Carrega os dados da aba 'paco' do Google Sheets, usando as colunas corretas e normalizando nomes e valores.
         """
-        if not self.sheets_sync or not self.sheets_sync.client:
+        sheets_sync = sheets_sync or self.sheets_sync
+        if not sheets_sync or not sheets_sync.client:
             st.error("Google Sheets não está configurado!")
             return []
         try:
-            df = self.sheets_sync.get_paco_as_dataframe()
+            df = sheets_sync.get_paco_as_dataframe()
             # Normalizar nomes das colunas (remover espaços, capitalizar)
             df.columns = [str(col).strip().title() for col in df.columns]
             df = df.fillna("")
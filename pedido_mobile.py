@@ -3,8 +3,10 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.properties import StringProperty, ListProperty
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.metrics import dp
@@ -14,8 +16,10 @@ import json
 import os
 import pandas as pd
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.cliente_servico import obter_cliente_servico
 import threading
 import time
+from collections import deque
 
 # Configurar tema claro
 Window.clearcolor = (1, 1, 1, 1)  # Fundo branco
@@ -32,6 +36,45 @@ def get_app_dir():
 CONFIG_FILE = os.path.join(get_app_dir(), "config.json")
 PENDENTES_FILE = os.path.join(get_app_dir(), "leituras_pendentes.json")
 
+# Quantidade de leituras mantidas na lista (a RecycleView só cria widgets para as linhas visíveis)
+MAX_LEITURAS = 500
+
+COR_SUCESSO = (0, 0.7, 0, 1)
+COR_PADRAO = (0, 0, 0, 1)
+
+class LeituraRow(RecycleDataViewBehavior, BoxLayout):
+    """Linha reciclável da lista de leituras (Serial, Status, Mensagem, Hora)"""
+    serial = StringProperty("")
+    status = StringProperty("")
+    mensagem = StringProperty("")
+    hora = StringProperty("")
+    cor = ListProperty(COR_PADRAO)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.size_hint_y = None
+        self.height = dp(30)
+        self.spacing = dp(2)
+        for campo in ('serial', 'status', 'mensagem', 'hora'):
+            label = Label(color=self.cor)
+            self.bind(**{campo: label.setter('text')})
+            self.bind(cor=label.setter('color'))
+            self.add_widget(label)
+
+class ListaLeituras(RecycleView):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.viewclass = LeituraRow
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(30)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=dp(2)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+
 class PedidoMobileUI(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -41,7 +84,13 @@ class PedidoMobileUI(BoxLayout):
         
         # Inicializar SheetsPedidosSync
         self.sheets_sync = SheetsPedidosSync(enable_sheets=True)
-        self.leituras = []
+        # Com PEDIDOS_SERVICE_URL definida, as pendências são enviadas ao serviço local de pedidos
+        self.servico = obter_cliente_servico()
+        self.leituras = deque(maxlen=MAX_LEITURAS)
+        self._leituras_lock = threading.Lock()
+
+        # Agrupa as atualizações da lista: várias leituras no mesmo frame geram um único redesenho
+        self._trigger_lista = Clock.create_trigger(self._update_lista_ui)
         
         # Criar interface
         self._build_interface()
@@ -89,25 +138,20 @@ class PedidoMobileUI(BoxLayout):
         input_layout.add_widget(scan_button)
         self.add_widget(input_layout)
 
-        # Lista de leituras
-        self.lista_layout = GridLayout(cols=4, spacing=dp(2), size_hint_y=None)
-        self.lista_layout.bind(minimum_height=self.lista_layout.setter('height'))
-        
         # Headers
+        headers_layout = BoxLayout(size_hint_y=None, height=dp(30), spacing=dp(2))
         headers = ['Serial', 'Status', 'Mensagem', 'Hora']
         for header in headers:
-            self.lista_layout.add_widget(Label(
+            headers_layout.add_widget(Label(
                 text=header,
-                size_hint_y=None,
-                height=dp(30),
                 bold=True,
                 color=(0, 0, 0, 1)  # Texto preto
             ))
+        self.add_widget(headers_layout)
 
-        # ScrollView para a lista
-        scroll = ScrollView(size_hint=(1, 1))
-        scroll.add_widget(self.lista_layout)
-        self.add_widget(scroll)
+        # Lista de leituras (RecycleView: widgets reaproveitados, só os dados mudam)
+        self.lista_view = ListaLeituras(size_hint=(1, 1))
+        self.add_widget(self.lista_view)
 
         # Botões de ação
         actions_layout = BoxLayout(size_hint_y=None, height=dp(50))
@@ -203,6 +247,10 @@ class PedidoMobileUI(BoxLayout):
         if not pendencias:
             return
 
+        if self.servico:
+            self._sync_pendencias_servico(pendencias)
+            return
+
         indices_sucesso = []
         for i, pend in enumerate(pendencias):
             codigo = pend["codigo"]
@@ -325,39 +373,45 @@ class PedidoMobileUI(BoxLayout):
 
         self.update_pendencias_status()
 
-    def add_leitura(self, serial, status, mensagem, hora):
-        # Limitar a 10 últimas leituras
-        self.leituras = self.leituras[-9:] if len(self.leituras) > 9 else self.leituras
-        self.leituras.append({
-            "serial": serial,
-            "status": status,
-            "mensagem": mensagem,
-            "hora": hora
-        })
-        
-        # Atualizar UI na thread principal
-        Clock.schedule_once(lambda dt: self._update_lista_ui())
+    def _sync_pendencias_servico(self, pendencias):
+        """Envia todas as pendências ao serviço de pedidos em uma única requisição"""
+        try:
+            resultados = self.servico.criar_pedidos([p["codigo"] for p in pendencias], solicitante="Pedido Mobile")
+        except Exception as e:
+            print(f"Serviço de pedidos indisponível: {str(e)}")
+            return
 
-    def _update_lista_ui(self):
-        # Limpar lista atual (mantendo headers)
-        while len(self.lista_layout.children) > 4:
-            self.lista_layout.remove_widget(self.lista_layout.children[0])
-        
-        # Adicionar novas leituras
-        for leitura in reversed(self.leituras):
-            for valor in [
-                leitura["serial"],
-                leitura["status"],
-                leitura["mensagem"],
-                leitura["hora"]
-            ]:
-                label = Label(
-                    text=str(valor),
-                    size_hint_y=None,
-                    height=dp(30),
-                    color=(0, 0.7, 0, 1) if leitura["status"] == "✅" else (0, 0, 0, 1)
-                )
-                self.lista_layout.add_widget(label)
+        for pend, resultado in zip(pendencias, resultados):
+            if resultado['sucesso']:
+                self.add_leitura(pend["codigo"], "✅", f"Pedido {resultado['numero_pedido']} criado!", pend["hora"])
+            else:
+                self.add_leitura(pend["codigo"], "❌", resultado['mensagem'], pend["hora"])
+
+        # O serviço respondeu: as pendências foram processadas (com sucesso ou rejeitadas)
+        restantes = self.carregar_pendencias()[len(pendencias):]
+        with open(PENDENTES_FILE, 'w') as f:
+            json.dump(restantes, f, indent=4)
+        self.update_pendencias_status()
+
+    def add_leitura(self, serial, status, mensagem, hora):
+        # A deque descarta automaticamente as leituras mais antigas
+        with self._leituras_lock:
+            self.leituras.append({
+                "serial": str(serial),
+                "status": str(status),
+                "mensagem": str(mensagem),
+                "hora": str(hora),
+                "cor": COR_SUCESSO if status == "✅" else COR_PADRAO
+            })
+
+        # Agendar atualização da UI na thread principal (uma vez por frame)
+        self._trigger_lista()
+
+    def _update_lista_ui(self, *args):
+        # Apenas troca os dados; a RecycleView reaproveita os widgets visíveis
+        with self._leituras_lock:
+            dados = list(reversed(self.leituras))
+        self.lista_view.data = dados
 
     def mostrar_configuracao(self, instance):
         # Implementar diálogo de configuração
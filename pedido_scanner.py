@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.cliente_servico import obter_cliente_servico, ServicoPedidosErro
 from datetime import datetime
 import platform
 import sys
 import os
+import json
+from collections import deque
 
 # Função para obter o caminho absoluto do recurso (compatível com PyInstaller)
 def resource_path(relative_path):
@@ -14,6 +17,11 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# Quantidade de leituras mantidas na tabela (ex.: 1000 para histórico maior com rolagem)
+MAX_LEITURAS = int(os.getenv("SCANNER_MAX_LEITURAS", "10"))
+# Diretório do log da sessão (uma linha JSON por leitura)
+DIRETORIO_LOG = os.getenv("SCANNER_DIRETORIO_LOG", os.path.abspath("leituras_log"))
+
 class PedidoScannerApp:
     def __init__(self, root):
         self.root = root
@@ -24,16 +32,44 @@ class PedidoScannerApp:
         else:
             self.root.geometry("700x370")
         
-        self.sheets_sync = SheetsPedidosSync(enable_sheets=True)
-        self.leituras = []  # Lista de dicionários: codigo, status, mensagem, hora
+        # Com PEDIDOS_SERVICE_URL definida, os pedidos são criados pelo serviço local de pedidos
+        self.servico = obter_cliente_servico()
+        self.sheets_sync = None if self.servico else SheetsPedidosSync(enable_sheets=True)
+        # Buffer circular: (id da linha na tabela, leitura)
+        self.leituras = deque()
+        self.log_sessao = self._abrir_log_sessao()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_fechar)
         self._build_interface()
 
+    def _abrir_log_sessao(self):
+        """Abre o arquivo de log da sessão em modo append (None se não for possível)"""
+        try:
+            os.makedirs(DIRETORIO_LOG, exist_ok=True)
+            nome = f"sessao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            return open(os.path.join(DIRETORIO_LOG, nome), 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"Não foi possível abrir o log da sessão: {str(e)}")
+            return None
+
+    def on_fechar(self):
+        if self.log_sessao:
+            self.log_sessao.close()
+        self.root.destroy()
+
     def _build_interface(self):
         # Frame para status da conexão
         self.frame_status = tk.Frame(self.root)
         self.frame_status.pack(fill=tk.X, padx=10, pady=(10, 0))
-        self.lbl_status = tk.Label(self.frame_status, text="Conectado ao Google Sheets" if self.sheets_sync.client else "Desconectado", 
-                                 fg="green" if self.sheets_sync.client else "red")
+        if self.servico:
+            try:
+                self.servico.saude()
+                texto, conectado = f"Conectado ao serviço de pedidos ({self.servico.url_base})", True
+            except ServicoPedidosErro:
+                texto, conectado = f"Serviço de pedidos indisponível ({self.servico.url_base})", False
+        else:
+            conectado = bool(self.sheets_sync.client)
+            texto = "Conectado ao Google Sheets" if conectado else "Desconectado"
+        self.lbl_status = tk.Label(self.frame_status, text=texto, fg="green" if conectado else "red")
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
         # Campo para código de barras
@@ -51,6 +87,9 @@ class PedidoScannerApp:
         frame_tabela.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
         columns = ("codigo", "status", "mensagem", "hora")
         self.tree = ttk.Treeview(frame_tabela, columns=columns, show="headings", height=10)
+        scrollbar = ttk.Scrollbar(frame_tabela, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.heading("codigo", text="Código")
         self.tree.heading("status", text="Status")
         self.tree.heading("mensagem", text="Mensagem")
@@ -74,7 +113,7 @@ class PedidoScannerApp:
             return
         
         # Tentar registrar a leitura e gerar o pedido
-        success, message = self.sheets_sync.registrar_leitura_barcode(codigo)
+        success, message = (self.servico or self.sheets_sync).registrar_leitura_barcode(codigo)
         
         # Adicionar à tabela
         self.add_leitura(
@@ -89,21 +128,27 @@ class PedidoScannerApp:
         self.codigo_entry.focus()
 
     def add_leitura(self, codigo, status, mensagem, hora):
-        self.leituras.append({"codigo": codigo, "status": status, "mensagem": mensagem, "hora": hora})
-        # Limitar aos últimos 10
-        self.leituras = self.leituras[-10:]
-        # Limpar tabela
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        # Adicionar na tabela
-        for leitura in self.leituras:
-            tag = 'sucesso' if leitura["status"] == "✅" else ''
-            self.tree.insert("", tk.END, values=(
-                leitura["codigo"],
-                leitura["status"],
-                leitura["mensagem"],
-                leitura["hora"]
-            ), tags=(tag,))
+        leitura = {"codigo": codigo, "status": status, "mensagem": mensagem, "hora": hora}
+        # Inserir apenas a nova linha
+        tag = 'sucesso' if status == "✅" else ''
+        item_id = self.tree.insert("", tk.END, values=(codigo, status, mensagem, hora), tags=(tag,))
+        self.leituras.append((item_id, leitura))
+        # Remover a linha mais antiga quando o buffer estiver cheio
+        if len(self.leituras) > MAX_LEITURAS:
+            item_antigo, _ = self.leituras.popleft()
+            self.tree.delete(item_antigo)
+        self.tree.see(item_id)
+        self._registrar_log(leitura)
+
+    def _registrar_log(self, leitura):
+        """Grava a leitura no log da sessão"""
+        if not self.log_sessao:
+            return
+        try:
+            self.log_sessao.write(json.dumps(leitura, ensure_ascii=False) + "\n")
+            self.log_sessao.flush()
+        except OSError as e:
+            print(f"Erro ao gravar log da sessão: {str(e)}")
 
 if __name__ == "__main__":
     root = tk.Tk()
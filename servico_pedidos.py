@@ -0,0 +1,506 @@
+"""
+Serviço local de pedidos (HTTP/JSON sobre asyncio).
+
+Um único processo por célula é dono do pedidos.xlsx, da numeração, do índice
+da aba paco e da sincronização com o Google Sheets. O app Streamlit, o scanner
+e o app mobile passam a usá-lo quando PEDIDOS_SERVICE_URL estiver definida.
+
+Endpoints:
+    GET   /saude                      estado do serviço e tamanho da fila do Sheets
+    POST  /pedidos                    {"seriais": [...], "solicitante", "observacoes", "urgente"}
+                                      ou {"pedido": {...}} (mesmos campos de PedidoController.salvar_pedido)
+    GET   /pedidos?status=&numero=&maquina=&de=&ate=&hora_de=&hora_ate=    lista de pedidos
+          (com &pagina=&tamanho=&ordem=&desc=1 devolve só a página e o total)
+    GET   /pedidos/<numero>           detalhes de um pedido
+    GET   /pedidos/<numero>/comprovante  comprovante em PDF
+    PATCH /pedidos/<numero>/status    {"status", "responsavel"}
+    POST  /sheets/reenviar            volta para a fila do Sheets as alterações que falharam de vez
+    GET   /contadores                 totais por status, máquina e hora (dashboard gerencial)
+    POST  /paco/recarregar            descarta o índice da aba paco em cache
+    GET   /metrics                    métricas no formato Prometheus (com PEDIDOS_METRICAS=1)
+
+Uso (na raiz do projeto):
+    python servico_pedidos.py --host 0.0.0.0 --porta 8765
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time
+from typing import Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from controllers.pedido_controller import COLUNAS_ORDENACAO, PedidoController
+from utils.file_lock import FileLockTimeout
+from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils import instrumentacao
+
+logger = logging.getLogger("servico_pedidos")
+
+# Validade do índice da aba paco em memória (segundos)
+TTL_PACO = float(os.getenv("PEDIDOS_TTL_PACO", "300"))
+# Intervalo mínimo entre chamadas ao Google Sheets (segundos) e tamanho máximo do lote
+INTERVALO_SHEETS = float(os.getenv("PEDIDOS_INTERVALO_SHEETS", "2"))
+LOTE_SHEETS = int(os.getenv("PEDIDOS_LOTE_SHEETS", "200"))
+# Espera máxima entre novas tentativas quando o Sheets falha (segundos)
+ESPERA_MAX_SHEETS = float(os.getenv("PEDIDOS_ESPERA_MAX_SHEETS", "300"))
+# Tentativas de cada envio ao Sheets antes de ser separado para reenvio manual
+MAX_TENTATIVAS_SHEETS = int(os.getenv("PEDIDOS_TENTATIVAS_SHEETS", "8"))
+# Falhas que não se resolvem repetindo (pedido fora da planilha, configuração, permissão)
+_FALHA_PERMANENTE = re.compile(r"não encontrad|não configurad|Colunas necessárias|\[(400|403|404)\]", re.IGNORECASE)
+
+TAMANHO_MAX_CORPO = 1024 * 1024
+TAMANHO_MAX_PAGINA = 500
+
+MENSAGENS_HTTP = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                  405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+                  503: "Service Unavailable"}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _registros_json(df: pd.DataFrame) -> list:
+    """Converte o DataFrame em registros serializáveis (NaN -> None, datas -> texto)"""
+    if df.empty:
+        return []
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+class ServicoPedidos:
+    def __init__(self, caminho_planilha: str, diretorio_pedidos: Optional[str] = None, enable_sheets: bool = True):
+        # O controlador grava apenas no arquivo local; o Sheets é sincronizado pela fila abaixo
+        self.controller = PedidoController(caminho_planilha, enable_sheets=False,
+                                           diretorio_pedidos=diretorio_pedidos, usar_servico=False)
+        self.sheets = SheetsPedidosSync(enable_sheets=True) if enable_sheets else None
+        if self.sheets and not (self.sheets.client and self.sheets.SPREADSHEET_URL):
+            logger.warning("Google Sheets não configurado: pedidos ficam apenas no arquivo local")
+            self.sheets = None
+
+        # Um único escritor: todas as operações sobre o pedidos.xlsx passam por esta thread
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="escritor-pedidos")
+        # Chamadas ao Sheets em thread própria para não bloquear as gravações locais
+        self._executor_sheets = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
+        self._fila_sheets: Optional[asyncio.Queue] = None
+        # Alterações pendentes gravadas em disco (uma por arquivo) até o Sheets confirmar;
+        # as que falham de vez vão para a subpasta 'erros'
+        self.diretorio_fila_sheets = os.path.join(self.controller.diretorio_pedidos, 'fila_sheets')
+        self.diretorio_erros_sheets = os.path.join(self.diretorio_fila_sheets, 'erros')
+        os.makedirs(self.diretorio_erros_sheets, exist_ok=True)
+
+        self._indice_paco: Optional[dict] = None
+        self._indice_paco_momento = 0.0
+
+    # ----------------------------------------------------------------- operações
+
+    def _obter_indice_paco(self) -> dict:
+        valido = self._indice_paco is not None and time.monotonic() - self._indice_paco_momento <= TTL_PACO
+        instrumentacao.registrar_cache("indice_paco", valido)
+        if not valido:
+            self._indice_paco = self.controller._indice_paco(self.sheets)
+            self._indice_paco_momento = time.monotonic()
+        return self._indice_paco
+
+    def _criar_pedidos(self, seriais, solicitante, observacoes, urgente):
+        resultados = self.controller.salvar_pedidos_lote(
+            seriais, solicitante=solicitante, observacoes=observacoes, urgente=urgente,
+            indice_paco=self._obter_indice_paco()
+        )
+        numeros = {r['numero_pedido'] for r in resultados if r['sucesso']}
+        novos = []
+        if numeros:
+            df = self.controller._ler_arquivo_pedidos()
+            novos = _registros_json(df[df['Numero_Pedido'].isin(numeros)])
+        return resultados, novos
+
+    def _criar_pedido(self, pedido_info):
+        numero_pedido = self.controller.salvar_pedido(pedido_info)
+        df = self.controller._ler_arquivo_pedidos()
+        novos = _registros_json(df[df['Numero_Pedido'] == numero_pedido])
+        for registro in novos:
+            registro['Quantidade'] = pedido_info.get('quantidade', 1)
+        return numero_pedido, novos
+
+    def _atualizar_status(self, numero_pedido, novo_status, responsavel):
+        """
+        Atualiza o pedido no pedidos.xlsx e retorna (status normalizado, se o pedido é local).
+        Pedidos que só existem no Google Sheets não são alterados aqui: ficam para a fila do Sheets.
+        """
+        novo_status = self.controller._normalizar_status(novo_status)
+        if not os.path.exists(self.controller.arquivo_pedidos):
+            return novo_status, False
+        numeros = self.controller._snapshot_pedidos()[0]['Numero_Pedido'].astype(str).str.strip().str.upper()
+        if not (numeros == str(numero_pedido).strip().upper()).any():
+            return novo_status, False
+        self.controller.atualizar_status_pedido(numero_pedido, novo_status, responsavel)
+        return novo_status, True
+
+    def _buscar_pedidos(self, numero_pedido=None, status=None, **filtros):
+        return _registros_json(self.controller.buscar_pedidos(numero_pedido=numero_pedido, status=status, **filtros))
+
+    def _buscar_pedidos_pagina(self, pagina, tamanho_pagina, ordenar_por, decrescente, filtros):
+        df, total = self.controller.buscar_pedidos_pagina(pagina, tamanho_pagina, ordenar_por, decrescente, **filtros)
+        return _registros_json(df), total
+
+    async def _no_escritor(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._escritor, funcao, *args)
+
+    # ----------------------------------------------------------------- sincronização com o Sheets
+
+    def _enfileirar_sheets(self, operacao: str, dados):
+        if self.sheets:
+            item = {'id': f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}", 'operacao': operacao, 'dados': dados}
+            self._gravar_item_sheets(item)
+            self._fila_sheets.put_nowait(item)
+
+    def _caminho_item_sheets(self, id_item: str, diretorio: Optional[str] = None) -> str:
+        return os.path.join(diretorio or self.diretorio_fila_sheets, f"{id_item}.json")
+
+    def _gravar_item_sheets(self, item: dict, diretorio: Optional[str] = None):
+        caminho = self._caminho_item_sheets(item['id'], diretorio)
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(item, f, ensure_ascii=False, default=str)
+        os.replace(caminho + '.tmp', caminho)
+
+    def _remover_itens_sheets(self, itens: list):
+        for item in itens:
+            try:
+                os.remove(self._caminho_item_sheets(item['id']))
+            except OSError:
+                pass
+
+    def _separar_itens_sheets(self, itens: list, erro: str):
+        """Tira da fila os itens que falharam de vez (ficam em 'erros' para POST /sheets/reenviar)"""
+        for item in itens:
+            self._gravar_item_sheets({**item, 'erro': erro}, self.diretorio_erros_sheets)
+        self._remover_itens_sheets(itens)
+
+    def _ler_itens_sheets(self, diretorio: str) -> list:
+        itens = []
+        for nome in sorted(os.listdir(diretorio)):
+            if not nome.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(diretorio, nome), encoding='utf-8') as f:
+                    itens.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning("Item inválido na fila do Sheets (%s): %s", nome, e)
+        return itens
+
+    def _reenviar_erros_sheets(self) -> int:
+        """Devolve para a fila os itens separados por falha"""
+        itens = self._ler_itens_sheets(self.diretorio_erros_sheets)
+        for item in itens:
+            item.pop('erro', None)
+            self._enfileirar_sheets(item['operacao'], item['dados'])
+            os.remove(self._caminho_item_sheets(item['id'], self.diretorio_erros_sheets))
+        return len(itens)
+
+    def _enviar_sheets(self, operacao: str, dados) -> tuple:
+        if operacao == 'inserir':
+            df_pedidos = pd.DataFrame(dados)
+            df_itens = pd.DataFrame([
+                {"Numero_Pedido": p["Numero_Pedido"], "Serial": p["Serial"], "Quantidade": p.get("Quantidade", 1)}
+                for p in dados
+            ])
+            return self.sheets.salvar_pedido_completo(df_pedidos, df_itens)
+        numero_pedido, novo_status, momento, responsavel = dados
+        return self.sheets.atualizar_status_pedido_sheets(numero_pedido, novo_status, momento, responsavel)
+
+    async def _sincronizar_sheets(self):
+        """
+        Consome a fila de alterações respeitando o intervalo mínimo entre chamadas.
+        Pedidos novos consecutivos são enviados em um único lote. Falhas temporárias (cota,
+        rede) são repetidas com espera exponencial até MAX_TENTATIVAS_SHEETS (reenviar é seguro
+        pela Chave_Idempotencia); falhas permanentes e as que esgotam as tentativas são
+        separadas em fila_sheets/erros para não travar as alterações seguintes.
+        """
+        loop = asyncio.get_running_loop()
+        ultima_chamada = 0.0
+        adiada = None
+        while True:
+            item = adiada or await self._fila_sheets.get()
+            adiada = None
+            itens = [item]
+            operacao, dados = item['operacao'], item['dados']
+            if operacao == 'inserir':
+                dados = list(dados)
+                # Agrupa os pedidos novos já enfileirados
+                while len(dados) < LOTE_SHEETS and not self._fila_sheets.empty():
+                    proximo = self._fila_sheets.get_nowait()
+                    if proximo['operacao'] != 'inserir':
+                        adiada = proximo
+                        break
+                    itens.append(proximo)
+                    dados.extend(proximo['dados'])
+
+            espera = INTERVALO_SHEETS
+            for tentativa in range(1, MAX_TENTATIVAS_SHEETS + 1):
+                atraso = INTERVALO_SHEETS - (time.monotonic() - ultima_chamada)
+                if atraso > 0:
+                    await asyncio.sleep(atraso)
+                ultima_chamada = time.monotonic()
+                try:
+                    sucesso, mensagem = await loop.run_in_executor(self._executor_sheets, self._enviar_sheets,
+                                                                   operacao, dados)
+                except Exception as e:
+                    sucesso, mensagem = False, str(e)
+                if sucesso:
+                    self._remover_itens_sheets(itens)
+                    break
+                permanente = bool(_FALHA_PERMANENTE.search(mensagem or ''))
+                if permanente or tentativa == MAX_TENTATIVAS_SHEETS:
+                    logger.error("Falha ao sincronizar com o Google Sheets (%s, %s); separado em %s: %s",
+                                 operacao, "permanente" if permanente else f"{tentativa} tentativas",
+                                 self.diretorio_erros_sheets, mensagem)
+                    instrumentacao.incrementar("pedidos_sheets_falhas_total", operacao=operacao,
+                                               tipo="permanente" if permanente else "tentativas")
+                    self._separar_itens_sheets(itens, mensagem)
+                    break
+                logger.warning("Falha ao sincronizar com o Google Sheets (%s), nova tentativa em %.0fs: %s",
+                               operacao, espera, mensagem)
+                instrumentacao.incrementar("pedidos_sheets_retentativas_total", operacao=operacao)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, ESPERA_MAX_SHEETS)
+
+    # ----------------------------------------------------------------- HTTP
+
+    async def _despachar(self, metodo: str, alvo: str, corpo: bytes):
+        url = urllib.parse.urlsplit(alvo)
+        partes = [urllib.parse.unquote(p) for p in url.path.strip('/').split('/') if p]
+        consulta = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            dados = json.loads(corpo.decode('utf-8')) if corpo else {}
+        except ValueError:
+            raise ErroHTTP(400, "Corpo da requisição não é um JSON válido")
+
+        if partes == ['saude'] and metodo == 'GET':
+            return 200, {
+                'status': 'ok',
+                'sheets': self.sheets is not None,
+                'fila_sheets': self._fila_sheets.qsize() if self._fila_sheets else 0,
+                'erros_sheets': len([n for n in os.listdir(self.diretorio_erros_sheets) if n.endswith('.json')]),
+                'trava': self.controller.estatisticas_trava()
+            }
+
+        if partes == ['pedidos'] and metodo == 'POST' and 'pedido' in dados:
+            pedido_info = dados['pedido']
+            faltando = [c for c in ('serial', 'maquina', 'posto', 'coordenada') if not isinstance(pedido_info, dict)
+                        or not pedido_info.get(c)]
+            if faltando:
+                raise ErroHTTP(400, f"Informe em 'pedido': {', '.join(faltando)}")
+            pedido_info = {'modelo': '', 'ot': '', 'semiacabado': '', 'pagoda': '', 'observacoes': '',
+                           'solicitante': "Sistema Automático", 'urgente': "Não", **pedido_info}
+            try:
+                numero_pedido, novos = await self._no_escritor(self._criar_pedido, pedido_info)
+            except ValueError as e:
+                raise ErroHTTP(400, str(e))
+            self._enfileirar_sheets('inserir', novos)
+            return 201, {'numero_pedido': numero_pedido, 'mensagem': f"Pedido {numero_pedido} criado com sucesso"}
+
+        if partes == ['pedidos'] and metodo == 'POST':
+            seriais = dados.get('seriais')
+            if not isinstance(seriais, list) or not seriais:
+                raise ErroHTTP(400, "Informe a lista 'seriais'")
+            resultados, novos = await self._no_escritor(
+                self._criar_pedidos, [str(s) for s in seriais],
+                dados.get('solicitante') or "Sistema Automático",
+                dados.get('observacoes') or "", dados.get('urgente') or "Não"
+            )
+            if novos:
+                self._enfileirar_sheets('inserir', novos)
+            return 201 if novos else 200, {'resultados': resultados}
+
+        if partes == ['pedidos'] and metodo == 'GET':
+            try:
+                filtros = {
+                    'numero_pedido': consulta.get('numero'),
+                    'status': consulta.get('status'),
+                    'maquina': consulta.get('maquina'),
+                    'data_inicial': date.fromisoformat(consulta['de']) if consulta.get('de') else None,
+                    'data_final': date.fromisoformat(consulta['ate']) if consulta.get('ate') else None,
+                    'hora_inicial': dt_time.fromisoformat(consulta['hora_de']) if consulta.get('hora_de') else None,
+                    'hora_final': dt_time.fromisoformat(consulta['hora_ate']) if consulta.get('hora_ate') else None,
+                }
+                if 'pagina' not in consulta:
+                    pedidos = await self._no_escritor(lambda: self._buscar_pedidos(**filtros))
+                    return 200, {'pedidos': pedidos}
+                pagina = int(consulta['pagina'])
+                tamanho = min(int(consulta.get('tamanho', 50)), TAMANHO_MAX_PAGINA)
+                ordem = consulta.get('ordem', 'Data')
+                decrescente = consulta.get('desc', '1') not in ('0', 'false')
+            except ValueError:
+                raise ErroHTTP(400, "Parâmetros de consulta inválidos")
+            if ordem not in COLUNAS_ORDENACAO:
+                raise ErroHTTP(400, f"Coluna de ordenação inválida: {ordem}")
+            pedidos, total = await self._no_escritor(self._buscar_pedidos_pagina, pagina, tamanho,
+                                                     ordem, decrescente, filtros)
+            return 200, {'pedidos': pedidos, 'total': total, 'pagina': pagina}
+
+        if len(partes) == 2 and partes[0] == 'pedidos' and metodo == 'GET':
+            pedidos = await self._no_escritor(self._buscar_pedidos, partes[1], None)
+            if not pedidos:
+                raise ErroHTTP(404, f"Pedido {partes[1]} não encontrado")
+            return 200, pedidos[0]
+
+        if len(partes) == 3 and partes[0] == 'pedidos' and partes[2] == 'comprovante' and metodo == 'GET':
+            pdf_bytes = await self._no_escritor(self.controller.gerar_comprovante_pdf, partes[1])
+            if not pdf_bytes:
+                raise ErroHTTP(404, f"Pedido {partes[1]} não encontrado")
+            return 200, pdf_bytes
+
+        if len(partes) == 3 and partes[0] == 'pedidos' and partes[2] == 'status' and metodo == 'PATCH':
+            if not dados.get('status') or not dados.get('responsavel'):
+                raise ErroHTTP(400, "Informe 'status' e 'responsavel'")
+            try:
+                novo_status, local = await self._no_escritor(self._atualizar_status, partes[1],
+                                                             dados['status'], dados['responsavel'])
+            except ValueError as e:
+                raise ErroHTTP(400, str(e))
+            except FileLockTimeout as e:
+                raise ErroHTTP(503, str(e))
+            if not local and not self.sheets:
+                raise ErroHTTP(404, f"Pedido {partes[1]} não encontrado")
+            # Fora do pedidos.xlsx: como em atualizar_status_pedido, a alteração vai só para o Google Sheets
+            self._enfileirar_sheets('atualizar', (partes[1], novo_status,
+                                                  datetime.now().strftime('%d/%m/%Y %H:%M'), dados['responsavel']))
+            return (200 if local else 202), {'numero_pedido': partes[1], 'status': novo_status}
+
+        if partes == ['contadores'] and metodo == 'GET':
+            return 200, await self._no_escritor(self.controller.contadores_pedidos)
+
+        if partes == ['metrics'] and metodo == 'GET':
+            if not instrumentacao.ATIVO:
+                raise ErroHTTP(404, "Métricas desativadas (defina PEDIDOS_METRICAS=1)")
+            instrumentacao.definir("pedidos_fila_sheets", self._fila_sheets.qsize() if self._fila_sheets else 0)
+            return 200, instrumentacao.metricas.texto_prometheus()
+
+        if partes == ['sheets', 'reenviar'] and metodo == 'POST':
+            if not self.sheets:
+                raise ErroHTTP(404, "Google Sheets não configurado")
+            return 200, {'reenviados': self._reenviar_erros_sheets()}
+
+        if partes == ['paco', 'recarregar'] and metodo == 'POST':
+            self._indice_paco = None
+            return 200, {'status': 'ok'}
+
+        raise ErroHTTP(404, "Rota não encontrada")
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha.strip():
+                    break
+                try:
+                    metodo, alvo, _ = linha.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    break
+                cabecalhos = {}
+                while True:
+                    cabecalho = await reader.readline()
+                    if cabecalho in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                corpo_lido = False
+                try:
+                    try:
+                        tamanho = int(cabecalhos.get('content-length') or 0)
+                    except ValueError:
+                        tamanho = -1
+                    if tamanho < 0:
+                        raise ErroHTTP(400, "Content-Length inválido")
+                    if tamanho > TAMANHO_MAX_CORPO:
+                        raise ErroHTTP(413, "Requisição muito grande")
+                    corpo = await reader.readexactly(tamanho) if tamanho else b''
+                    corpo_lido = True
+                    status, resposta = await self._despachar(metodo.upper(), alvo, corpo)
+                except ErroHTTP as e:
+                    status, resposta = e.status, {'erro': str(e)}
+                except Exception as e:
+                    logger.exception("Erro ao atender %s %s", metodo, alvo)
+                    status, resposta = 500, {'erro': str(e)}
+
+                # Sem o corpo lido (413, Content-Length inválido) a conexão não pode ser reaproveitada
+                manter = cabecalhos.get('connection', '').lower() != 'close' and corpo_lido
+                if isinstance(resposta, bytes):
+                    conteudo, tipo = resposta, "application/pdf"
+                elif isinstance(resposta, str):
+                    conteudo, tipo = resposta.encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8"
+                else:
+                    conteudo = json.dumps(resposta, ensure_ascii=False, default=str).encode('utf-8')
+                    tipo = "application/json; charset=utf-8"
+                writer.write(
+                    f"HTTP/1.1 {status} {MENSAGENS_HTTP.get(status, '')}\r\n"
+                    f"Content-Type: {tipo}\r\n"
+                    f"Content-Length: {len(conteudo)}\r\n"
+                    f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode('latin-1') + conteudo
+                )
+                await writer.drain()
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def executar(self, host: str, porta: int):
+        self._fila_sheets = asyncio.Queue()
+        # Retoma o que ficou pendente quando o serviço parou
+        pendentes = self._ler_itens_sheets(self.diretorio_fila_sheets)
+        if self.sheets:
+            for item in pendentes:
+                self._fila_sheets.put_nowait(item)
+        elif pendentes:
+            logger.warning("%d alteração(ões) pendentes para o Google Sheets em %s (Sheets desativado)",
+                           len(pendentes), self.diretorio_fila_sheets)
+        tarefa_sheets = asyncio.create_task(self._sincronizar_sheets()) if self.sheets else None
+        servidor = await asyncio.start_server(self._atender, host, porta)
+        logger.info("Serviço de pedidos em http://%s:%s (Google Sheets: %s)", host, porta,
+                    "ativo" if self.sheets else "desativado")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            if tarefa_sheets:
+                tarefa_sheets.cancel()
+            self._escritor.shutdown(wait=True)
+            self._executor_sheets.shutdown(wait=False)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("PEDIDOS_SERVICE_HOST", "0.0.0.0"))
+    parser.add_argument("--porta", type=int, default=int(os.getenv("PEDIDOS_SERVICE_PORTA", "8765")))
+    parser.add_argument("--planilha", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pedidos',
+                                                           'Versão de Linha YMS_Motor XBB.xlsx'),
+                        help="Planilha local com a aba Paco (usada quando o Sheets não está configurado)")
+    parser.add_argument("--diretorio-pedidos", default=None, help="Diretório do pedidos.xlsx (padrão: pedidos/)")
+    parser.add_argument("--sem-sheets", action="store_true", help="Não sincronizar com o Google Sheets")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    servico = ServicoPedidos(args.planilha, args.diretorio_pedidos, enable_sheets=not args.sem_sheets)
+    instrumentacao.iniciar_log_periodico()
+    try:
+        asyncio.run(servico.executar(args.host, args.porta))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from benchmarks.dados_sinteticos import preparar_ambiente
+from utils.contadores_pedidos import aplicar_alteracoes, calcular_contadores, contadores_vazios
+
+
+def test_aplicar_alteracoes_remove_contagens_zeradas():
+    registro = {'Maquina': 'M01', 'Data': '2024-05-10 08:15:00', 'Status': 'PENDENTE'}
+    contadores = aplicar_alteracoes(contadores_vazios(), novos=[registro])
+    aplicar_alteracoes(contadores, transicoes=[(registro, 'CONCLUÍDO')])
+    assert contadores == {
+        'total': 1,
+        'status': {'CONCLUÍDO': 1},
+        'maquina': {'M01': {'CONCLUÍDO': 1}},
+        'hora': {'08': {'CONCLUÍDO': 1}},
+    }
+
+
+def test_contadores_incrementais_iguais_ao_recalculo(tmp_path):
+    controller = preparar_ambiente(str(tmp_path), 50, 30)
+    # Grava os contadores completos; as alterações seguintes são incrementais
+    controller.contadores_pedidos()
+
+    numeros = controller.buscar_pedidos()['Numero_Pedido'].tolist()
+    assert not controller.atualizar_status_pedidos(dict.fromkeys(numeros, 'CONCLUÍDO'), 'teste')
+    assert not controller.atualizar_status_pedidos(dict.fromkeys(numeros[:5], 'PROCESSO'), 'teste')
+
+    incrementais = controller.contadores.carregar(controller._assinatura_arquivo_pedidos())
+    assert incrementais is not None
+    assert incrementais == calcular_contadores(controller.buscar_pedidos())
+
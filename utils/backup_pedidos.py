@@ -0,0 +1,210 @@
+import os
+import json
+import gzip
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+FORMATO_MOMENTO = '%Y%m%d_%H%M%S_%f'
+
+
+class BackupPedidos:
+    """
+    Backup incremental do arquivo de pedidos.
+
+    - Snapshot base compactado (snapshot_<momento>.json.gz) criado periodicamente
+    - Entre snapshots, cada alteração é registrada como uma linha JSON no
+      log do dia (changelog_<AAAAMMDD>.jsonl)
+    - Retenção por tempo: snapshots e logs mais antigos que 'retencao' são removidos,
+      mantendo sempre um snapshot anterior ao início da janela
+    """
+
+    def __init__(self, diretorio_backup: str, intervalo_snapshot: timedelta = timedelta(hours=1),
+                 retencao: timedelta = timedelta(days=30)):
+        self.diretorio_backup = diretorio_backup
+        self.intervalo_snapshot = intervalo_snapshot
+        self.retencao = retencao
+        os.makedirs(self.diretorio_backup, exist_ok=True)
+
+    # ----------------------------------------------------------------- snapshots
+
+    def listar_snapshots(self) -> List[Tuple[datetime, str]]:
+        """Lista (momento, caminho) dos snapshots, do mais antigo para o mais recente"""
+        snapshots = []
+        for nome in os.listdir(self.diretorio_backup):
+            if nome.startswith('snapshot_') and nome.endswith('.json.gz'):
+                try:
+                    momento = datetime.strptime(nome[len('snapshot_'):-len('.json.gz')], FORMATO_MOMENTO)
+                except ValueError:
+                    continue
+                snapshots.append((momento, os.path.join(self.diretorio_backup, nome)))
+        return sorted(snapshots)
+
+    def ultimo_snapshot(self) -> Optional[Tuple[datetime, str]]:
+        snapshots = self.listar_snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def precisa_snapshot(self, momento: Optional[datetime] = None) -> bool:
+        """Indica se já passou o intervalo desde o último snapshot"""
+        momento = momento or datetime.now()
+        ultimo = self.ultimo_snapshot()
+        return ultimo is None or momento - ultimo[0] >= self.intervalo_snapshot
+
+    def criar_snapshot(self, df: pd.DataFrame, momento: Optional[datetime] = None) -> str:
+        """Grava o DataFrame completo como snapshot compactado e aplica a retenção"""
+        momento = momento or datetime.now()
+        caminho = os.path.join(self.diretorio_backup, f"snapshot_{momento.strftime(FORMATO_MOMENTO)}.json.gz")
+        dados = {
+            'momento': momento.isoformat(),
+            'colunas': [str(c) for c in df.columns],
+            'registros': df.astype(object).where(df.notna(), None).values.tolist()
+        }
+        temporario = caminho + '.tmp'
+        with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, default=str)
+        os.replace(temporario, caminho)
+        self.aplicar_retencao(momento)
+        return caminho
+
+    def carregar_snapshot(self, caminho: str) -> pd.DataFrame:
+        with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+            dados = json.load(f)
+        return pd.DataFrame(dados['registros'], columns=dados['colunas'])
+
+    # ----------------------------------------------------------------- log de alterações
+
+    def _caminho_changelog(self, dia: datetime) -> str:
+        return os.path.join(self.diretorio_backup, f"changelog_{dia.strftime('%Y%m%d')}.jsonl")
+
+    def registrar_alteracao(self, operacao: str, registros: List[dict], momento: Optional[datetime] = None):
+        """
+        Registra uma alteração no log do dia.
+
+        Args:
+            operacao: 'inserir' ou 'atualizar' (registros completos, identificados por Numero_Pedido)
+            registros: linhas do arquivo de pedidos após a alteração
+        """
+        if not registros:
+            return
+        momento = momento or datetime.now()
+        linha = json.dumps({
+            'momento': momento.isoformat(),
+            'operacao': operacao,
+            'registros': registros
+        }, ensure_ascii=False, default=str) + "\n"
+        fd = os.open(self._caminho_changelog(momento), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, linha.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def listar_changelogs(self) -> List[Tuple[datetime, str]]:
+        logs = []
+        for nome in os.listdir(self.diretorio_backup):
+            if nome.startswith('changelog_') and nome.endswith('.jsonl'):
+                try:
+                    dia = datetime.strptime(nome[len('changelog_'):-len('.jsonl')], '%Y%m%d')
+                except ValueError:
+                    continue
+                logs.append((dia, os.path.join(self.diretorio_backup, nome)))
+        return sorted(logs)
+
+    # ----------------------------------------------------------------- retenção
+
+    def aplicar_retencao(self, momento: Optional[datetime] = None):
+        """Remove snapshots e logs fora da janela de retenção"""
+        momento = momento or datetime.now()
+        limite = momento - self.retencao
+        snapshots = self.listar_snapshots()
+        antigos = [s for s in snapshots if s[0] < limite]
+        if not antigos:
+            return
+        # Mantém o snapshot mais recente anterior ao limite como base da janela
+        base = antigos[-1]
+        for _, caminho in antigos[:-1]:
+            os.remove(caminho)
+        dia_base = base[0].replace(hour=0, minute=0, second=0, microsecond=0)
+        for dia, caminho in self.listar_changelogs():
+            if dia < dia_base:
+                os.remove(caminho)
+
+    # ----------------------------------------------------------------- restauração
+
+    def _alteracoes_entre(self, inicio: datetime, fim: datetime):
+        """Percorre, em ordem, as alterações registradas no intervalo (inicio, fim]"""
+        dia_inicio = inicio.replace(hour=0, minute=0, second=0, microsecond=0)
+        for dia, caminho in self.listar_changelogs():
+            if dia < dia_inicio or dia > fim:
+                continue
+            with open(caminho, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    if not linha.strip():
+                        continue
+                    try:
+                        alteracao = json.loads(linha)
+                        momento = datetime.fromisoformat(alteracao['momento'])
+                    except (ValueError, KeyError):
+                        continue
+                    if inicio < momento <= fim:
+                        yield alteracao
+
+    def reconstruir(self, momento: datetime) -> pd.DataFrame:
+        """
+        Reconstrói a tabela de pedidos como estava em 'momento': carrega o snapshot
+        mais recente anterior e reaplica as alterações registradas até 'momento'.
+        """
+        anteriores = [s for s in self.listar_snapshots() if s[0] <= momento]
+        if not anteriores:
+            raise ValueError(f"Nenhum backup disponível antes de {momento.strftime('%d/%m/%Y %H:%M:%S')}")
+        momento_snapshot, caminho = anteriores[-1]
+        df = self.carregar_snapshot(caminho)
+
+        # Indexa por número do pedido para reaplicar as alterações em O(1) por registro
+        colunas = list(df.columns)
+        registros = df.to_dict('records')
+        posicoes = {}
+        for i, registro in enumerate(registros):
+            posicoes.setdefault(str(registro.get('Numero_Pedido')), i)
+        for alteracao in self._alteracoes_entre(momento_snapshot, momento):
+            for registro in alteracao['registros']:
+                chave = str(registro.get('Numero_Pedido'))
+                if chave in posicoes:
+                    registros[posicoes[chave]].update(registro)
+                else:
+                    posicoes[chave] = len(registros)
+                    registros.append(dict(registro))
+                for coluna in registro:
+                    if coluna not in colunas:
+                        colunas.append(coluna)
+        return pd.DataFrame(registros, columns=colunas)
+
+    @staticmethod
+    def diferencas(df_atual: pd.DataFrame, df_restaurado: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compara a tabela atual com a restaurada, por Numero_Pedido.
+        Retorna uma linha por pedido afetado: Numero_Pedido, Alteracao e Campos.
+        """
+        def _por_numero(df):
+            if df.empty or 'Numero_Pedido' not in df.columns:
+                return {}
+            df = df.astype(object).where(df.notna(), "")
+            return {str(r['Numero_Pedido']): r for r in df.to_dict('records')}
+
+        atual = _por_numero(df_atual)
+        restaurado = _por_numero(df_restaurado)
+        linhas = []
+        for numero in restaurado.keys() - atual.keys():
+            linhas.append({'Numero_Pedido': numero, 'Alteracao': 'volta a existir', 'Campos': ''})
+        for numero in atual.keys() - restaurado.keys():
+            linhas.append({'Numero_Pedido': numero, 'Alteracao': 'será removido', 'Campos': ''})
+        for numero in atual.keys() & restaurado.keys():
+            a, r = atual[numero], restaurado[numero]
+            campos = [
+                f"{c}: {a.get(c, '')} → {r.get(c, '')}"
+                for c in r.keys() | a.keys()
+                if str(a.get(c, '')) != str(r.get(c, ''))
+            ]
+            if campos:
+                linhas.append({'Numero_Pedido': numero, 'Alteracao': 'alterado', 'Campos': '; '.join(sorted(campos))})
+        return pd.DataFrame(linhas, columns=['Numero_Pedido', 'Alteracao', 'Campos']).sort_values('Numero_Pedido')
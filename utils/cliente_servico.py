@@ -0,0 +1,117 @@
+import os
+import json
+import urllib.request
+import urllib.error
+import urllib.parse
+from datetime import date, time
+from typing import List, Optional, Tuple
+
+
+class ServicoPedidosErro(Exception):
+    pass
+
+
+class ClienteServicoPedidos:
+    """
+    Cliente HTTP/JSON do serviço local de pedidos (servico_pedidos.py).
+
+    Usado pelo app Streamlit, pelo scanner e pelo app mobile quando a variável
+    PEDIDOS_SERVICE_URL estiver definida (ex.: http://raspberrypi.local:8765).
+    """
+
+    def __init__(self, url_base: str, timeout: float = 15.0):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+
+    def _requisicao(self, metodo: str, caminho: str, dados: Optional[dict] = None) -> dict:
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8') if dados is not None else None
+        requisicao = urllib.request.Request(
+            self.url_base + caminho,
+            data=corpo,
+            method=metodo,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+                return json.loads(resposta.read().decode('utf-8') or '{}')
+        except urllib.error.HTTPError as e:
+            try:
+                mensagem = json.loads(e.read().decode('utf-8')).get('erro', str(e))
+            except ValueError:
+                mensagem = str(e)
+            raise ServicoPedidosErro(mensagem) from e
+        except (urllib.error.URLError, OSError) as e:
+            raise ServicoPedidosErro(f"Serviço de pedidos indisponível ({self.url_base}): {str(e)}") from e
+
+    def saude(self) -> dict:
+        return self._requisicao('GET', '/saude')
+
+    def criar_pedidos(self, seriais: List[str], solicitante: str = "Sistema Automático",
+                      observacoes: str = "", urgente: str = "Não") -> List[dict]:
+        """Mesmo contrato de PedidoController.salvar_pedidos_lote: um resultado por serial"""
+        resposta = self._requisicao('POST', '/pedidos', {
+            'seriais': list(seriais),
+            'solicitante': solicitante,
+            'observacoes': observacoes,
+            'urgente': urgente
+        })
+        return resposta.get('resultados', [])
+
+    def criar_pedido(self, pedido_info: dict) -> str:
+        """Mesmo contrato de PedidoController.salvar_pedido: cria o pedido com os dados informados"""
+        return self._requisicao('POST', '/pedidos', {'pedido': pedido_info})['numero_pedido']
+
+    def registrar_leitura_barcode(self, codigo: str, operador: str = "Scanner") -> tuple[bool, str]:
+        """Cria o pedido de um código lido (mesmo retorno de SheetsPedidosSync.registrar_leitura_barcode)"""
+        try:
+            resultado = self.criar_pedidos([codigo], solicitante=operador)[0]
+            return resultado['sucesso'], resultado['mensagem']
+        except (ServicoPedidosErro, IndexError, KeyError) as e:
+            return False, str(e)
+
+    def atualizar_status(self, numero_pedido: str, novo_status: str, responsavel: str) -> dict:
+        caminho = f"/pedidos/{urllib.parse.quote(str(numero_pedido), safe='')}/status"
+        return self._requisicao('PATCH', caminho, {'status': novo_status, 'responsavel': responsavel})
+
+    @staticmethod
+    def _consulta_pedidos(numero_pedido=None, status=None, maquina=None, data_inicial=None, data_final=None,
+                          hora_inicial=None, hora_final=None, **extras) -> str:
+        filtros = {k: v for k, v in (('numero', numero_pedido), ('status', status), ('maquina', maquina),
+                                     ('de', data_inicial and data_inicial.isoformat()),
+                                     ('ate', data_final and data_final.isoformat()),
+                                     ('hora_de', hora_inicial and hora_inicial.isoformat()),
+                                     ('hora_ate', hora_final and hora_final.isoformat())) if v}
+        filtros.update(extras)
+        return '/pedidos' + ('?' + urllib.parse.urlencode(filtros) if filtros else '')
+
+    def buscar_pedidos(self, numero_pedido: Optional[str] = None, status: Optional[str] = None,
+                       maquina: Optional[str] = None, data_inicial: Optional[date] = None,
+                       data_final: Optional[date] = None, hora_inicial: Optional[time] = None,
+                       hora_final: Optional[time] = None) -> List[dict]:
+        caminho = self._consulta_pedidos(numero_pedido, status, maquina, data_inicial, data_final,
+                                         hora_inicial, hora_final)
+        return self._requisicao('GET', caminho).get('pedidos', [])
+
+    def buscar_pedidos_pagina(self, pagina: int, tamanho_pagina: int, ordenar_por: str = 'Data',
+                              decrescente: bool = True, **filtros) -> Tuple[List[dict], int]:
+        """Mesmo contrato de PedidoController.buscar_pedidos_pagina (registros em vez de DataFrame)"""
+        caminho = self._consulta_pedidos(**filtros, pagina=pagina, tamanho=tamanho_pagina,
+                                         ordem=ordenar_por, desc=int(bool(decrescente)))
+        resposta = self._requisicao('GET', caminho)
+        return resposta.get('pedidos', []), resposta.get('total', 0)
+
+    def contadores(self) -> dict:
+        """Mesmo contrato de PedidoController.contadores_pedidos"""
+        return self._requisicao('GET', '/contadores')
+
+    def get_pedido(self, numero_pedido: str) -> dict:
+        try:
+            return self._requisicao('GET', f"/pedidos/{urllib.parse.quote(str(numero_pedido), safe='')}")
+        except ServicoPedidosErro:
+            return {}
+
+
+def obter_cliente_servico() -> Optional[ClienteServicoPedidos]:
+    """Retorna o cliente do serviço de pedidos se PEDIDOS_SERVICE_URL estiver configurada"""
+    url = os.getenv('PEDIDOS_SERVICE_URL', '').strip()
+    return ClienteServicoPedidos(url) if url else None
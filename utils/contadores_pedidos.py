@@ -0,0 +1,120 @@
+import os
+import json
+import tempfile
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+
+ARQUIVO_CONTADORES = 'contadores.json'
+
+
+def _chave(valor) -> str:
+    """Chave de status/máquina no JSON ('' quando vazio)"""
+    return '' if valor is None or pd.isna(valor) else str(valor).strip()
+
+
+def _hora(data) -> Optional[str]:
+    data = pd.to_datetime(data, errors='coerce')
+    return None if pd.isna(data) else f"{data.hour:02d}"
+
+
+def contadores_vazios() -> dict:
+    return {'total': 0, 'status': {}, 'maquina': {}, 'hora': {}}
+
+
+def calcular_contadores(df: pd.DataFrame) -> dict:
+    """Contadores a partir da tabela inteira (usado quando não há contadores válidos)"""
+    contadores = contadores_vazios()
+    if df.empty:
+        return contadores
+    status = df['Status'].map(_chave) if 'Status' in df.columns else pd.Series('', index=df.index)
+    contadores['total'] = len(df)
+    contadores['status'] = {k: int(n) for k, n in status.value_counts().items()}
+    if 'Maquina' in df.columns:
+        por_maquina = pd.crosstab(df['Maquina'].map(_chave), status)
+        contadores['maquina'] = {maquina: {s: int(n) for s, n in linha.items() if n}
+                                 for maquina, linha in por_maquina.iterrows()}
+    if 'Data' in df.columns:
+        horas = pd.to_datetime(df['Data'], errors='coerce').dt.hour
+        validas = horas.notna()
+        por_hora = pd.crosstab(horas[validas].astype(int).map('{:02d}'.format), status[validas])
+        contadores['hora'] = {hora: {s: int(n) for s, n in linha.items() if n}
+                              for hora, linha in por_hora.iterrows()}
+    return contadores
+
+
+def _somar_status(por_status: dict, status: str, quantidade: int):
+    """Soma no status e remove a chave ao chegar a zero, como em calcular_contadores"""
+    total = por_status.get(status, 0) + quantidade
+    if total > 0:
+        por_status[status] = total
+    else:
+        por_status.pop(status, None)
+
+
+def _somar(contadores: dict, registro: dict, status: str, quantidade: int):
+    _somar_status(contadores['status'], status, quantidade)
+    grupos = [('maquina', _chave(registro.get('Maquina')))]
+    hora = _hora(registro.get('Data'))
+    if hora is not None:
+        grupos.append(('hora', hora))
+    for dimensao, chave in grupos:
+        por_status = contadores[dimensao].setdefault(chave, {})
+        _somar_status(por_status, status, quantidade)
+        if not por_status:
+            del contadores[dimensao][chave]
+
+
+def aplicar_alteracoes(contadores: dict, novos: Iterable[dict] = (),
+                       transicoes: Iterable[Tuple[dict, str]] = ()) -> dict:
+    """
+    Atualiza os contadores com os pedidos criados e as mudanças de status
+    (linha antes da alteração, novo status), sem olhar o restante da tabela
+    """
+    for registro in novos:
+        contadores['total'] += 1
+        _somar(contadores, registro, _chave(registro.get('Status')), 1)
+    for registro, novo_status in transicoes:
+        _somar(contadores, registro, _chave(registro.get('Status')), -1)
+        _somar(contadores, registro, _chave(novo_status), 1)
+    return contadores
+
+
+class ContadoresPedidos:
+    """
+    Contadores pré-agregados do dashboard gerencial (pedidos/contadores.json).
+
+    Totais por status, por máquina e por hora de criação, mantidos de forma incremental
+    a cada gravação do pedidos.xlsx. Cada gravação guarda a assinatura do pedidos.xlsx a
+    que os contadores correspondem; se o arquivo mudou por fora (edição manual, falha entre
+    as duas gravações), a assinatura não confere e os contadores são recalculados.
+    """
+
+    def __init__(self, diretorio_pedidos: str):
+        self.caminho = os.path.join(diretorio_pedidos, ARQUIVO_CONTADORES)
+
+    def carregar(self, assinatura: Optional[tuple]) -> Optional[dict]:
+        """Contadores gravados para o pedidos.xlsx com essa assinatura; None se não houver"""
+        if assinatura is None:
+            return None
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if dados.get('assinatura') != list(assinatura):
+            return None
+        return dados.get('contadores')
+
+    def salvar(self, contadores: dict, assinatura: tuple):
+        """Grava de forma atômica, como o pedidos.xlsx"""
+        fd, temporario = tempfile.mkstemp(prefix='.contadores_', suffix='.json',
+                                          dir=os.path.dirname(self.caminho))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'assinatura': list(assinatura), 'contadores': contadores}, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
@@ -0,0 +1,84 @@
+"""
+Etiquetas 60x30 mm em linguagem nativa de impressora térmica (ZPL e EPL).
+
+Mesmo conteúdo da etiqueta em PDF (_gerar_packlist_pdf) e da pré-visualização,
+mas gerado como texto: um lote de centenas de etiquetas tem poucos KB e vai
+direto para a impressora (PrintManager.print_raw), sem rasterizar PDF.
+"""
+from typing import Dict, List
+
+FORMATOS = ('ZPL', 'EPL')
+
+# 203 dpi = 8 pontos por mm
+PONTOS_POR_MM = 8
+LARGURA = 60 * PONTOS_POR_MM
+ALTURA = 30 * PONTOS_POR_MM
+MARGEM_X = 2 * PONTOS_POR_MM
+# Linha de base de cada linha de texto, como no PDF (6 mm entre linhas a partir do topo)
+LINHAS_Y = [6 * PONTOS_POR_MM * (i + 1) for i in range(4)]
+
+# ZPL: layout gravado uma vez na memória da impressora (^DF) e chamado em cada etiqueta (^XF),
+# que só leva os dados dos campos. Fonte 0 escalável com altura de ~3,5 mm
+ZPL_FORMATO = "R:ETIQPED.ZPL"
+_ZPL_CAMPO = "^FT{x},{y}^A0N,28,24^FN{n}^FS"
+# EPL: fonte 3 (14x24 pontos); A posiciona pelo canto superior esquerdo
+_EPL_ALTURA_FONTE = 24
+_EPL_LINHA = 'A{x},{y},0,3,1,1,N,"{texto}"'
+
+
+def linhas_etiqueta(pedido: Dict) -> List[str]:
+    """As quatro linhas de texto da etiqueta de um pedido"""
+    return [
+        f"{pedido.get('Numero_Pedido', '')} - {pedido.get('Data', '')}",
+        f"Maq: {pedido.get('Maquina', '')}",
+        f"Coord: {pedido.get('Coordenada', '')} - Posto: {pedido.get('Posto', '')}",
+        f"Pag: {pedido.get('Pagoda', '')} - Semi: {pedido.get('Semiacabado', '')}",
+    ]
+
+
+def _escapar_zpl(texto: str) -> str:
+    return texto.replace('_', '_5F').replace('^', '_5E').replace('~', '_7E')
+
+
+def _escapar_epl(texto: str) -> str:
+    return texto.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def gerar_zpl(pedidos: List[Dict]) -> str:
+    """Formato de etiqueta (^DF) seguido de uma etiqueta ZPL (^XA...^XZ) por pedido"""
+    formato = [f"^XA^DF{ZPL_FORMATO}^FS^CI28^PW{LARGURA}^LL{ALTURA}^LH0,0"]
+    formato += [_ZPL_CAMPO.format(x=MARGEM_X, y=y, n=n) for n, y in enumerate(LINHAS_Y, start=1)]
+    formato.append("^XZ")
+    etiquetas = ["\n".join(formato)]
+    for pedido in pedidos:
+        # ^FH permite escapar ^ e ~ no texto
+        campos = "".join(
+            f"^FN{n}^FH_^FD{_escapar_zpl(texto)}^FS" for n, texto in enumerate(linhas_etiqueta(pedido), start=1)
+        )
+        etiquetas.append(f"^XA^XF{ZPL_FORMATO}^FS^CI28{campos}^XZ")
+    return "\n".join(etiquetas) + "\n"
+
+
+def gerar_epl(pedidos: List[Dict]) -> str:
+    """Configuração da mídia seguida de uma etiqueta EPL2 (N...P1) por pedido"""
+    linhas = ["I8,A,001", f"q{LARGURA}", f"Q{ALTURA},24"]
+    for pedido in pedidos:
+        linhas.append("N")
+        linhas += [
+            _EPL_LINHA.format(x=MARGEM_X, y=y - _EPL_ALTURA_FONTE, texto=_escapar_epl(texto))
+            for y, texto in zip(LINHAS_Y, linhas_etiqueta(pedido))
+        ]
+        linhas.append("P1")
+    return "\n".join(linhas) + "\n"
+
+
+def gerar_etiquetas(pedidos: List[Dict], formato: str) -> bytes:
+    """Etiquetas no formato indicado, já codificadas para envio à impressora"""
+    formato = formato.upper()
+    if formato == 'ZPL':
+        # ^CI28: texto em UTF-8
+        return gerar_zpl(pedidos).encode('utf-8')
+    if formato == 'EPL':
+        # I8,A: página de código Windows-1252
+        return gerar_epl(pedidos).encode('cp1252', errors='replace')
+    raise ValueError(f"Formato de etiqueta não suportado: {formato}")
@@ -0,0 +1,315 @@
+"""
+Substituto em memória do gspread para testes de carga e de regressão sem planilha real.
+
+Implementa o subconjunto da API Client/Spreadsheet/Worksheet usado pelo projeto, com
+latência configurável, limite de requisições por minuto (como a cota do Google Sheets),
+injeção de erros 429 e contagem de chamadas.
+
+Uso:
+    cliente = FakeGspreadClient(latencia=0.08, escritas_por_minuto=60)
+    planilha = cliente.criar_planilha(URL)
+    planilha.carregar_aba("paco", [cabecalho] + linhas)
+
+    sync = SheetsPedidosSync(enable_sheets=False)
+    sync.client, sync.SPREADSHEET_URL = cliente, URL
+    ...
+    print(cliente.resumo())
+"""
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+# Chamadas que contam na cota de escrita; as demais contam como leitura
+OPERACOES_ESCRITA = {
+    'add_worksheet', 'append_row', 'append_rows', 'update', 'update_cell',
+    'batch_update', 'clear', 'format', 'freeze'
+}
+
+
+class _RespostaErro:
+    """Resposta HTTP mínima para construir o APIError do gspread"""
+
+    def __init__(self, codigo: int, mensagem: str, status: str):
+        self.status_code = codigo
+        self._erro = {'code': codigo, 'message': mensagem, 'status': status}
+        self.text = mensagem
+
+    def json(self):
+        return {'error': self._erro}
+
+
+def _erro_429(mensagem: str) -> APIError:
+    return APIError(_RespostaErro(429, mensagem, 'RESOURCE_EXHAUSTED'))
+
+
+def _numerizar(valor):
+    """Converte texto numérico em int/float, como o get_all_records do gspread"""
+    if not isinstance(valor, str) or not valor.strip():
+        return valor
+    try:
+        return int(valor)
+    except ValueError:
+        try:
+            return float(valor)
+        except ValueError:
+            return valor
+
+
+class FakeGspreadClient:
+    def __init__(self, latencia: float = 0.0, variacao_latencia: float = 0.0,
+                 leituras_por_minuto: Optional[int] = None, escritas_por_minuto: Optional[int] = None,
+                 taxa_429: float = 0.0, semente: Optional[int] = None):
+        """
+        Args:
+            latencia: atraso fixo de cada chamada (segundos)
+            variacao_latencia: atraso adicional aleatório, uniforme em [0, variacao_latencia]
+            leituras_por_minuto / escritas_por_minuto: cota por janela móvel de 60s (None = ilimitada)
+            taxa_429: probabilidade de uma chamada falhar com 429 independentemente da cota
+            semente: semente do gerador aleatório (execuções reproduzíveis)
+        """
+        self.latencia = latencia
+        self.variacao_latencia = variacao_latencia
+        self.leituras_por_minuto = leituras_por_minuto
+        self.escritas_por_minuto = escritas_por_minuto
+        self.taxa_429 = taxa_429
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.RLock()
+        self._planilhas: Dict[str, 'FakeSpreadsheet'] = {}
+        self._janela_leituras = deque()
+        self._janela_escritas = deque()
+        self.zerar_contadores()
+
+    # ----------------------------------------------------------------- contabilidade
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.chamadas = Counter()
+            self.leituras = 0
+            self.escritas = 0
+            self.erros_429 = 0
+            self.tempo_total = 0.0
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                'chamadas': dict(self.chamadas),
+                'total': sum(self.chamadas.values()),
+                'leituras': self.leituras,
+                'escritas': self.escritas,
+                'erros_429': self.erros_429,
+                'tempo_total': round(self.tempo_total, 4)
+            }
+
+    def _consumir_cota(self, janela: deque, limite: Optional[int], agora: float) -> bool:
+        if limite is None:
+            return True
+        while janela and agora - janela[0] >= 60.0:
+            janela.popleft()
+        if len(janela) >= limite:
+            return False
+        janela.append(agora)
+        return True
+
+    def _chamada(self, operacao: str):
+        """Registra uma requisição à API: aplica latência, cota e injeção de 429"""
+        escrita = operacao in OPERACOES_ESCRITA
+        with self._lock:
+            self.chamadas[operacao] += 1
+            if escrita:
+                self.escritas += 1
+            else:
+                self.leituras += 1
+            atraso = self.latencia + (self._aleatorio.uniform(0, self.variacao_latencia)
+                                      if self.variacao_latencia else 0.0)
+            self.tempo_total += atraso
+            agora = time.monotonic()
+            if escrita:
+                dentro_cota = self._consumir_cota(self._janela_escritas, self.escritas_por_minuto, agora)
+            else:
+                dentro_cota = self._consumir_cota(self._janela_leituras, self.leituras_por_minuto, agora)
+            falha_injetada = self.taxa_429 and self._aleatorio.random() < self.taxa_429
+            if not dentro_cota or falha_injetada:
+                self.erros_429 += 1
+        if atraso:
+            time.sleep(atraso)
+        if not dentro_cota:
+            tipo = "Write" if escrita else "Read"
+            raise _erro_429(f"Quota exceeded for quota metric '{tipo} requests' and limit "
+                            f"'{tipo} requests per minute per user'")
+        if falha_injetada:
+            raise _erro_429("Quota exceeded (429 injetado)")
+
+    # ----------------------------------------------------------------- API do gspread
+
+    def criar_planilha(self, url: str) -> 'FakeSpreadsheet':
+        """Cria (ou retorna) a planilha do URL sem contar como chamada"""
+        with self._lock:
+            if url not in self._planilhas:
+                self._planilhas[url] = FakeSpreadsheet(self, url)
+            return self._planilhas[url]
+
+    def open_by_url(self, url: str) -> 'FakeSpreadsheet':
+        self._chamada('open_by_url')
+        with self._lock:
+            if url not in self._planilhas:
+                raise SpreadsheetNotFound(url)
+            return self._planilhas[url]
+
+
+class FakeSpreadsheet:
+    def __init__(self, cliente: FakeGspreadClient, url: str):
+        self.cliente = cliente
+        self.url = url
+        self._abas: Dict[str, 'FakeWorksheet'] = {}
+
+    def carregar_aba(self, titulo: str, valores: List[list]) -> 'FakeWorksheet':
+        """Cria a aba com os valores informados sem contar como chamada (preparação do cenário)"""
+        with self.cliente._lock:
+            aba = self._abas.get(titulo) or FakeWorksheet(self, titulo, len(valores) + 100, 26)
+            aba._linhas = [[str(v) for v in linha] for linha in valores]
+            self._abas[titulo] = aba
+            return aba
+
+    def worksheet(self, titulo: str) -> 'FakeWorksheet':
+        self.cliente._chamada('worksheet')
+        with self.cliente._lock:
+            if titulo not in self._abas:
+                raise WorksheetNotFound(titulo)
+            return self._abas[titulo]
+
+    def worksheets(self) -> List['FakeWorksheet']:
+        self.cliente._chamada('worksheets')
+        with self.cliente._lock:
+            return list(self._abas.values())
+
+    def add_worksheet(self, title: str, rows: int = 100, cols: int = 26, **kwargs) -> 'FakeWorksheet':
+        self.cliente._chamada('add_worksheet')
+        with self.cliente._lock:
+            if title in self._abas:
+                raise APIError(_RespostaErro(400, f'A sheet with the name "{title}" already exists.',
+                                             'INVALID_ARGUMENT'))
+            self._abas[title] = FakeWorksheet(self, title, rows, cols)
+            return self._abas[title]
+
+
+class FakeWorksheet:
+    def __init__(self, planilha: FakeSpreadsheet, titulo: str, rows: int, cols: int):
+        self.spreadsheet = planilha
+        self.title = titulo
+        self.row_count = rows
+        self.col_count = cols
+        self.linhas_congeladas = 0
+        self.formatos = {}
+        self._linhas: List[List[str]] = []
+
+    def _chamada(self, operacao: str):
+        self.spreadsheet.cliente._chamada(operacao)
+
+    @property
+    def _lock(self):
+        return self.spreadsheet.cliente._lock
+
+    def _gravar(self, linha: int, coluna: int, valores: List[list]):
+        """Escreve o bloco de valores a partir de (linha, coluna), ambos a partir de 1"""
+        for i, linha_valores in enumerate(valores):
+            indice = linha - 1 + i
+            while len(self._linhas) <= indice:
+                self._linhas.append([])
+            atual = self._linhas[indice]
+            for j, valor in enumerate(linha_valores):
+                posicao = coluna - 1 + j
+                while len(atual) <= posicao:
+                    atual.append("")
+                atual[posicao] = "" if valor is None else str(valor)
+        self.row_count = max(self.row_count, len(self._linhas))
+
+    # Leitura
+
+    def get_all_values(self) -> List[List[str]]:
+        self._chamada('get_all_values')
+        with self._lock:
+            largura = max((len(l) for l in self._linhas), default=0)
+            return [l + [""] * (largura - len(l)) for l in self._linhas]
+
+    def get_all_records(self, **kwargs) -> List[dict]:
+        self._chamada('get_all_records')
+        with self._lock:
+            if not self._linhas:
+                return []
+            cabecalho = self._linhas[0]
+            return [
+                {c: _numerizar(l[i] if i < len(l) else "") for i, c in enumerate(cabecalho)}
+                for l in self._linhas[1:]
+            ]
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self._chamada('row_values')
+        with self._lock:
+            if row > len(self._linhas):
+                return []
+            linha = list(self._linhas[row - 1])
+            while linha and linha[-1] == "":
+                linha.pop()
+            return linha
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self._chamada('col_values')
+        with self._lock:
+            valores = [l[col - 1] if col - 1 < len(l) else "" for l in self._linhas]
+            while valores and valores[-1] == "":
+                valores.pop()
+            return valores
+
+    # Escrita
+
+    def append_row(self, values: list, value_input_option: str = "RAW", **kwargs):
+        self._chamada('append_row')
+        with self._lock:
+            self._gravar(len(self._linhas) + 1, 1, [values])
+
+    def append_rows(self, values: List[list], value_input_option: str = "RAW", **kwargs):
+        self._chamada('append_rows')
+        with self._lock:
+            self._gravar(len(self._linhas) + 1, 1, values)
+
+    def update(self, values=None, range_name=None, **kwargs):
+        # Aceita a ordem antiga update('A1', [[...]]) e a nova update([[...]], 'A1')
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self._chamada('update')
+        linha, coluna = a1_to_rowcol((range_name or 'A1').split(':')[0])
+        with self._lock:
+            self._gravar(linha, coluna, values or [])
+
+    def update_cell(self, row: int, col: int, value):
+        self._chamada('update_cell')
+        with self._lock:
+            self._gravar(row, col, [[value]])
+
+    def batch_update(self, data: List[dict], **kwargs):
+        self._chamada('batch_update')
+        with self._lock:
+            for bloco in data:
+                linha, coluna = a1_to_rowcol(bloco['range'].split(':')[0])
+                self._gravar(linha, coluna, bloco['values'])
+
+    def clear(self):
+        self._chamada('clear')
+        with self._lock:
+            self._linhas = []
+
+    def format(self, ranges, format: dict, **kwargs):
+        self._chamada('format')
+        with self._lock:
+            self.formatos[str(ranges)] = format
+
+    def freeze(self, rows: Optional[int] = None, cols: Optional[int] = None):
+        self._chamada('freeze')
+        with self._lock:
+            if rows is not None:
+                self.linhas_congeladas = rows
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import threading
+from typing import Optional
+
+if sys.platform == "win32":
+    import msvcrt  # Para Windows
+else:
+    import fcntl
+
+# Locks de thread por arquivo: os locks de arquivo do SO valem por processo,
+# então threads do mesmo processo (ex.: sessões do Streamlit) precisam de um lock próprio.
+_locks_thread = {}
+_locks_thread_guard = threading.Lock()
+
+
+def _lock_thread(caminho: str) -> threading.Lock:
+    with _locks_thread_guard:
+        if caminho not in _locks_thread:
+            _locks_thread[caminho] = threading.Lock()
+        return _locks_thread[caminho]
+
+
+class FileLockTimeout(TimeoutError):
+    pass
+
+
+class FileLock:
+    """
+    Lock exclusivo entre processos baseado em um arquivo '.lock'.
+
+    Uso:
+        with FileLock("pedidos/pedidos.xlsx.lock", timeout=10):
+            ...
+    """
+
+    def __init__(self, caminho_lock: str, timeout: float = 10.0, intervalo: float = 0.05):
+        self.caminho_lock = os.path.abspath(caminho_lock)
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self.tempo_espera = 0.0  # Tempo gasto esperando o último acquire (segundos)
+        self._fd: Optional[int] = None
+        self._lock_thread = _lock_thread(self.caminho_lock)
+
+    def _tentar_travar(self) -> bool:
+        try:
+            if sys.platform == "win32":
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        inicio = time.perf_counter()
+        if not self._lock_thread.acquire(timeout=self.timeout):
+            raise FileLockTimeout(f"Tempo esgotado aguardando o lock: {self.caminho_lock}")
+        try:
+            os.makedirs(os.path.dirname(self.caminho_lock), exist_ok=True)
+            self._fd = os.open(self.caminho_lock, os.O_RDWR | os.O_CREAT, 0o644)
+            while not self._tentar_travar():
+                if time.perf_counter() - inicio >= self.timeout:
+                    raise FileLockTimeout(f"Tempo esgotado aguardando o lock: {self.caminho_lock}")
+                time.sleep(self.intervalo)
+        except BaseException:
+            self._fechar()
+            self._lock_thread.release()
+            raise
+        self.tempo_espera = time.perf_counter() - inicio
+
+    def release(self):
+        try:
+            if self._fd is not None:
+                if sys.platform == "win32":
+                    try:
+                        os.lseek(self._fd, 0, os.SEEK_SET)
+                        msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+                    except OSError:
+                        pass
+                else:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._fechar()
+            self._lock_thread.release()
+
+    def _fechar(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,97 @@
+"""
+Índices em memória sobre o DataFrame de pedidos, usados por PedidoController.buscar_pedidos.
+
+Cada filtro vira um conjunto de posições (grupos por valor para número, status e
+máquina; busca binária nas datas ordenadas para o intervalo de dias; horário do
+dia em nanossegundos para a janela de horas). As posições são cruzadas e as
+linhas saem com uma única cópia no fim, sem DataFrames intermediários.
+Montado uma vez por snapshot do pedidos.xlsx.
+"""
+from datetime import date, time, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_INDEXADAS = ("Numero_Pedido", "Status", "Maquina")
+
+_NS_POR_DIA = 86_400_000_000_000
+
+
+def _ns_do_horario(horario: time) -> int:
+    return ((horario.hour * 60 + horario.minute) * 60 + horario.second) * 1_000_000_000 + horario.microsecond * 1000
+
+
+class IndicePedidos:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._grupos: Dict[str, Dict] = {}
+        for coluna in COLUNAS_INDEXADAS:
+            if coluna in df.columns:
+                self._grupos[coluna] = df.groupby(coluna, sort=False).indices
+
+        self._ordem_datas = None
+        if 'Data' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Data']):
+            datas_ns = df['Data'].to_numpy(dtype='datetime64[ns]').view('int64')
+            validas = ~df['Data'].isna().to_numpy()
+            # Posições com data, em ordem de data (estável), e os valores correspondentes para busca binária
+            self._ordem_datas = np.flatnonzero(validas)[np.argsort(datas_ns[validas], kind='stable')]
+            self._datas_ordenadas = datas_ns[self._ordem_datas]
+            # Horário do dia de cada pedido (-1 sem data)
+            self._horarios = np.where(validas, datas_ns % _NS_POR_DIA, -1)
+
+    def _posicoes_valor(self, coluna: str, valor) -> np.ndarray:
+        grupos = self._grupos.get(coluna)
+        if grupos is None:
+            raise KeyError(coluna)
+        return grupos.get(valor, np.empty(0, dtype=np.intp))
+
+    def _posicoes_datas(self, data_inicial: Optional[date], data_final: Optional[date]) -> np.ndarray:
+        if self._ordem_datas is None:
+            raise KeyError('Data')
+        inicio = 0
+        fim = len(self._datas_ordenadas)
+        if data_inicial is not None:
+            limite = pd.Timestamp(data_inicial).as_unit('ns').value
+            inicio = np.searchsorted(self._datas_ordenadas, limite, side='left')
+        if data_final is not None:
+            limite = pd.Timestamp(data_final + timedelta(days=1)).as_unit('ns').value
+            fim = np.searchsorted(self._datas_ordenadas, limite, side='left')
+        return self._ordem_datas[inicio:fim]
+
+    def posicoes(self, numero_pedido: Optional[str] = None, status: Optional[str] = None,
+                 maquina: Optional[str] = None, data_inicial: Optional[date] = None,
+                 data_final: Optional[date] = None, hora_inicial: Optional[time] = None,
+                 hora_final: Optional[time] = None) -> Optional[np.ndarray]:
+        """Posições (ordem do arquivo) que atendem a todos os filtros; None se não há filtro"""
+        conjuntos = []
+        for coluna, valor in (("Numero_Pedido", numero_pedido), ("Status", status), ("Maquina", maquina)):
+            if valor:
+                conjuntos.append(self._posicoes_valor(coluna, valor))
+        if data_inicial is not None or data_final is not None:
+            conjuntos.append(self._posicoes_datas(data_inicial, data_final))
+
+        if not conjuntos and hora_inicial is None and hora_final is None:
+            return None
+        # Começa pelo conjunto mais seletivo
+        conjuntos.sort(key=len)
+        posicoes = np.sort(conjuntos[0]) if conjuntos else np.arange(len(self.df))
+        for outro in conjuntos[1:]:
+            if not len(posicoes):
+                break
+            posicoes = posicoes[np.isin(posicoes, outro, assume_unique=True)]
+
+        if hora_inicial is not None or hora_final is not None:
+            if self._ordem_datas is None:
+                raise KeyError('Data')
+            horarios = self._horarios[posicoes]
+            mascara = horarios >= (_ns_do_horario(hora_inicial) if hora_inicial is not None else 0)
+            if hora_final is not None:
+                mascara &= horarios <= _ns_do_horario(hora_final)
+            posicoes = posicoes[mascara]
+        return posicoes
+
+    def filtrar(self, **filtros) -> pd.DataFrame:
+        """Linhas que atendem aos filtros, em um DataFrame novo (pode ser alterado)"""
+        posicoes = self.posicoes(**filtros)
+        return self.df.copy() if posicoes is None else self.df.take(posicoes)
@@ -0,0 +1,381 @@
+"""
+Instrumentação leve: contadores e histogramas de duração em memória.
+
+Ativada com PEDIDOS_METRICAS=1. Desativada, os decoradores devolvem a própria
+função e o cliente do gspread não é envolvido (custo zero nas chamadas).
+
+Exposição:
+    - texto no formato Prometheus (texto_prometheus), servido em GET /metrics pelo servico_pedidos
+    - linha de log periódica (PEDIDOS_METRICAS_LOG=<segundos>)
+    - instantaneo() para a tela de Configurações
+"""
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("pedidos.metricas")
+
+ATIVO = os.getenv("PEDIDOS_METRICAS", "0").strip().lower() in ("1", "true", "sim")
+
+# Limites dos buckets dos histogramas de duração (segundos)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Amostras recentes guardadas por série para calcular percentis
+TAMANHO_AMOSTRA = 512
+# Cota do Google Sheets por minuto e por usuário (ajustável conforme o projeto no Google Cloud)
+COTA_LEITURAS_MINUTO = int(os.getenv("PEDIDOS_COTA_LEITURAS_MINUTO", "60"))
+COTA_ESCRITAS_MINUTO = int(os.getenv("PEDIDOS_COTA_ESCRITAS_MINUTO", "60"))
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+
+def _rotulos(rotulos: dict) -> Rotulos:
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Histograma:
+    __slots__ = ('contagens', 'soma', 'total', 'recentes')
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self.recentes = deque(maxlen=TAMANHO_AMOSTRA)
+
+    def observar(self, valor: float):
+        self.contagens[bisect.bisect_left(BUCKETS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+        self.recentes.append(valor)
+
+    def percentil(self, p: float) -> float:
+        if not self.recentes:
+            return 0.0
+        ordenados = sorted(self.recentes)
+        return ordenados[min(int(p * len(ordenados)), len(ordenados) - 1)]
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[Tuple[str, Rotulos], float] = {}
+        self._histogramas: Dict[Tuple[str, Rotulos], _Histograma] = {}
+        self._medidores: Dict[Tuple[str, Rotulos], float] = {}
+        self._descricoes: Dict[str, str] = {}
+
+    def descrever(self, nome: str, descricao: str):
+        self._descricoes[nome] = descricao
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def definir(self, nome: str, valor: float, **rotulos):
+        """Valor instantâneo (ex.: tamanho de fila)"""
+        with self._lock:
+            self._medidores[(nome, _rotulos(rotulos))] = valor
+
+    def observar(self, nome: str, valor: float, **rotulos):
+        chave = (nome, _rotulos(rotulos))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = _Histograma()
+            histograma.observar(valor)
+
+    def zerar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+            self._medidores.clear()
+
+    def instantaneo(self) -> dict:
+        """Cópia dos valores atuais: contadores, medidores e, por histograma, total, soma, p50, p95 e máximo recente"""
+        with self._lock:
+            contadores = [
+                {'nome': nome, 'rotulos': dict(rotulos), 'valor': valor}
+                for (nome, rotulos), valor in self._contadores.items()
+            ]
+            medidores = [
+                {'nome': nome, 'rotulos': dict(rotulos), 'valor': valor}
+                for (nome, rotulos), valor in self._medidores.items()
+            ]
+            histogramas = [
+                {'nome': nome, 'rotulos': dict(rotulos), 'total': h.total, 'soma': h.soma,
+                 'p50': h.percentil(0.50), 'p95': h.percentil(0.95), 'max': max(h.recentes, default=0.0)}
+                for (nome, rotulos), h in self._histogramas.items()
+            ]
+        return {'contadores': contadores, 'medidores': medidores, 'histogramas': histogramas}
+
+    def texto_prometheus(self) -> str:
+        def formatar(rotulos: Rotulos, extra: Optional[Tuple[str, str]] = None) -> str:
+            itens = list(rotulos) + ([extra] if extra else [])
+            if not itens:
+                return ""
+            return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in itens) + "}"
+
+        linhas = []
+        with self._lock:
+            vistos = set()
+            for tipo, valores in (('counter', self._contadores), ('gauge', self._medidores)):
+                for (nome, rotulos), valor in sorted(valores.items()):
+                    if nome not in vistos:
+                        vistos.add(nome)
+                        if nome in self._descricoes:
+                            linhas.append(f"# HELP {nome} {self._descricoes[nome]}")
+                        linhas.append(f"# TYPE {nome} {tipo}")
+                    linhas.append(f"{nome}{formatar(rotulos)} {valor:g}")
+            for (nome, rotulos), h in sorted(self._histogramas.items()):
+                if nome not in vistos:
+                    vistos.add(nome)
+                    if nome in self._descricoes:
+                        linhas.append(f"# HELP {nome} {self._descricoes[nome]}")
+                    linhas.append(f"# TYPE {nome} histogram")
+                acumulado = 0
+                for limite, contagem in zip(BUCKETS + (float('inf'),), h.contagens):
+                    acumulado += contagem
+                    le = "+Inf" if limite == float('inf') else f"{limite:g}"
+                    linhas.append(f"{nome}_bucket{formatar(rotulos, ('le', le))} {acumulado}")
+                linhas.append(f"{nome}_sum{formatar(rotulos)} {h.soma:.6f}")
+                linhas.append(f"{nome}_count{formatar(rotulos)} {h.total}")
+        return "\n".join(linhas) + "\n"
+
+    def linha_resumo(self) -> str:
+        """Resumo de uma linha: total, p95 e soma por operação"""
+        partes = []
+        for h in sorted(self.instantaneo()['histogramas'], key=lambda h: -h['soma']):
+            rotulo = h['rotulos'].get('operacao', h['nome'])
+            if h['nome'].startswith('pedidos_sheets_'):
+                rotulo = f"sheets.{rotulo}"
+            partes.append(f"{rotulo} n={h['total']} p95={h['p95'] * 1000:.0f}ms soma={h['soma']:.1f}s")
+        return "; ".join(partes) or "sem medições"
+
+
+metricas = RegistroMetricas()
+metricas.descrever("pedidos_operacao_segundos", "Duração das operações do controlador e das telas")
+metricas.descrever("pedidos_sheets_requisicao_segundos", "Duração de cada chamada ao Google Sheets")
+metricas.descrever("pedidos_sheets_requisicoes_total", "Chamadas ao Google Sheets")
+metricas.descrever("pedidos_sheets_linhas_lidas_total", "Linhas/valores lidos do Google Sheets")
+metricas.descrever("pedidos_sheets_linhas_escritas_total", "Linhas/valores enviados ao Google Sheets")
+metricas.descrever("pedidos_sheets_bytes_enviados_total", "Bytes (JSON) enviados ao Google Sheets")
+metricas.descrever("pedidos_sheets_erros_total", "Chamadas ao Google Sheets que falharam")
+metricas.descrever("pedidos_sheets_erros_429_total", "Chamadas recusadas por cota (HTTP 429)")
+metricas.descrever("pedidos_sheets_retentativas_total", "Novas tentativas de sincronização com o Google Sheets")
+metricas.descrever("pedidos_fila_sheets", "Alterações aguardando envio ao Google Sheets")
+metricas.descrever("pedidos_cache_total", "Consultas a caches internos por resultado (acerto/falha)")
+metricas.descrever("pedidos_rerun_segundos", "Duração de cada rerun do app Streamlit")
+
+# Reruns recentes do Streamlit (momento, tela, duração) e requisições ao Sheets do último minuto
+_reruns = deque(maxlen=200)
+_requisicoes_sheets = deque(maxlen=10000)
+_janelas_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------- operações
+
+def cronometrado(operacao: Optional[str] = None):
+    """
+    Decorador que registra a duração da função em pedidos_operacao_segundos.
+    Com a instrumentação desativada devolve a própria função.
+    """
+    def decorador(funcao):
+        if not ATIVO:
+            return funcao
+        nome = operacao or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                metricas.observar("pedidos_operacao_segundos", time.perf_counter() - inicio, operacao=nome)
+        return envolvida
+    return decorador
+
+
+@contextmanager
+def medir(operacao: str):
+    """Bloco cronometrado: with medir('historico.tabela'): ..."""
+    if not ATIVO:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas.observar("pedidos_operacao_segundos", time.perf_counter() - inicio, operacao=operacao)
+
+
+def incrementar(nome: str, valor: float = 1, **rotulos):
+    if ATIVO:
+        metricas.incrementar(nome, valor, **rotulos)
+
+
+def definir(nome: str, valor: float, **rotulos):
+    if ATIVO:
+        metricas.definir(nome, valor, **rotulos)
+
+
+def registrar_cache(cache: str, acerto: bool):
+    """Conta uma consulta a um cache interno (para a taxa de acerto)"""
+    if ATIVO:
+        metricas.incrementar("pedidos_cache_total", cache=cache, resultado="acerto" if acerto else "falha")
+
+
+def taxas_acerto_cache() -> Dict[str, dict]:
+    """{cache: {'acertos', 'falhas', 'taxa'}}"""
+    caches = {}
+    for c in metricas.instantaneo()['contadores']:
+        if c['nome'] == "pedidos_cache_total":
+            dados = caches.setdefault(c['rotulos'].get('cache', ''), {'acertos': 0, 'falhas': 0})
+            dados['acertos' if c['rotulos'].get('resultado') == 'acerto' else 'falhas'] += c['valor']
+    for dados in caches.values():
+        total = dados['acertos'] + dados['falhas']
+        dados['taxa'] = dados['acertos'] / total if total else 0.0
+    return caches
+
+
+def registrar_rerun(duracao: float, tela: str):
+    """Registra a duração de um rerun completo do app Streamlit"""
+    if not ATIVO:
+        return
+    metricas.observar("pedidos_rerun_segundos", duracao, tela=tela)
+    with _janelas_lock:
+        _reruns.append({'momento': time.time(), 'tela': tela, 'duracao': duracao})
+
+
+def reruns_mais_lentos(quantidade: int = 10) -> list:
+    """Os reruns mais lentos entre os 200 mais recentes"""
+    with _janelas_lock:
+        reruns = list(_reruns)
+    return sorted(reruns, key=lambda r: -r['duracao'])[:quantidade]
+
+
+def requisicoes_sheets_ultimo_minuto() -> dict:
+    """Requisições ao Google Sheets nos últimos 60s, separadas em leitura e escrita"""
+    limite = time.monotonic() - 60.0
+    with _janelas_lock:
+        while _requisicoes_sheets and _requisicoes_sheets[0][0] < limite:
+            _requisicoes_sheets.popleft()
+        escritas = sum(1 for _, escrita in _requisicoes_sheets if escrita)
+        return {'leituras': len(_requisicoes_sheets) - escritas, 'escritas': escritas}
+
+
+# --------------------------------------------------------------------- Google Sheets
+
+# Métodos do gspread que representam uma requisição à API
+_LEITURAS = {'open_by_url', 'open_by_key', 'open', 'worksheet', 'worksheets',
+             'get_all_records', 'get_all_values', 'row_values', 'col_values', 'get', 'batch_get'}
+_ESCRITAS = {'add_worksheet', 'append_row', 'append_rows', 'update', 'update_cell', 'batch_update',
+             'clear', 'format', 'freeze', 'delete_rows'}
+
+
+def _quantidade_escrita(metodo: str, args, kwargs) -> Tuple[int, int]:
+    """(linhas, bytes) enviados por uma chamada de escrita"""
+    if metodo in ('append_row', 'update_cell'):
+        valores = args[:3] if metodo == 'update_cell' else (args[0] if args else kwargs.get('values'))
+        return 1, len(json.dumps(valores, default=str))
+    if metodo in ('append_rows', 'update', 'batch_update'):
+        valores = kwargs.get('values')
+        if valores is None:
+            valores = next((a for a in args if isinstance(a, list)), [])
+        return len(valores), len(json.dumps(valores, default=str))
+    return 0, 0
+
+
+def _quantidade_lida(resultado) -> int:
+    return len(resultado) if isinstance(resultado, list) else 0
+
+
+class _ProxyInstrumentado:
+    """Envolve um objeto do gspread registrando cada chamada à API"""
+
+    def __init__(self, alvo, tipo: str):
+        object.__setattr__(self, '_alvo', alvo)
+        object.__setattr__(self, '_tipo', tipo)
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._alvo, nome)
+        if not callable(atributo) or nome not in _LEITURAS | _ESCRITAS:
+            return atributo
+
+        @functools.wraps(atributo)
+        def chamada(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = atributo(*args, **kwargs)
+            except Exception as e:
+                metricas.incrementar("pedidos_sheets_erros_total", operacao=nome)
+                if getattr(e, 'code', None) == 429 or '429' in str(e) or 'Quota exceeded' in str(e):
+                    metricas.incrementar("pedidos_sheets_erros_429_total", operacao=nome)
+                raise
+            finally:
+                metricas.observar("pedidos_sheets_requisicao_segundos", time.perf_counter() - inicio, operacao=nome)
+                metricas.incrementar("pedidos_sheets_requisicoes_total", operacao=nome)
+                with _janelas_lock:
+                    _requisicoes_sheets.append((time.monotonic(), nome in _ESCRITAS))
+            if nome in _ESCRITAS:
+                linhas, tamanho = _quantidade_escrita(nome, args, kwargs)
+                metricas.incrementar("pedidos_sheets_linhas_escritas_total", linhas, operacao=nome)
+                metricas.incrementar("pedidos_sheets_bytes_enviados_total", tamanho, operacao=nome)
+            else:
+                metricas.incrementar("pedidos_sheets_linhas_lidas_total", _quantidade_lida(resultado), operacao=nome)
+            # Planilhas e abas retornadas também são instrumentadas
+            if nome in ('open_by_url', 'open_by_key', 'open'):
+                return _ProxyInstrumentado(resultado, 'planilha')
+            if nome in ('worksheet', 'add_worksheet'):
+                return _ProxyInstrumentado(resultado, 'aba')
+            if nome == 'worksheets':
+                return [_ProxyInstrumentado(r, 'aba') for r in resultado]
+            return resultado
+        return chamada
+
+    def __setattr__(self, nome, valor):
+        setattr(self._alvo, nome, valor)
+
+    def __repr__(self):
+        return f"<{self._tipo} instrumentado {self._alvo!r}>"
+
+
+def instrumentar_cliente(cliente):
+    """Envolve o cliente do gspread quando a instrumentação está ativa"""
+    if not ATIVO or cliente is None or isinstance(cliente, _ProxyInstrumentado):
+        return cliente
+    return _ProxyInstrumentado(cliente, 'cliente')
+
+
+# --------------------------------------------------------------------- log periódico
+
+_log_iniciado = False
+_log_lock = threading.Lock()
+
+
+def iniciar_log_periodico(intervalo: Optional[float] = None):
+    """Inicia (uma vez por processo) a thread que registra o resumo das métricas a cada 'intervalo' segundos"""
+    global _log_iniciado
+    intervalo = intervalo if intervalo is not None else float(os.getenv("PEDIDOS_METRICAS_LOG", "0") or 0)
+    if not ATIVO or intervalo <= 0:
+        return
+    with _log_lock:
+        if _log_iniciado:
+            return
+        _log_iniciado = True
+
+    def executar():
+        while True:
+            time.sleep(intervalo)
+            logger.info("métricas: %s", metricas.linha_resumo())
+
+    threading.Thread(target=executar, name="log-metricas", daemon=True).start()
@@ -0,0 +1,112 @@
+"""
+Modelos de layout para PDFs em lote (etiquetas).
+
+A parte fixa do layout (rótulos, fontes e posições) é desenhada uma
+única vez por documento como form XObject do ReportLab, e os operadores de
+texto dos campos variáveis também são montados nessa hora. Cada pedido só
+"carimba" o formulário (uma referência, sem repetir o conteúdo) e preenche os
+valores, sem medir texto nem trocar fonte de novo.
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+from reportlab import rl_config
+from reportlab.lib.rl_accel import escapePDF
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+_rl_config_lock = threading.Lock()
+
+
+def salvar_sem_ascii85(c):
+    """
+    c.save() com streams só comprimidos: o ASCII85 por cima do zlib deixa o PDF ~25% maior
+    e, sem a extensão C do ReportLab, custa mais que o desenho das páginas. O ReportLab só
+    tem a opção global (lida ao montar os streams, no save), então ela vale apenas durante
+    este save e volta ao valor anterior.
+    """
+    with _rl_config_lock:
+        anterior = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            c.save()
+        finally:
+            rl_config.useA85 = anterior
+
+
+@dataclass
+class Campo:
+    """Posição e fonte de um valor variável"""
+    x: float
+    y: float
+    fonte: str
+    tamanho: float
+
+
+@dataclass
+class ModeloCompilado:
+    """Modelo já registrado em um documento; carimbar() desenha uma ocorrência"""
+    nome: str
+    operadores: str  # texto dos campos com um {} por valor
+
+    def carimbar(self, c, valores: Sequence[str], dx: float = 0, dy: float = 0):
+        """Desenha o formulário deslocado de (dx, dy) com os valores, na ordem dos campos"""
+        if dx or dy:
+            c.saveState()
+            c.translate(dx, dy)
+        c.doForm(self.nome)
+        # Fontes padrão do PDF usam WinAnsi (cp1252), como o ReportLab faz no drawString
+        c.addLiteral(self.operadores.format(*(escapePDF(str(v).encode('cp1252', 'replace')) for v in valores)))
+        if dx or dy:
+            c.restoreState()
+
+
+@dataclass
+class ModeloPDF:
+    nome: str
+    largura: float
+    altura: float
+    textos: List[Tuple[float, float, str, str, float]] = field(default_factory=list)
+    campos: List[Campo] = field(default_factory=list)
+
+    def texto(self, x: float, y: float, texto: str, fonte: str = "Helvetica", tamanho: float = 8) -> float:
+        """Texto fixo; retorna o x logo depois dele (onde começa o valor)"""
+        if texto:
+            self.textos.append((x, y, texto, fonte, tamanho))
+        return x + stringWidth(texto, fonte, tamanho)
+
+    def campo(self, x: float, y: float, fonte: str = "Helvetica", tamanho: float = 8):
+        self.campos.append(Campo(x, y, fonte, tamanho))
+
+    def rotulo_e_campo(self, x: float, y: float, rotulo: str, fonte: str = "Helvetica", tamanho: float = 8):
+        """Rótulo fixo seguido do campo variável na mesma linha"""
+        self.campo(self.texto(x, y, rotulo, fonte, tamanho), y, fonte, tamanho)
+
+    def compilar(self, c) -> ModeloCompilado:
+        """Registra o form XObject no documento do canvas (uma vez por documento)"""
+        c.beginForm(self.nome, 0, 0, self.largura, self.altura)
+        if self.textos:
+            c.drawText(self._texto(c, [(x, y, fonte, tamanho, conteudo)
+                                       for x, y, conteudo, fonte, tamanho in self.textos]))
+        c.endForm()
+        # Os valores entram depois no lugar dos {} (chaves não aparecem nos operadores de texto)
+        marcadores = self._texto(c, [(campo.x, campo.y, campo.fonte, campo.tamanho, "{}") for campo in self.campos])
+        return ModeloCompilado(self.nome, marcadores.getCode())
+
+    @staticmethod
+    def _texto(c, itens):
+        """Objeto de texto com cada item na sua posição; Td relativo ao anterior é mais curto que Tm"""
+        texto = c.beginText()
+        fonte_atual = None
+        origem = None
+        for x, y, fonte, tamanho, conteudo in itens:
+            if (fonte, tamanho) != fonte_atual:
+                texto.setFont(fonte, tamanho)
+                fonte_atual = (fonte, tamanho)
+            if origem is None:
+                texto.setTextOrigin(x, y)
+            else:
+                texto.moveCursor(x - origem[0], origem[1] - y)
+            origem = (x, y)
+            texto.textOut(conteudo)
+        return texto
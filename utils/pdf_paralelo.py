@@ -0,0 +1,161 @@
+"""
+Geração em paralelo de PDFs grandes (etiquetas e relatórios de fim de turno).
+
+O lote é dividido em blocos de tamanho fixo; cada bloco vira um PDF completo em
+um processo separado (a serialização do ReportLab/FPDF é a parte mais cara) e
+os PDFs dos blocos são concatenados sem reprocessar as páginas. Como os blocos
+não dependem da quantidade de processos, o resultado é idêntico byte a byte com
+1 ou N processos.
+
+Configuração:
+    PEDIDOS_PDF_BLOCO       itens por bloco (padrão 500); lotes menores são gerados direto
+    PEDIDOS_PDF_PROCESSOS   processos em paralelo (padrão: núcleos da máquina)
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+TAMANHO_BLOCO = int(os.getenv("PEDIDOS_PDF_BLOCO", "500"))
+PROCESSOS = int(os.getenv("PEDIDOS_PDF_PROCESSOS", "0")) or (os.cpu_count() or 1)
+
+_REFERENCIA = re.compile(rb"(\d+) 0 R")
+_INICIO_STREAM = re.compile(rb">>\s*stream\r?\n")
+_ENTRADA_XREF = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+
+
+def renderizar_em_blocos(funcao: Callable[[list], bytes], itens: list, processos: Optional[int] = None,
+                         tamanho_bloco: Optional[int] = None,
+                         funcao_continuacao: Optional[Callable[[list], bytes]] = None) -> bytes:
+    """
+    Gera o PDF de 'itens' com funcao(bloco) -> bytes, em blocos e em paralelo quando o lote é grande.
+
+    funcao_continuacao, se informada, gera os blocos depois do primeiro (ex.: sem o título do relatório).
+    As funções precisam ser de nível de módulo (são enviadas para outros processos).
+    """
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO
+    if len(itens) <= tamanho_bloco:
+        return funcao(itens)
+
+    blocos = [itens[i:i + tamanho_bloco] for i in range(0, len(itens), tamanho_bloco)]
+    funcoes = [funcao] + [funcao_continuacao or funcao] * (len(blocos) - 1)
+    processos = min(processos or PROCESSOS, len(blocos))
+    if processos > 1:
+        # spawn: o app Streamlit tem threads, e fork com threads ativas não é seguro
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            partes = list(executor.map(_executar, funcoes, blocos))
+    else:
+        partes = [f(bloco) for f, bloco in zip(funcoes, blocos)]
+    return concatenar_pdfs(partes)
+
+
+def _executar(funcao: Callable[[list], bytes], bloco: list) -> bytes:
+    return funcao(bloco)
+
+
+# ----------------------------------------------------------------------------- concatenação
+
+def _ler_objetos(pdf: bytes) -> Dict[int, bytes]:
+    """{número: conteúdo entre 'N 0 obj' e 'endobj'} a partir da tabela xref (uma subseção a partir de 0)"""
+    inicio_xref = int(pdf[pdf.rindex(b"startxref") + 9:].split()[0])
+    cabecalho = pdf[inicio_xref:inicio_xref + 64].split()
+    if cabecalho[0] != b"xref" or cabecalho[1] != b"0":
+        raise ValueError("PDF sem tabela xref simples")
+    quantidade = int(cabecalho[2])
+    entradas = _ENTRADA_XREF.findall(pdf, inicio_xref, pdf.index(b"trailer", inicio_xref))[:quantidade]
+    posicoes = sorted((int(pos), numero) for numero, (pos, _, uso) in enumerate(entradas) if uso == b"n")
+    objetos = {}
+    for i, (pos, numero) in enumerate(posicoes):
+        fim = posicoes[i + 1][0] if i + 1 < len(posicoes) else inicio_xref
+        corpo = pdf[pos:fim]
+        corpo = corpo[corpo.index(b"obj") + 3:corpo.rindex(b"endobj")]
+        objetos[numero] = corpo.strip(b"\r\n ") if not _INICIO_STREAM.search(corpo) else corpo.lstrip(b"\r\n ").rstrip()
+    return objetos
+
+
+def _numero_ref(dicionario: bytes, chave: bytes) -> Optional[int]:
+    encontrado = re.search(rb"/" + chave + rb"\s+(\d+) 0 R", dicionario)
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def _paginas(objetos: Dict[int, bytes], numero: int, herdado: Dict[bytes, bytes], saida: list, nos_pages: set):
+    """Percorre a árvore de páginas guardando (página, atributos herdáveis do nó /Pages)"""
+    no = objetos[numero]
+    if re.search(rb"/Type\s*/Pages\b", no):
+        nos_pages.add(numero)
+        herdado = dict(herdado)
+        for chave in (b"MediaBox", b"CropBox", b"Rotate", b"Resources"):
+            valor = re.search(rb"/" + chave + rb"\s*(\[[^\]]*\]|\d+ 0 R|-?\d+)", no)
+            if valor:
+                herdado[chave] = valor.group(1)
+        kids = re.search(rb"/Kids\s*\[([^\]]*)\]", no).group(1)
+        for filho in _REFERENCIA.findall(kids):
+            _paginas(objetos, int(filho), herdado, saida, nos_pages)
+    else:
+        saida.append((numero, herdado))
+
+
+def concatenar_pdfs(partes: List[bytes]) -> bytes:
+    """
+    Junta PDFs gerados pelo próprio sistema (ReportLab/FPDF, sem object streams) em um só,
+    copiando os objetos e renumerando as referências. Catálogo, /Info e nós /Pages de cada
+    parte são descartados e substituídos por uma única árvore de páginas.
+    """
+    saida_objetos: List[bytes] = []
+    paginas_novas: List[int] = []
+    proximo = 3  # 1: catálogo, 2: árvore de páginas
+    for pdf in partes:
+        objetos = _ler_objetos(pdf)
+        trailer = pdf[pdf.rindex(b"trailer"):]
+        catalogo = _numero_ref(trailer, b"Root")
+        descartar = {catalogo, _numero_ref(trailer, b"Info")}
+        paginas: list = []
+        _paginas(objetos, _numero_ref(objetos[catalogo], b"Pages"), {}, paginas, descartar)
+        outlines = _numero_ref(objetos[catalogo], b"Outlines")
+        if outlines is not None:
+            descartar.add(outlines)
+
+        mapa = {}
+        for numero in sorted(objetos):
+            if numero not in descartar:
+                mapa[numero] = proximo
+                proximo += 1
+        herdado_por_pagina = dict(paginas)
+
+        def renumerar(m):
+            return b"%d 0 R" % mapa[int(m.group(1))]
+
+        for numero in sorted(mapa):
+            corpo = objetos[numero]
+            inicio_stream = _INICIO_STREAM.search(corpo)
+            dicionario, resto = (corpo[:inicio_stream.start()], corpo[inicio_stream.start():]) if inicio_stream else (corpo, b"")
+            if numero in herdado_por_pagina:
+                dicionario = re.sub(rb"/Parent\s+\d+ 0 R", b"/Parent 2 0 R", dicionario)
+                # Atributos herdados do nó /Pages descartado passam para a própria página
+                extras = b"".join(b"/%s %s " % (chave, valor) for chave, valor in herdado_por_pagina[numero].items()
+                                  if not re.search(rb"/" + chave + rb"\b", dicionario))
+                dicionario = dicionario.replace(b"<<", b"<<" + extras, 1)
+                paginas_novas.append(mapa[numero])
+            dicionario = re.sub(rb"(?<!/Parent )(\d+) 0 R", renumerar, dicionario)
+            saida_objetos.append((mapa[numero], dicionario + resto))
+
+    cabecalho = partes[0][:partes[0].index(b"\n") + 1] + b"%\xe2\xe3\xcf\xd3\n"
+    kids = b" ".join(b"%d 0 R" % n for n in paginas_novas)
+    todos = [(1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+             (2, b"<< /Type /Pages /Kids [ %s ] /Count %d >>" % (kids, len(paginas_novas)))] + saida_objetos
+
+    pedacos = [cabecalho]
+    posicao = len(cabecalho)
+    posicoes = {}
+    for numero, corpo in todos:
+        objeto = b"%d 0 obj\n%s\nendobj\n" % (numero, corpo)
+        posicoes[numero] = posicao
+        pedacos.append(objeto)
+        posicao += len(objeto)
+    xref = [b"xref\n0 %d\n0000000000 65535 f \n" % (len(todos) + 1)]
+    xref += [b"%010d 00000 n \n" % posicoes[n] for n in range(1, len(todos) + 1)]
+    pedacos.append(b"".join(xref))
+    pedacos.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(todos) + 1, posicao))
+    return b"".join(pedacos)
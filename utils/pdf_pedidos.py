@@ -0,0 +1,90 @@
+"""
+PDFs de etiquetas (60x30 mm) e do relatório de pedidos.
+
+O layout fixo da etiqueta é compilado uma vez por documento (utils/pdf_modelos.py)
+e cada pedido só carimba os valores. As funções de bloco são de nível de módulo
+para poderem rodar em outros processos; lotes grandes são divididos e gerados em
+paralelo (utils/pdf_paralelo.py).
+"""
+from functools import partial
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from fpdf import FPDF
+from reportlab.lib.pagesizes import landscape
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from utils.etiquetas_termicas import linhas_etiqueta
+from utils.pdf_modelos import ModeloPDF, salvar_sem_ascii85
+from utils.pdf_paralelo import renderizar_em_blocos
+
+TITULO_RELATORIO = "Pedidos Recebidos (PENDENTE/PROCESSO)"
+
+# ----------------------------------------------------------------------------- etiqueta 60x30 mm
+
+TAMANHO_ETIQUETA = landscape((60 * mm, 30 * mm))
+# Parte fixa de cada linha de linhas_etiqueta (o resto da linha é o valor carimbado)
+ROTULOS_ETIQUETA = ("", "Maq: ", "Coord: ", "Pag: ")
+
+
+def _modelo_etiqueta() -> ModeloPDF:
+    modelo = ModeloPDF("etiqueta_pedido", *TAMANHO_ETIQUETA)
+    y = TAMANHO_ETIQUETA[1] - 6*mm
+    for rotulo in ROTULOS_ETIQUETA:
+        modelo.rotulo_e_campo(2*mm, y, rotulo)
+        y -= 6*mm
+    return modelo
+
+
+MODELO_ETIQUETA = _modelo_etiqueta()
+
+
+def _packlist_bloco(pedidos: List[Dict]) -> bytes:
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=TAMANHO_ETIQUETA)
+    modelo = MODELO_ETIQUETA.compilar(c)
+    for pedido in pedidos:
+        # Número - Data, Maq, Coord - Posto, Pag - Semi (mesmo texto das etiquetas ZPL/EPL)
+        linhas = linhas_etiqueta(pedido)
+        modelo.carimbar(c, [linha[len(rotulo):] for rotulo, linha in zip(ROTULOS_ETIQUETA, linhas)])
+        c.showPage()
+    salvar_sem_ascii85(c)
+    return buffer.getvalue()
+
+
+# ----------------------------------------------------------------------------- relatório A4
+
+def _relatorio_bloco(registros: List[Dict], titulo: Optional[str] = TITULO_RELATORIO) -> bytes:
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    if titulo:
+        pdf.set_font("Arial", size=12)
+        pdf.cell(0, 10, titulo, ln=True, align="C")
+        pdf.ln(5)
+    for row in registros:
+        pdf.set_font("Arial", size=11)
+        pdf.cell(0, 8, f"Número: {row['Numero_Pedido']}  |  Semiacabado: {row['Semiacabado']}  |  Pagoda: {row['Pagoda']}", ln=True)
+        pdf.set_font("Arial", size=10)
+        pdf.cell(0, 7, f"Posto: {row['Posto']}  |  Coordenada: {row['Coordenada']}  |  Máquina: {row['Maquina']}", ln=True)
+        pdf.cell(0, 7, f"Data: {row['Data']}  |  Serial: {row['Serial']}  |  Modelo: {row['Modelo']}", ln=True)
+        pdf.cell(0, 7, f"Status: {row['Status']}", ln=True)
+        pdf.ln(4)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+        pdf.ln(2)
+    output = pdf.output(dest='S')
+    if isinstance(output, str):
+        return output.encode('latin1')
+    return bytes(output)
+
+
+def gerar_packlist_pdf(pedidos: List[Dict], processos: Optional[int] = None) -> bytes:
+    """Uma página de 60x30 mm por pedido"""
+    return renderizar_em_blocos(_packlist_bloco, pedidos, processos)
+
+
+def gerar_relatorio_pedidos_pdf(registros: List[Dict], processos: Optional[int] = None) -> bytes:
+    """Relatório A4 dos pedidos (título só na primeira página)"""
+    return renderizar_em_blocos(_relatorio_bloco, registros, processos,
+                                funcao_continuacao=partial(_relatorio_bloco, titulo=None))
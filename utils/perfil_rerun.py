@@ -0,0 +1,199 @@
+"""
+Perfil de cada rerun do app Streamlit (opcional).
+
+Ativação: variável PEDIDOS_PERFIL=1 ou parâmetro ?perfil=1 na URL (vale para a sessão).
+Em cada rerun registra o tempo de cada seção das telas e, para os reruns mais
+lentos, grava o perfil completo (cProfile, ou pyinstrument se instalado e
+PEDIDOS_PERFIL_FERRAMENTA=pyinstrument) em PEDIDOS_PERFIL_DIR (padrão: perfil/).
+
+Uso nas telas:
+    with secao("pdf_etiquetas"):         # bloco cronometrado (pode ser aninhado)
+        ...
+    marco("filtros")                     # tempo desde o marco anterior da seção atual
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+
+import streamlit as st
+
+from utils.instrumentacao import medir
+
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+except ImportError:
+    _PyinstrumentProfiler = None
+
+DIRETORIO_PERFIL = os.getenv("PEDIDOS_PERFIL_DIR", os.path.abspath("perfil"))
+# Quantidade de perfis (os reruns mais lentos) mantidos em disco
+MANTER_PERFIS = int(os.getenv("PEDIDOS_PERFIL_MANTER", "5"))
+# Reruns mais rápidos que isso não têm o perfil gravado (segundos)
+LIMITE_GRAVACAO = float(os.getenv("PEDIDOS_PERFIL_LIMITE", "0.5"))
+# Reruns guardados na sessão para exibição
+HISTORICO_SESSAO = 20
+
+_atual = threading.local()
+
+
+class PerfilRerun:
+    def __init__(self, tela: str):
+        self.tela = tela
+        self.momento = datetime.now()
+        self.secoes: List[dict] = []
+        self.total = 0.0
+        self.arquivo = None
+        self._inicio = time.perf_counter()
+        # Pilha de seções abertas: [caminho, início do último marco]
+        self._pilha = [["", self._inicio]]
+        self._profiler = None
+        if os.getenv("PEDIDOS_PERFIL_FERRAMENTA", "cprofile").lower() == "pyinstrument" and _PyinstrumentProfiler:
+            self._profiler = _PyinstrumentProfiler()
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Python 3.12+: só um cProfile ativo por vez (outra sessão já está sendo perfilada)
+                self._profiler = None
+
+    def _registrar(self, caminho: str, duracao: float):
+        self.secoes.append({'secao': caminho, 'duracao': duracao})
+
+    def _caminho(self, nome: str) -> str:
+        return f"{self._pilha[-1][0]}/{nome}" if self._pilha[-1][0] else nome
+
+    def parar(self):
+        self.total = time.perf_counter() - self._inicio
+        if isinstance(self._profiler, cProfile.Profile):
+            self._profiler.disable()
+        elif self._profiler is not None:
+            self._profiler.stop()
+
+    def gravar(self, diretorio: str) -> str:
+        """Grava o perfil e um resumo em texto; retorna o caminho do perfil"""
+        os.makedirs(diretorio, exist_ok=True)
+        base = os.path.join(diretorio, f"rerun_{self.momento.strftime('%Y%m%d_%H%M%S_%f')}_{self.total * 1000:.0f}ms")
+        resumo = [f"Tela: {self.tela}", f"Momento: {self.momento.isoformat()}", f"Total: {self.total * 1000:.1f} ms", ""]
+        resumo += [f"{s['duracao'] * 1000:10.1f} ms  {s['secao']}" for s in self.secoes]
+        if isinstance(self._profiler, cProfile.Profile):
+            caminho = base + ".prof"
+            self._profiler.dump_stats(caminho)
+            saida = io.StringIO()
+            pstats.Stats(self._profiler, stream=saida).sort_stats("cumulative").print_stats(40)
+            resumo += ["", saida.getvalue()]
+        elif self._profiler is None:
+            caminho = base + ".txt"
+        else:
+            caminho = base + ".html"
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(resumo))
+        self.arquivo = caminho
+        return caminho
+
+
+def _perfil_solicitado() -> bool:
+    if os.getenv("PEDIDOS_PERFIL", "0").strip().lower() in ("1", "true", "sim"):
+        return True
+    try:
+        parametro = st.query_params.get("perfil")
+        if parametro is not None:
+            st.session_state["perfil_rerun_ativo"] = parametro in ("1", "true", "sim")
+        return st.session_state.get("perfil_rerun_ativo", False)
+    except Exception:
+        return False
+
+
+def iniciar_rerun(tela: str = "") -> Optional[PerfilRerun]:
+    """Inicia o perfil do rerun atual (None quando o modo perfil está desligado)"""
+    perfil = PerfilRerun(tela) if _perfil_solicitado() else None
+    _atual.perfil = perfil
+    return perfil
+
+
+@contextmanager
+def secao(nome: str):
+    """Cronometra um bloco da tela (também alimenta a instrumentação, se ativa)"""
+    perfil = getattr(_atual, 'perfil', None)
+    with medir(f"tela.{nome}"):
+        if perfil is None:
+            yield
+            return
+        caminho = perfil._caminho(nome)
+        inicio = time.perf_counter()
+        perfil._pilha.append([caminho, inicio])
+        try:
+            yield
+        finally:
+            perfil._pilha.pop()
+            agora = time.perf_counter()
+            perfil._registrar(caminho, agora - inicio)
+            # O tempo da subseção não conta para o próximo marco da seção externa
+            perfil._pilha[-1][1] = agora
+
+
+def marco(nome: str):
+    """Atribui a 'nome' o tempo decorrido desde o marco anterior (ou início) da seção atual"""
+    perfil = getattr(_atual, 'perfil', None)
+    if perfil is None:
+        return
+    agora = time.perf_counter()
+    perfil._registrar(perfil._caminho(nome), agora - perfil._pilha[-1][1])
+    perfil._pilha[-1][1] = agora
+
+
+def _tempo_do_arquivo(nome: str) -> float:
+    encontrado = re.search(r"_(\d+)ms\.txt$", nome)
+    return float(encontrado.group(1)) if encontrado else 0.0
+
+
+def _manter_mais_lentos(diretorio: str):
+    resumos = [n for n in os.listdir(diretorio) if n.startswith("rerun_") and n.endswith(".txt")]
+    for nome in sorted(resumos, key=_tempo_do_arquivo, reverse=True)[MANTER_PERFIS:]:
+        base = os.path.join(diretorio, os.path.splitext(nome)[0])
+        for extensao in (".txt", ".prof", ".html"):
+            if os.path.exists(base + extensao):
+                os.remove(base + extensao)
+
+
+def finalizar_rerun(perfil: Optional[PerfilRerun]):
+    """Encerra o perfil, guarda o resumo na sessão e grava em disco se estiver entre os mais lentos"""
+    _atual.perfil = None
+    if perfil is None:
+        return
+    perfil.parar()
+    if perfil.total >= LIMITE_GRAVACAO:
+        try:
+            perfil.gravar(DIRETORIO_PERFIL)
+            _manter_mais_lentos(DIRETORIO_PERFIL)
+        except OSError as e:
+            print(f"Não foi possível gravar o perfil do rerun: {str(e)}")
+    historico = st.session_state.setdefault("perfil_reruns", [])
+    historico.append({'momento': perfil.momento, 'tela': perfil.tela, 'total': perfil.total,
+                      'secoes': perfil.secoes, 'arquivo': perfil.arquivo})
+    del historico[:-HISTORICO_SESSAO]
+
+
+def mostrar_perfil_sidebar():
+    """Mostra na barra lateral a divisão de tempo do rerun anterior"""
+    historico = st.session_state.get("perfil_reruns")
+    if not historico:
+        return
+    ultimo = historico[-1]
+    with st.sidebar.expander(f"⏱️ Último rerun: {ultimo['total'] * 1000:.0f} ms"):
+        for s in ultimo['secoes']:
+            nivel = s['secao'].count('/')
+            st.caption(f"{'  ' * nivel}{s['secao'].split('/')[-1]}: {s['duracao'] * 1000:.0f} ms")
+        if ultimo['arquivo']:
+            st.caption(f"Perfil: {ultimo['arquivo']}")
+        lentos = sorted(historico, key=lambda r: -r['total'])[:5]
+        st.caption("Mais lentos da sessão: " + ", ".join(f"{r['total'] * 1000:.0f} ms" for r in lentos))
@@ -1,14 +1,34 @@
 import os
+import json
 import platform
+import subprocess
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from collections import deque
 import tempfile
-from typing import Optional
+from typing import Callable, Dict, List, Optional
+
+from utils import instrumentacao
 
 class PrintManager(ABC):
     @abstractmethod
     def print_file(self, filepath: str) -> None:
         pass
 
+    @abstractmethod
+    def print_files(self, arquivos: List[str], impressora: Optional[str] = None, titulo: str = "Pedidos") -> bool:
+        """Imprime vários arquivos como um único envio para a impressora"""
+        pass
+
+    @abstractmethod
+    def print_raw(self, dados: bytes, impressora: Optional[str] = None, titulo: str = "Etiquetas") -> bool:
+        """Envia dados na linguagem da impressora (ZPL/EPL) sem passar pelo driver"""
+        pass
+
     @staticmethod
     def get_instance() -> 'PrintManager':
         system = platform.system().lower()
@@ -19,25 +39,357 @@ class PrintManager(ABC):
 
 class WindowsPrintManager(PrintManager):
     def print_file(self, filepath: str) -> None:
+        if not self.print_files([filepath]):
+            print(f"Arquivo gerado em: {filepath}")
+
+    SUMATRA_PDF = r"C:\Program Files\SumatraPDF\SumatraPDF.exe"
+
+    def print_files(self, arquivos: List[str], impressora: Optional[str] = None, titulo: str = "Pedidos") -> bool:
+        if impressora and os.path.exists(self.SUMATRA_PDF):
+            try:
+                for arquivo in arquivos:
+                    subprocess.run([self.SUMATRA_PDF, "-print-to", impressora, arquivo], check=True)
+                return True
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Erro ao imprimir em {impressora}: {str(e)}")
+                return False
         try:
-            import win32print
             import win32api
-            win32api.ShellExecute(
-                0,
-                "print",
-                filepath,
-                None,
-                ".",
-                0
-            )
         except ImportError:
-            print(f"Arquivo gerado em: {filepath}")
             print("Impressão não disponível no Windows sem win32print")
+            return False
+        try:
+            for arquivo in arquivos:
+                if impressora:
+                    win32api.ShellExecute(0, "printto", arquivo, f'"{impressora}"', ".", 0)
+                else:
+                    win32api.ShellExecute(0, "print", arquivo, None, ".", 0)
+            return True
+        except Exception as e:
+            print(f"Erro ao imprimir em {impressora}: {str(e)}")
+            return False
+
+    def print_raw(self, dados: bytes, impressora: Optional[str] = None, titulo: str = "Etiquetas") -> bool:
+        try:
+            import win32print
+        except ImportError:
+            print("Impressão direta não disponível no Windows sem win32print")
+            return False
+        try:
+            handle = win32print.OpenPrinter(impressora or win32print.GetDefaultPrinter())
+            try:
+                win32print.StartDocPrinter(handle, 1, (titulo, None, "RAW"))
+                try:
+                    win32print.StartPagePrinter(handle)
+                    win32print.WritePrinter(handle, dados)
+                    win32print.EndPagePrinter(handle)
+                finally:
+                    win32print.EndDocPrinter(handle)
+            finally:
+                win32print.ClosePrinter(handle)
+            return True
+        except Exception as e:
+            print(f"Erro ao enviar etiquetas para {impressora}: {str(e)}")
+            return False
 
 class UnixPrintManager(PrintManager):
     def print_file(self, filepath: str) -> None:
-        try:
-            os.system(f"lpr {filepath}")
-        except:
+        if not self.print_files([filepath]):
             print(f"Arquivo gerado em: {filepath}")
             print("Impressão não disponível neste sistema")
+
+    def _lp(self, argumentos: List[str], impressora: Optional[str], titulo: str, entrada: Optional[bytes] = None) -> bool:
+        # Lista de argumentos (sem shell): caminhos com espaços ou aspas não quebram o comando
+        cmd = ["lp", "-t", titulo] + (["-d", impressora] if impressora else []) + argumentos
+        try:
+            subprocess.run(cmd, input=entrada, check=True, capture_output=True)
+            return True
+        except (OSError, subprocess.CalledProcessError) as e:
+            detalhe = e.stderr.decode(errors='replace').strip() if getattr(e, 'stderr', None) else str(e)
+            print(f"Erro ao enviar para {impressora or 'impressora padrão'}: {detalhe}")
+            return False
+
+    def print_files(self, arquivos: List[str], impressora: Optional[str] = None, titulo: str = "Pedidos") -> bool:
+        # O lp aceita vários arquivos num único trabalho do CUPS
+        return self._lp(["--"] + list(arquivos), impressora, titulo)
+
+    def print_raw(self, dados: bytes, impressora: Optional[str] = None, titulo: str = "Etiquetas") -> bool:
+        return self._lp(["-o", "raw"], impressora, titulo, entrada=dados)
+
+
+# ----------------------------------------------------------------------------- fila de impressão
+
+DIRETORIO_SPOOL = os.getenv("PEDIDOS_SPOOL_DIR", os.path.abspath("spool_impressao"))
+# Tentativas de cada trabalho antes de ficar com status ERRO
+MAX_TENTATIVAS = int(os.getenv("PEDIDOS_SPOOL_TENTATIVAS", "4"))
+# Trabalhos da mesma impressora agrupados num único envio
+MAX_LOTE = 50
+# Espera após o primeiro trabalho para juntar os que chegarem em seguida (segundos)
+JANELA_LOTE = 0.3
+# Trabalhos concluídos mantidos para consulta (os com ERRO ficam até reenvio ou descarte)
+HISTORICO_TRABALHOS = 100
+
+
+@dataclass
+class TrabalhoImpressao:
+    id: str
+    impressora: Optional[str]
+    titulo: str
+    bruto: bool                      # True: ZPL/EPL enviado direto; False: arquivo (PDF)
+    arquivo: str                     # arquivo a imprimir (bruto: cópia dos dados no spool)
+    status: str = "NA_FILA"          # NA_FILA, IMPRIMINDO, CONCLUIDO, ERRO
+    tentativas: int = 0
+    erro: str = ""
+    criado_em: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+    finalizado_em: str = ""
+    disponivel_em: float = 0.0       # time.time() a partir do qual pode ser (re)enviado
+
+
+class PrintSpooler:
+    """
+    Fila de impressão em processo: os envios retornam na hora e uma thread manda
+    os trabalhos para a impressora, agrupando os da mesma impressora num único
+    envio e repetindo os que falharem. Os trabalhos pendentes ficam gravados em
+    DIRETORIO_SPOOL e são retomados se o app reiniciar.
+
+    ao_concluir, se informado no envio, é chamado (na thread da fila) com o trabalho
+    quando ele for impresso, inclusive depois de um reenvio. Fica só em memória: se o
+    app reiniciar, o trabalho é retomado mas a chamada não acontece.
+    """
+    _instancia = None
+    _instancia_lock = threading.Lock()
+
+    def __init__(self, diretorio: str = DIRETORIO_SPOOL, gerenciador: Optional[PrintManager] = None):
+        self.diretorio = diretorio
+        self.gerenciador = gerenciador or PrintManager.get_instance()
+        self._condicao = threading.Condition()
+        self._pendentes: List[TrabalhoImpressao] = []
+        self._trabalhos: Dict[str, TrabalhoImpressao] = {}
+        # Concluídos recentes (limitado) e trabalhos com ERRO (ficam até reenvio ou descarte)
+        self._finalizados = deque(maxlen=HISTORICO_TRABALHOS)
+        self._com_erro: List[TrabalhoImpressao] = []
+        self._ao_concluir: Dict[str, Callable[[dict], None]] = {}
+        self._thread = None
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._recuperar()
+
+    @classmethod
+    def get_instance(cls) -> 'PrintSpooler':
+        with cls._instancia_lock:
+            if cls._instancia is None:
+                cls._instancia = cls()
+            return cls._instancia
+
+    # ------------------------------------------------------------------ envio
+
+    def enviar_dados(self, dados: bytes, impressora: Optional[str] = None, titulo: str = "Etiquetas",
+                     ao_concluir: Optional[Callable[[dict], None]] = None) -> str:
+        """Enfileira dados ZPL/EPL; retorna o id do trabalho"""
+        id_trabalho = uuid.uuid4().hex[:12]
+        arquivo = os.path.join(self.diretorio, f"{id_trabalho}.raw")
+        with open(arquivo, 'wb') as f:
+            f.write(dados)
+        return self._enfileirar(TrabalhoImpressao(id_trabalho, impressora, titulo, True, arquivo), ao_concluir)
+
+    def enviar_arquivo(self, caminho: str, impressora: Optional[str] = None, titulo: str = "Pedidos",
+                       ao_concluir: Optional[Callable[[dict], None]] = None) -> str:
+        """Enfileira um arquivo (PDF) para impressão; retorna o id do trabalho"""
+        return self._enfileirar(TrabalhoImpressao(uuid.uuid4().hex[:12], impressora, titulo, False, caminho),
+                                ao_concluir)
+
+    def reenviar(self, id_trabalho: str) -> bool:
+        """Coloca de volta na fila um trabalho com ERRO"""
+        with self._condicao:
+            trabalho = self._trabalhos.get(id_trabalho)
+            if trabalho is None or trabalho.status != "ERRO":
+                return False
+            self._com_erro.remove(trabalho)
+            trabalho.status, trabalho.tentativas, trabalho.erro, trabalho.disponivel_em = "NA_FILA", 0, "", 0.0
+        self._enfileirar(trabalho)
+        return True
+
+    def descartar(self, id_trabalho: str) -> bool:
+        """Remove do spool um trabalho com ERRO"""
+        with self._condicao:
+            trabalho = self._trabalhos.get(id_trabalho)
+            if trabalho is None or trabalho.status != "ERRO":
+                return False
+            del self._trabalhos[id_trabalho]
+            self._ao_concluir.pop(id_trabalho, None)
+            self._com_erro.remove(trabalho)
+        self._remover(trabalho)
+        return True
+
+    def _registrar_finalizado(self, trabalho: TrabalhoImpressao):
+        # Chamado com a condição travada. Trabalhos com ERRO não entram no histórico limitado,
+        # para não sumirem da lista enquanto ainda podem ser reenviados ou descartados
+        if trabalho.status == "ERRO":
+            self._com_erro.append(trabalho)
+            return
+        if len(self._finalizados) == self._finalizados.maxlen:
+            # O concluído mais antigo sai também do índice por id
+            self._trabalhos.pop(self._finalizados.popleft().id, None)
+        self._finalizados.append(trabalho)
+
+    def _enfileirar(self, trabalho: TrabalhoImpressao, ao_concluir: Optional[Callable[[dict], None]] = None) -> str:
+        self._gravar(trabalho)
+        with self._condicao:
+            self._trabalhos[trabalho.id] = trabalho
+            if ao_concluir:
+                self._ao_concluir[trabalho.id] = ao_concluir
+            self._pendentes.append(trabalho)
+            instrumentacao.definir("pedidos_fila_impressao", len(self._pendentes))
+            self._condicao.notify()
+        self._iniciar_thread()
+        return trabalho.id
+
+    # ------------------------------------------------------------------ consulta
+
+    def status(self, id_trabalho: str) -> Optional[dict]:
+        with self._condicao:
+            trabalho = self._trabalhos.get(id_trabalho)
+            return asdict(trabalho) if trabalho else None
+
+    def trabalhos(self) -> List[dict]:
+        """Trabalhos pendentes, com ERRO e os concluídos mais recentes, do mais novo para o mais antigo"""
+        with self._condicao:
+            lista = [asdict(t) for t in self._pendentes + self._com_erro + list(self._finalizados)]
+        return sorted(lista, key=lambda t: t['criado_em'], reverse=True)
+
+    def aguardar(self, id_trabalho: str, timeout: float = 30.0) -> Optional[dict]:
+        """Espera o trabalho ser concluído ou falhar de vez (para scripts e testes)"""
+        limite = time.monotonic() + timeout
+        with self._condicao:
+            while time.monotonic() < limite:
+                trabalho = self._trabalhos.get(id_trabalho)
+                if trabalho is None or trabalho.status in ("CONCLUIDO", "ERRO"):
+                    break
+                self._condicao.wait(max(0.0, limite - time.monotonic()))
+        return self.status(id_trabalho)
+
+    # ------------------------------------------------------------------ persistência
+
+    def _caminho_meta(self, id_trabalho: str) -> str:
+        return os.path.join(self.diretorio, f"{id_trabalho}.json")
+
+    def _gravar(self, trabalho: TrabalhoImpressao):
+        temporario = self._caminho_meta(trabalho.id) + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(asdict(trabalho), f, ensure_ascii=False)
+        os.replace(temporario, self._caminho_meta(trabalho.id))
+
+    def _remover(self, trabalho: TrabalhoImpressao):
+        arquivos = [self._caminho_meta(trabalho.id)] + ([trabalho.arquivo] if trabalho.bruto else [])
+        for arquivo in arquivos:
+            try:
+                os.remove(arquivo)
+            except OSError:
+                pass
+
+    def _recuperar(self):
+        """Retoma os trabalhos que estavam na fila quando o app parou (os com ERRO ficam para reenvio)"""
+        for nome in sorted(os.listdir(self.diretorio)):
+            if not nome.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.diretorio, nome), 'r', encoding='utf-8') as f:
+                    trabalho = TrabalhoImpressao(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Trabalho de impressão inválido no spool ({nome}): {str(e)}")
+                continue
+            self._trabalhos[trabalho.id] = trabalho
+            if trabalho.status == "ERRO":
+                self._registrar_finalizado(trabalho)
+            else:
+                trabalho.status, trabalho.disponivel_em = "NA_FILA", 0.0
+                self._pendentes.append(trabalho)
+        if self._pendentes:
+            self._iniciar_thread()
+
+    # ------------------------------------------------------------------ worker
+
+    def _iniciar_thread(self):
+        with self._condicao:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="spool-impressao", daemon=True)
+                self._thread.start()
+
+    def _proximo_lote(self) -> List[TrabalhoImpressao]:
+        """Bloqueia até haver trabalho disponível e retorna o lote (mesma impressora e tipo)"""
+        with self._condicao:
+            while True:
+                agora = time.time()
+                prontos = [t for t in self._pendentes if t.disponivel_em <= agora]
+                if prontos:
+                    break
+                espera = min((t.disponivel_em for t in self._pendentes), default=agora + 60) - agora
+                self._condicao.wait(max(espera, 0.05))
+        # Dá um instante para juntar os trabalhos enviados em sequência
+        time.sleep(JANELA_LOTE)
+        with self._condicao:
+            primeiro = prontos[0]
+            agora = time.time()
+            lote = [
+                t for t in self._pendentes
+                if t.impressora == primeiro.impressora and t.bruto == primeiro.bruto and t.disponivel_em <= agora
+            ][:MAX_LOTE]
+            for trabalho in lote:
+                self._pendentes.remove(trabalho)
+                trabalho.status = "IMPRIMINDO"
+            return lote
+
+    def _enviar(self, lote: List[TrabalhoImpressao]) -> bool:
+        primeiro = lote[0]
+        titulo = primeiro.titulo if len(lote) == 1 else f"{primeiro.titulo} (+{len(lote) - 1})"
+        if primeiro.bruto:
+            # ZPL/EPL: as etiquetas de vários trabalhos podem ser concatenadas num único envio
+            dados = b""
+            for trabalho in lote:
+                with open(trabalho.arquivo, 'rb') as f:
+                    dados += f.read()
+            return self.gerenciador.print_raw(dados, primeiro.impressora, titulo)
+        return self.gerenciador.print_files([t.arquivo for t in lote], primeiro.impressora, titulo)
+
+    def _executar(self):
+        while True:
+            lote = self._proximo_lote()
+            try:
+                with instrumentacao.medir("impressao.envio"):
+                    sucesso = self._enviar(lote)
+                erro = "" if sucesso else "Falha ao enviar para a impressora"
+            except Exception as e:
+                sucesso, erro = False, str(e)
+            instrumentacao.incrementar("pedidos_impressao_total", len(lote), resultado="ok" if sucesso else "falha")
+            with self._condicao:
+                for trabalho in lote:
+                    trabalho.tentativas += 1
+                    if sucesso:
+                        trabalho.status, trabalho.erro = "CONCLUIDO", ""
+                    elif trabalho.tentativas < MAX_TENTATIVAS:
+                        # Nova tentativa com espera crescente (2, 4, 8... segundos)
+                        trabalho.status, trabalho.erro = "NA_FILA", erro
+                        trabalho.disponivel_em = time.time() + 2 ** trabalho.tentativas
+                        self._pendentes.append(trabalho)
+                    else:
+                        trabalho.status, trabalho.erro = "ERRO", erro
+                    if trabalho.status in ("CONCLUIDO", "ERRO"):
+                        trabalho.finalizado_em = datetime.now().isoformat(timespec='seconds')
+                        self._registrar_finalizado(trabalho)
+                instrumentacao.definir("pedidos_fila_impressao", len(self._pendentes))
+                # Só trabalhos impressos; com ERRO a chamada fica guardada para um reenvio
+                chamadas = [(self._ao_concluir.pop(t.id), asdict(t)) for t in lote
+                            if t.status == "CONCLUIDO" and t.id in self._ao_concluir]
+                self._condicao.notify_all()
+            for trabalho in lote:
+                try:
+                    if trabalho.status == "CONCLUIDO":
+                        self._remover(trabalho)
+                    else:
+                        self._gravar(trabalho)
+                except OSError as e:
+                    print(f"Erro ao atualizar o spool de impressão: {str(e)}")
+            for ao_concluir, trabalho in chamadas:
+                try:
+                    ao_concluir(trabalho)
+                except Exception as e:
+                    print(f"Erro ao finalizar o trabalho de impressão {trabalho['id']}: {str(e)}")
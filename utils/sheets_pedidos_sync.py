@@ -8,8 +8,12 @@ except ImportError:
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import re
+import uuid
 from dotenv import load_dotenv
 from datetime import datetime
+from typing import Dict, List
+from gspread.utils import rowcol_to_a1
+from utils.instrumentacao import instrumentar_cliente
 
 class SheetsPedidosSync:
     def __init__(self, enable_sheets=True):
@@ -93,11 +97,11 @@ class SheetsPedidosSync:
                         st.warning('Credenciais do Google Sheets inválidas: falta o campo "client_email".')
                     self.client = None
                     return
-                self.client = gspread.authorize(ServiceAccountCredentials.from_json_keyfile_dict(
+                self.client = instrumentar_cliente(gspread.authorize(ServiceAccountCredentials.from_json_keyfile_dict(
                     creds,
                     scopes=['https://spreadsheets.google.com/feeds', 
                            'https://www.googleapis.com/auth/drive']
-                ))
+                )))
                 # Testar conexão
                 try:
                     self.client.open_by_url(self.SPREADSHEET_URL)
@@ -127,8 +131,19 @@ class SheetsPedidosSync:
         except gspread.exceptions.WorksheetNotFound:
             return sheet.add_worksheet(title=name, rows=rows, cols=cols)
 
+    # Cabeçalho padrão da aba Pedidos
+    PEDIDOS_PADRAO = [
+        "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada", "Modelo", "OT", "Semiacabado", "Pagoda", "Status", "Urgente", "Ultima_Atualizacao", "Responsavel_Atualizacao", "Responsavel_Separacao", "Data_Separacao", "Responsavel_Coleta", "Data_Coleta", "Solicitante", "Observacoes", "Chave_Idempotencia"
+    ]
+
     def salvar_pedido_completo(self, df_pedidos: pd.DataFrame, df_itens: pd.DataFrame) -> tuple[bool, str]:
-        """Salva pedidos e itens em abas separadas no Google Sheets"""
+        """
+        Adiciona pedidos e itens em abas separadas no Google Sheets.
+
+        Deve receber apenas os pedidos novos. Pedidos cuja 'Chave_Idempotencia' já
+        existe na aba Pedidos são ignorados (junto com seus itens), então reenviar
+        o mesmo pedido não duplica linhas.
+        """
         try:
             if not self.client:
                 raise ValueError("Cliente do Google Sheets não configurado. Verifique as credenciais.")
@@ -143,48 +158,55 @@ class SheetsPedidosSync:
                 raise ValueError(f"Erro ao abrir planilha: {str(e)}")
 
             # Padronizar cabeçalho da aba Pedidos
-            pedidos_padrao = [
-                "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada", "Modelo", "OT", "Semiacabado", "Pagoda", "Status", "Urgente", "Ultima_Atualizacao", "Responsavel_Atualizacao", "Responsavel_Separacao", "Data_Separacao", "Responsavel_Coleta", "Data_Coleta", "Solicitante", "Observacoes"
-            ]
+            pedidos_padrao = self.PEDIDOS_PADRAO
             worksheet_pedidos = self._get_or_create_worksheet(sheet, "Pedidos")
             headers = worksheet_pedidos.row_values(1)
+            formatar = False
             if headers != pedidos_padrao:
                 worksheet_pedidos.update('A1', [pedidos_padrao])
+                formatar = True
+
+            # Alinhar as colunas ao cabeçalho da planilha
+            df_pedidos = df_pedidos.reindex(columns=pedidos_padrao).fillna("")
+
+            # Ignorar pedidos já enviados (mesma chave de idempotência)
+            col_chave = pedidos_padrao.index("Chave_Idempotencia") + 1
+            chaves_existentes = set(worksheet_pedidos.col_values(col_chave)[1:])
+            chaves = df_pedidos["Chave_Idempotencia"].astype(str)
+            duplicados = (chaves != "") & chaves.isin(chaves_existentes)
+            numeros_ignorados = set(df_pedidos.loc[duplicados, "Numero_Pedido"].astype(str))
+            df_pedidos = df_pedidos[~duplicados]
 
             # Preparar os dados dos pedidos
-            df_pedidos = df_pedidos.fillna("")
-            pedidos_values = [df_pedidos.columns.tolist()] + df_pedidos.values.tolist()
-            pedidos_values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in pedidos_values]
+            pedidos_to_append = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in df_pedidos.values.tolist()]
+            if pedidos_to_append:
+                worksheet_pedidos.append_rows(pedidos_to_append, value_input_option="USER_ENTERED")
 
-            # Preparar os dados dos itens
+            # Preparar os dados dos itens (sem os itens de pedidos ignorados)
             df_itens = df_itens.fillna("")
+            if numeros_ignorados and "Numero_Pedido" in df_itens.columns:
+                df_itens = df_itens[~df_itens["Numero_Pedido"].astype(str).isin(numeros_ignorados)]
             itens_values = [df_itens.columns.tolist()] + df_itens.values.tolist()
             itens_values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in itens_values]
 
-            # Atualizar aba de Pedidos (APENAS ADICIONAR, NÃO LIMPAR)
-            existing_rows_pedidos = worksheet_pedidos.get_all_values()
-            if existing_rows_pedidos:
-                # Se já existe cabeçalho, não adicionar de novo
-                pedidos_to_append = pedidos_values[1:]
-            else:
-                # Se está vazio, adicionar tudo (incluindo cabeçalho)
-                pedidos_to_append = pedidos_values
-            if pedidos_to_append:
-                worksheet_pedidos.append_rows(pedidos_to_append, value_input_option="USER_ENTERED")
-
             # Atualizar aba de Itens (APENAS ADICIONAR, NÃO LIMPAR)
             worksheet_itens = self._get_or_create_worksheet(sheet, "Itens")
-            existing_rows = worksheet_itens.get_all_values()
-            if existing_rows:
+            if worksheet_itens.row_values(1):
+                # Se já existe cabeçalho, não adicionar de novo
                 itens_to_append = itens_values[1:]
             else:
+                # Se está vazio, adicionar tudo (incluindo cabeçalho)
                 itens_to_append = itens_values
+                formatar = True
             if itens_to_append:
                 worksheet_itens.append_rows(itens_to_append, value_input_option="USER_ENTERED")
 
-            # Formatar as abas
-            self._format_worksheets(sheet)
+            # Formatar as abas (apenas quando o cabeçalho foi criado/alterado)
+            if formatar:
+                self._format_worksheets(sheet)
 
+            if numeros_ignorados:
+                return True, f"Pedido salvo no Google Sheets ({len(numeros_ignorados)} já enviado(s) anteriormente ignorado(s))."
             return True, "Pedido salvo com sucesso no Google Sheets!"
         except Exception as e:
             return False, f"Erro ao salvar no Google Sheets: {str(e)}"
@@ -503,6 +525,65 @@ class SheetsPedidosSync:
         except Exception as e:
             return False, f"Erro ao atualizar status no Google Sheets: {str(e)}"
 
+    def atualizar_status_pedidos_sheets(self, alteracoes: Dict[str, str], ultima_atualizacao: str, responsavel: str) -> tuple[bool, str, List[str]]:
+        """
+        Atualiza o status de vários pedidos ({número: novo status}) no Google Sheets com uma
+        única leitura da aba Pedidos e um único batch_update. Retorna também os números que
+        não foram encontrados na planilha.
+        """
+        nao_encontrados = []
+        try:
+            if not self.client:
+                return False, "Cliente do Google Sheets não configurado.", nao_encontrados
+            if not self.SPREADSHEET_URL:
+                return False, "URL da planilha não configurada.", nao_encontrados
+
+            sheet = self.client.open_by_url(self.SPREADSHEET_URL)
+            ws_pedidos = sheet.worksheet("Pedidos")
+
+            headers = ws_pedidos.row_values(1)
+            try:
+                colunas = {nome: headers.index(nome) + 1 for nome in (
+                    "Status", "Ultima_Atualizacao", "Responsavel_Atualizacao",
+                    "Responsavel_Separacao", "Data_Separacao", "Responsavel_Coleta", "Data_Coleta"
+                )}
+            except ValueError as e:
+                return False, f"Colunas necessárias não encontradas na aba Pedidos: {e}", nao_encontrados
+
+            # Primeira linha de cada número, como em atualizar_status_pedido_sheets
+            linhas = {}
+            for i, numero in enumerate(ws_pedidos.col_values(1)[1:], start=2):
+                linhas.setdefault(str(numero).strip().upper(), i)
+
+            celulas = []
+            for numero_pedido, novo_status in alteracoes.items():
+                row_index = linhas.get(str(numero_pedido).strip().upper())
+                if row_index is None:
+                    nao_encontrados.append(numero_pedido)
+                    continue
+                valores = {
+                    "Status": novo_status,
+                    "Ultima_Atualizacao": ultima_atualizacao,
+                    "Responsavel_Atualizacao": responsavel,
+                }
+                if novo_status == "Em Separação":
+                    valores.update(Responsavel_Separacao=responsavel, Data_Separacao=ultima_atualizacao)
+                elif novo_status == "Em Coleta":
+                    valores.update(Responsavel_Coleta=responsavel, Data_Coleta=ultima_atualizacao)
+                celulas.extend(
+                    {"range": rowcol_to_a1(row_index, colunas[nome]), "values": [[valor]]}
+                    for nome, valor in valores.items()
+                )
+
+            if celulas:
+                ws_pedidos.batch_update(celulas)
+            if nao_encontrados:
+                return False, (f"Pedidos não encontrados na aba Pedidos do Google Sheets: "
+                               f"{', '.join(map(str, nao_encontrados))}"), nao_encontrados
+            return True, "Status atualizado com sucesso no Google Sheets!", nao_encontrados
+        except Exception as e:
+            return False, f"Erro ao atualizar status no Google Sheets: {str(e)}", nao_encontrados
+
     def importar_e_atualizar_paco(self, arquivo_importado: str) -> tuple[bool, str]:
         """Importa um arquivo Excel e sobrescreve toda a aba 'paco' do Google Sheets com o conteúdo do arquivo."""
         try:
@@ -669,12 +750,7 @@ class SheetsPedidosSync:
             }
             
             # Preparar DataFrame do pedido
-            colunas_pedidos = [
-                "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada", 
-                "Modelo", "OT", "Semiacabado", "Pagoda", "Status", "Urgente", 
-                "Ultima_Atualizacao", "Responsavel_Atualizacao", "Responsavel_Separacao",
-                "Data_Separacao", "Responsavel_Coleta", "Data_Coleta", "Solicitante", "Observacoes"
-            ]
+            colunas_pedidos = self.PEDIDOS_PADRAO
             
             novo_pedido = {
                 "Numero_Pedido": numero_pedido,
@@ -696,7 +772,9 @@ class SheetsPedidosSync:
                 "Responsavel_Coleta": "",
                 "Data_Coleta": "",
                 "Solicitante": pedido_info['solicitante'],
-                "Observacoes": pedido_info['observacoes']
+                "Observacoes": pedido_info['observacoes'],
+                # Identifica o pedido no Google Sheets: reenvios não duplicam a linha
+                "Chave_Idempotencia": uuid.uuid4().hex
             }
             
             df_pedidos = pd.DataFrame([[novo_pedido.get(col, "") for col in colunas_pedidos]], columns=colunas_pedidos)
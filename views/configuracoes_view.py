@@ -5,19 +5,15 @@ import platform
 from utils.sheets_pedidos_sync import SheetsPedidosSync
 import json
 import subprocess
+import pandas as pd
+from utils import instrumentacao
+from utils.print_manager import PrintSpooler
 
 class ConfiguracoesView:
     def __init__(self, pedido_controller):
         self.controller = pedido_controller
         self.sheets_sync = self.controller.sheets_sync if hasattr(self.controller, 'sheets_sync') else None
 
-        self.base_dir = os.path.join(
-            os.path.expanduser("~"),
-            "OneDrive - Yazaki",
-            "Solicitação",
-            "Pedidos"
-        )
-        self.arquivo_backup = os.path.join(self.base_dir, "backup")
         self.config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
         self.config = self._carregar_config()
 
@@ -75,13 +71,7 @@ class ConfiguracoesView:
             sheet = self.sheets_sync.client.open_by_url(self.sheets_sync.SPREADSHEET_URL)
             
             # Colunas necessárias para a aba Pedidos
-            colunas_pedidos = [
-                "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada",
-                "Modelo", "OT", "Semiacabado", "Pagoda", "Status", "Urgente",
-                "Ultima_Atualizacao", "Responsavel_Atualizacao",
-                "Responsavel_Separacao", "Data_Separacao",
-                "Responsavel_Coleta", "Data_Coleta"
-            ]
+            colunas_pedidos = SheetsPedidosSync.PEDIDOS_PADRAO
 
             # Verificar/criar aba Pedidos
             try:
@@ -117,7 +107,7 @@ class ConfiguracoesView:
             return
         
         # Tabs para diferentes configurações
-        tab1, tab2, tab3, tab4 = st.tabs(["Sistema", "Google Sheets", "Impressão", "Backups"])
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(["Sistema", "Google Sheets", "Impressão", "Backups", "Desempenho"])
         
         with tab1:
             self._mostrar_info_sistema()
@@ -134,6 +124,9 @@ class ConfiguracoesView:
         with tab4:
             self._mostrar_backups()
 
+        with tab5:
+            self._mostrar_desempenho()
+
     def _mostrar_info_sistema(self):
         # Informações do Sistema
         st.markdown("#### 💻 Informações do Sistema")
@@ -144,54 +137,173 @@ class ConfiguracoesView:
         """)
         
         st.markdown("---")
+
+        # Contenção no arquivo de pedidos (lock entre sessões/processos)
+        st.markdown("#### 🔒 Concorrência no arquivo de pedidos")
+        trava = self.controller.estatisticas_trava()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Gravações", trava['aquisicoes'])
+        col2.metric("Espera média", f"{trava['espera_media'] * 1000:.1f} ms")
+        col3.metric("Espera máxima", f"{trava['espera_max'] * 1000:.1f} ms")
+        col4.metric("Timeouts", trava['timeouts'])
         
 
+    def _mostrar_desempenho(self):
+        """Latência por operação, uso da cota do Google Sheets, caches, filas e reruns mais lentos"""
+        if not instrumentacao.ATIVO:
+            st.info("Métricas desativadas. Defina a variável de ambiente PEDIDOS_METRICAS=1 e reinicie o app.")
+            return
+        if st.button("🔄 Atualizar", key="desempenho_atualizar"):
+            st.rerun()
+        dados = instrumentacao.metricas.instantaneo()
+
+        # Latência por operação
+        st.markdown("#### ⏱️ Latência por operação")
+        linhas = [
+            {
+                'Operação': (f"sheets.{h['rotulos'].get('operacao', '')}" if h['nome'].startswith('pedidos_sheets_')
+                             else h['rotulos'].get('operacao') or h['rotulos'].get('tela') or h['nome']),
+                'Chamadas': h['total'],
+                'p50 (ms)': round(h['p50'] * 1000, 1),
+                'p95 (ms)': round(h['p95'] * 1000, 1),
+                'Máx. recente (ms)': round(h['max'] * 1000, 1),
+                'Tempo total (s)': round(h['soma'], 2)
+            }
+            for h in dados['histogramas'] if h['nome'] != 'pedidos_rerun_segundos'
+        ]
+        if linhas:
+            df = pd.DataFrame(linhas).sort_values('Tempo total (s)', ascending=False)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhuma operação medida ainda neste processo.")
+
+        # Google Sheets: requisições do último minuto contra a cota
+        st.markdown("#### 📊 Google Sheets (último minuto)")
+        uso = instrumentacao.requisicoes_sheets_ultimo_minuto()
+        erros_429 = sum(c['valor'] for c in dados['contadores'] if c['nome'] == 'pedidos_sheets_erros_429_total')
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Leituras/min", f"{uso['leituras']} / {instrumentacao.COTA_LEITURAS_MINUTO}")
+        col2.metric("Escritas/min", f"{uso['escritas']} / {instrumentacao.COTA_ESCRITAS_MINUTO}")
+        col3.metric("Erros 429 (total)", int(erros_429))
+        st.progress(min(uso['leituras'] / max(instrumentacao.COTA_LEITURAS_MINUTO, 1), 1.0), text="Cota de leitura")
+        st.progress(min(uso['escritas'] / max(instrumentacao.COTA_ESCRITAS_MINUTO, 1), 1.0), text="Cota de escrita")
+
+        # Caches
+        st.markdown("#### 🗃️ Caches")
+        caches = instrumentacao.taxas_acerto_cache()
+        if caches:
+            st.dataframe(pd.DataFrame([
+                {'Cache': nome, 'Acertos': int(c['acertos']), 'Falhas': int(c['falhas']),
+                 'Taxa de acerto': f"{c['taxa']:.0%}"}
+                for nome, c in sorted(caches.items())
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhum acesso a cache registrado neste processo.")
+
+        # Filas
+        st.markdown("#### 📥 Filas")
+        filas = [{'Fila': m['nome'], 'Itens': int(m['valor'])} for m in dados['medidores']]
+        servico = getattr(self.controller, 'servico', None)
+        if servico:
+            try:
+                saude = servico.saude()
+                filas.append({'Fila': 'serviço de pedidos → Google Sheets', 'Itens': saude.get('fila_sheets', 0)})
+            except Exception as e:
+                st.warning(f"Serviço de pedidos indisponível: {str(e)}")
+        if filas:
+            st.dataframe(pd.DataFrame(filas), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhuma fila ativa neste processo.")
+
+        # Reruns mais lentos
+        st.markdown("#### 🐢 Reruns mais lentos (últimos 200)")
+        reruns = instrumentacao.reruns_mais_lentos(10)
+        if reruns:
+            st.dataframe(pd.DataFrame([
+                {'Momento': datetime.fromtimestamp(r['momento']).strftime('%d/%m %H:%M:%S'),
+                 'Tela': r['tela'], 'Duração (ms)': round(r['duracao'] * 1000, 1)}
+                for r in reruns
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhum rerun registrado ainda.")
+
     def _mostrar_config_sheets(self):
         self.sheets_sync.render_config_page()
 
     def _mostrar_backups(self):
-        # Mostrar backups disponíveis
+        backup = self.controller.backup
+
+        # Restauração para qualquer momento (snapshot + log de alterações)
+        st.markdown("#### ⏪ Restaurar para um momento")
+        col_data, col_hora = st.columns(2)
+        with col_data:
+            data_restauracao = st.date_input("Data", value=datetime.now().date(), key="restauracao_data")
+        with col_hora:
+            hora_restauracao = st.time_input("Hora", value=datetime.now().time().replace(second=0, microsecond=0),
+                                             key="restauracao_hora", step=60)
+        momento = datetime.combine(data_restauracao, hora_restauracao)
+
+        col_preview, col_restaurar = st.columns(2)
+        with col_preview:
+            if st.button("👁️ Pré-visualizar diferenças", use_container_width=True):
+                try:
+                    diferencas = self.controller.previsualizar_restauracao(momento)
+                    if diferencas.empty:
+                        st.info("Nenhuma diferença entre os dados atuais e o momento selecionado.")
+                    else:
+                        st.caption(f"{len(diferencas)} pedido(s) seriam afetados")
+                        st.dataframe(diferencas, use_container_width=True, hide_index=True)
+                except Exception as e:
+                    st.error(f"Erro ao reconstruir os pedidos: {str(e)}")
+        with col_restaurar:
+            if st.button("📥 Restaurar para este momento", type="primary", use_container_width=True):
+                try:
+                    self.controller.restaurar_para(momento)
+                    st.success(f"Pedidos restaurados para {momento.strftime('%d/%m/%Y %H:%M')}!")
+                except Exception as e:
+                    st.error(f"Erro ao restaurar backup: {str(e)}")
+
+        # Mostrar snapshots disponíveis
         st.markdown("#### 💾 Backups Disponíveis")
-        
-        if not os.path.exists(self.arquivo_backup):
-            os.makedirs(self.arquivo_backup, exist_ok=True)
-            
-        backups = sorted([
-            f for f in os.listdir(self.arquivo_backup)
-            if f.endswith('.xlsx')
-        ], reverse=True)
-        
-        if not backups:
+        snapshots = list(reversed(backup.listar_snapshots()))
+
+        if not snapshots:
             st.info("Nenhum backup encontrado")
         else:
-            for backup in backups:
+            for momento, caminho in snapshots:
                 col1, col2 = st.columns([3, 1])
                 with col1:
-                    st.text(backup)
+                    tamanho_kb = os.path.getsize(caminho) / 1024
+                    st.text(f"{momento.strftime('%d/%m/%Y %H:%M:%S')}  ({tamanho_kb:.1f} KB)")
                 with col2:
-                    if st.button("📥 Restaurar", key=f"restore_{backup}"):
+                    if st.button("📥 Restaurar", key=f"restore_{os.path.basename(caminho)}"):
                         try:
-                            # Restaurar backup                            backup_path = os.path.join(self.arquivo_backup, backup)
-                            os.replace(backup_path, self.arquivo_pedidos)
+                            self.controller.restaurar_snapshot(caminho)
                             st.success("Backup restaurado com sucesso!")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Erro ao restaurar backup: {str(e)}")
-        
+
+        changelogs = backup.listar_changelogs()
+        if changelogs:
+            total_kb = sum(os.path.getsize(c) for _, c in changelogs) / 1024
+            st.caption(f"Log de alterações: {len(changelogs)} dia(s), {total_kb:.1f} KB")
+
         # Informações sobre backups
         st.markdown("#### ℹ️ Informações")
-        st.markdown("""
-        - O sistema mantém automaticamente os últimos 10 backups
-        - Um novo backup é criado sempre que há alterações nos pedidos
-        - Os backups são nomeados com data e hora para fácil identificação
-        - Use o botão "Restaurar" para voltar a uma versão anterior dos dados
+        st.markdown(f"""
+        - Um snapshot completo (compactado) é criado no máximo a cada {int(backup.intervalo_snapshot.total_seconds() // 60)} minutos
+        - Entre snapshots, cada alteração nos pedidos é registrada no log de alterações do dia
+        - Snapshots e logs são mantidos por {backup.retencao.days} dias
+        - É possível restaurar para qualquer momento dentro desse período: o snapshot anterior é carregado e as alterações são reaplicadas até o horário escolhido
+        - Antes de restaurar, o estado atual é salvo em um novo snapshot, então a restauração pode ser desfeita
         """)
         
         # Aviso importante
         st.warning("""
         **⚠️ Atenção!**  
         Ao restaurar um backup, a versão atual dos dados será substituída.
-        Certifique-se de que deseja realmente fazer isso antes de prosseguir.
+        Use a pré-visualização para conferir as diferenças antes de prosseguir.
         """)
 
     def _mostrar_config_impressao(self):
@@ -238,11 +350,24 @@ class ConfiguracoesView:
                 except Exception as e:
                     st.error(f"Erro ao configurar diretório: {str(e)}")
 
+        else:
+            # Impressoras térmicas recebem as etiquetas direto em ZPL/EPL, sem PDF
+            formatos = ['PDF', 'ZPL', 'EPL']
+            formato_atual = self.config.get('formato_etiqueta', 'PDF')
+            formato_selecionado = st.selectbox(
+                "Formato das etiquetas:",
+                options=formatos,
+                index=formatos.index(formato_atual) if formato_atual in formatos else 0,
+                help="ZPL (Zebra) ou EPL (Zebra/Argox antigas) enviam as etiquetas como texto direto para a impressora térmica"
+            )
+
         # Botão para salvar configurações
         col1, col2 = st.columns([1, 3])
         with col1:
             if st.button("💾 Salvar Configurações"):
                 self.config['impressora_padrao'] = impressora_selecionada
+                if impressora_selecionada != 'PDF Virtual':
+                    self.config['formato_etiqueta'] = formato_selecionado
                 if self._salvar_config():
                     st.success("✅ Configurações salvas com sucesso!")
                 else:
@@ -263,5 +388,37 @@ class ConfiguracoesView:
             Com uma impressora física selecionada:
             - As etiquetas serão enviadas diretamente para impressão
             - O tamanho será ajustado automaticamente para 60x30mm
+            - Em ZPL/EPL as etiquetas vão como texto para a impressora térmica (203 dpi), sem gerar PDF
             - Certifique-se que a impressora está configurada corretamente
-            """)
\ No newline at end of file
+            """)
+
+        self._mostrar_fila_impressao()
+
+    def _mostrar_fila_impressao(self):
+        st.markdown("---")
+        st.markdown("##### 🗂️ Fila de Impressão")
+        spooler = PrintSpooler.get_instance()
+        trabalhos = spooler.trabalhos()
+        if not trabalhos:
+            st.caption("Nenhum trabalho de impressão recente.")
+            return
+
+        df_trabalhos = pd.DataFrame(trabalhos)[['criado_em', 'titulo', 'impressora', 'status', 'tentativas', 'erro']]
+        df_trabalhos.columns = ['Criado em', 'Título', 'Impressora', 'Status', 'Tentativas', 'Erro']
+        st.dataframe(df_trabalhos, hide_index=True, use_container_width=True)
+        if st.button("🔄 Atualizar fila"):
+            st.rerun()
+
+        # Trabalhos que esgotaram as tentativas ficam no spool até serem reenviados ou descartados
+        for trabalho in [t for t in trabalhos if t['status'] == 'ERRO']:
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                st.warning(f"{trabalho['titulo']} → {trabalho['impressora'] or 'padrão'}: {trabalho['erro']}")
+            with col2:
+                if st.button("Reenviar", key=f"reenviar_{trabalho['id']}"):
+                    spooler.reenviar(trabalho['id'])
+                    st.rerun()
+            with col3:
+                if st.button("Descartar", key=f"descartar_{trabalho['id']}"):
+                    spooler.descartar(trabalho['id'])
+                    st.rerun()
\ No newline at end of file
@@ -1,21 +1,23 @@
 import streamlit as st
 import pandas as pd
+from utils.perfil_rerun import marco
 
 def mostrar_dashboard_gerencial(controller):
     """
     Exibe um dashboard gerencial com totais gerais.
     controller: instância de PedidoController
     """
-    # Buscar todos os pedidos
-    df_pedidos = controller.buscar_pedidos(status=None)
-    if df_pedidos.empty:
+    # Contadores mantidos a cada gravação (não percorre o histórico)
+    contadores = controller.contadores_pedidos()
+    if not contadores['total']:
         return
+    marco("carregar_contadores")
 
     # --- TOTAIS GERAIS ---
-    total_pedidos = len(df_pedidos)
-    total_concluido = len(df_pedidos[df_pedidos['Status'] == 'CONCLUÍDO'])
-    total_processando = len(df_pedidos[df_pedidos['Status'] == 'PROCESSO'])
-    total_pendente = len(df_pedidos[df_pedidos['Status'] == 'PENDENTE'])
+    total_pedidos = contadores['total']
+    total_concluido = contadores['status'].get('CONCLUÍDO', 0)
+    total_processando = contadores['status'].get('PROCESSO', 0)
+    total_pendente = contadores['status'].get('PENDENTE', 0)
 
     st.markdown(f"""
     <style>
@@ -37,4 +39,5 @@ def mostrar_dashboard_gerencial(controller):
         <div class="dashboard-card card-processando">PROCESSO<br><span style='font-size:28px'>{total_processando}</span></div>
         <div class="dashboard-card card-pendente">PENDENTE<br><span style='font-size:28px'>{total_pendente}</span></div>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+    marco("totais")
\ No newline at end of file
@@ -7,43 +7,131 @@ import time
 import json
 import atexit
 import contextlib
-import sys
 import base64
-if sys.platform == "win32":
-    import msvcrt  # Para Windows
+from utils.file_lock import FileLock
 
 class CacheManager:
+    """
+    Cache de leituras em arquivo append-only (uma linha JSON por leitura).
+
+    - Índice em memória (set) dos seriais para checagem de duplicidade em O(1)
+    - Escritas protegidas por lock entre processos (várias sessões do Streamlit)
+    - O índice é atualizado lendo apenas as linhas novas do arquivo
+    """
+
     def __init__(self, cache_dir="pedidos/cache"):
         self.cache_dir = cache_dir
-        self.cache_file = os.path.join(cache_dir, "leituras_cache.json")
+        self.cache_file = os.path.join(cache_dir, "leituras_cache.jsonl")
+        self.lock = FileLock(self.cache_file + ".lock")
         os.makedirs(cache_dir, exist_ok=True)
-    
+        self._itens = []
+        self._seriais = set()
+        self._offset = 0
+        self._inode = None
+        self._migrar_cache_antigo()
+
+    def _migrar_cache_antigo(self):
+        """Converte o antigo leituras_cache.json (lista JSON) para o formato append-only"""
+        arquivo_antigo = os.path.join(self.cache_dir, "leituras_cache.json")
+        if not os.path.exists(arquivo_antigo):
+            return
+        with self.lock:
+            if not os.path.exists(arquivo_antigo):
+                return
+            try:
+                with open(arquivo_antigo, 'r', encoding='utf-8') as f:
+                    itens = json.load(f)
+            except Exception:
+                itens = []
+            self._append_linhas(itens)
+            os.remove(arquivo_antigo)
+
+    def _sincronizar(self):
+        """Lê do arquivo apenas as linhas adicionadas desde a última leitura"""
+        try:
+            info = os.stat(self.cache_file)
+            tamanho, inode = info.st_size, info.st_ino
+        except OSError:
+            tamanho, inode = 0, None
+        if tamanho < self._offset or inode != self._inode:
+            # Arquivo foi limpo/recriado por outra sessão
+            self._itens = []
+            self._seriais = set()
+            self._offset = 0
+            self._inode = inode
+        if tamanho == self._offset:
+            return
+        with open(self.cache_file, 'rb') as f:
+            f.seek(self._offset)
+            dados = f.read()
+        # Ignora uma eventual linha incompleta no final
+        fim = dados.rfind(b"\n") + 1
+        for linha in dados[:fim].splitlines():
+            if not linha.strip():
+                continue
+            try:
+                item = json.loads(linha)
+            except ValueError:
+                continue
+            self._itens.append(item)
+            self._seriais.add(item.get('serial'))
+        self._offset += fim
+
+    def _append_linhas(self, itens):
+        """Grava as linhas com uma única escrita em modo append (chamar com o lock adquirido)"""
+        if not itens:
+            return
+        dados = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in itens).encode('utf-8')
+        fd = os.open(self.cache_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, dados)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
     def load_cache(self):
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
+            with self.lock:
+                self._sincronizar()
+                return list(self._itens)
         except:
             return []
-    
-    def save_cache(self, data):
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    
+
     def add_to_cache(self, serial, status, mensagem):
-        cache = self.load_cache()
-        cache.append({
-            'serial': serial,
-            'status': status,
-            'mensagem': mensagem,
-            'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
-        self.save_cache(cache)
-    
+        self.add_many([serial], status, mensagem, ignorar_existentes=False)
+
+    def add_many(self, seriais, status, mensagem, ignorar_existentes=True):
+        """
+        Adiciona vários seriais de uma vez (uma escrita e um lock para o lote).
+        Retorna a lista dos seriais efetivamente adicionados.
+        """
+        data = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            self._sincronizar()
+            novos = []
+            vistos = set()
+            for serial in seriais:
+                if ignorar_existentes and (serial in self._seriais or serial in vistos):
+                    continue
+                vistos.add(serial)
+                novos.append({
+                    'serial': serial,
+                    'status': status,
+                    'mensagem': mensagem,
+                    'data': data
+                })
+            self._append_linhas(novos)
+            self._sincronizar()
+        return [item['serial'] for item in novos]
+
     def clear_cache(self):
-        if os.path.exists(self.cache_file):
-            os.remove(self.cache_file)
+        with self.lock:
+            if os.path.exists(self.cache_file):
+                os.remove(self.cache_file)
+            self._itens = []
+            self._seriais = set()
+            self._offset = 0
+            self._inode = None
 
 class PedidoFormView:
     def __init__(self, pedido_controller: PedidoController):
@@ -375,10 +463,8 @@ class PedidoFormView:
             st.session_state.ultimo_codigo = input_text
             barcodes = list(set([line.strip() for line in input_text.split('\n') if line.strip()]))
             # Salvar no cache (sem criar pedidos ainda)
-            for codigo in barcodes:
-                if codigo not in [item['serial'] for item in self.cache_manager.load_cache()]:
-                    self.cache_manager.add_to_cache(codigo, 'aguardando', 'Aguardando sincronização')
-            st.success(f"{len(barcodes)} código(s) adicionados ao lote para sincronização.")
+            adicionados = self.cache_manager.add_many(barcodes, 'aguardando', 'Aguardando sincronização')
+            st.success(f"{len(adicionados)} código(s) adicionados ao lote para sincronização.")
             st.rerun()
 
         # Botão para sincronizar pedidos em lote
@@ -387,65 +473,29 @@ class PedidoFormView:
             if not cache:
                 st.warning('Nenhum código para sincronizar!')
             else:
-                # Buscar dados da aba 'paco' do Google Sheets se disponível
-                if hasattr(self.pedido_controller, 'sheets_sync') and self.pedido_controller.sheets_sync and self.pedido_controller.sheets_sync.client:
-                    pedidos_paco = self.pedido_controller.carregar_paco_google_sheets()
-                    df_paco = pd.DataFrame([p.__dict__ for p in pedidos_paco])
-                    df_paco.columns = [str(col).strip().title() for col in df_paco.columns]
-                else:
-                    df_paco = pd.read_excel(self.pedido_controller.caminho_planilha, sheet_name='Paco', dtype=str)
-                    df_paco = df_paco.fillna("")
-                    df_paco.columns = [str(col).strip().title() for col in df_paco.columns]
-                resultados = []
-                pedidos_criados = []
-                for item in cache:
-                    codigo = item['serial']
-                    codigo_norm = str(codigo).strip().upper()
-                    pedido_encontrado = None
-                    for _, row in df_paco.iterrows():
-                        serial = str(row.get('Serial', '')).strip().upper()
-                        if serial and serial == codigo_norm:
-                            pedido_encontrado = {
-                                'serial': str(row.get('Serial', '')).strip(),
-                                'maquina': str(row.get('Maquina', '')).strip(),
-                                'posto': str(row.get('Posto', '')).strip(),
-                                'coordenada': str(row.get('Coordenada', '')).strip(),
-                                'modelo': str(row.get('Modelo', '')).strip(),
-                                'ot': str(row.get('Ot', '')).strip(),
-                                'semiacabado': str(row.get('Semiacabado', '')).strip(),
-                                'pagoda': str(row.get('Pagoda', '')).strip()
-                            }
-                            break
-                    if pedido_encontrado:
-                        data_atual = datetime.now()
-                        pedido_info = {
-                            **pedido_encontrado,
-                            "solicitante": "Sistema Automático",
-                            "observacoes": "",
-                            "urgente": "Não",
-                            "data": data_atual,
-                            "ultima_atualizacao": data_atual
-                        }
-                        try:
-                            numero_pedido = self.pedido_controller.salvar_pedido(pedido_info)
-                            if numero_pedido:
-                                status = "✅"
-                                mensagem = f"Pedido {numero_pedido} criado com sucesso"
-                                pedidos_criados.append(numero_pedido)
-                            else:
-                                status = "❌"
-                                mensagem = "Erro ao criar pedido"
-                        except Exception as e:
-                            status = "❌"
-                            mensagem = f"Erro ao criar pedido: {str(e)}"
-                    else:
-                        status = "❌"
-                        mensagem = "Serial não encontrado na planilha"
-                    resultados.append({
-                        'serial': codigo,
-                        'status': status,
-                        'mensagem': mensagem
-                    })
+                # Criar todos os pedidos do lote de uma vez (uma leitura, uma gravação e uma sincronização)
+                try:
+                    resultados_lote = self.pedido_controller.salvar_pedidos_lote(
+                        [item['serial'] for item in cache],
+                        solicitante="Sistema Automático",
+                        observacoes="",
+                        urgente="Não"
+                    )
+                except Exception as e:
+                    resultados_lote = [
+                        {'serial': item['serial'], 'sucesso': False, 'numero_pedido': None,
+                         'mensagem': f"Erro ao criar pedido: {str(e)}"}
+                        for item in cache
+                    ]
+                resultados = [
+                    {
+                        'serial': r['serial'],
+                        'status': "✅" if r['sucesso'] else "❌",
+                        'mensagem': r['mensagem']
+                    }
+                    for r in resultados_lote
+                ]
+                pedidos_criados = [r['numero_pedido'] for r in resultados_lote if r['sucesso']]
                 # Limpar cache após sincronizar
                 self.cache_manager.clear_cache()
                 st.markdown('<div class="resultados-container">', unsafe_allow_html=True)
@@ -1,24 +1,32 @@
 import streamlit as st
 from controllers.pedido_controller import PedidoController
-from datetime import datetime, timedelta
-import time
+from datetime import datetime
 import pandas as pd
 import os
-from pathlib import Path
-from fpdf import FPDF
-from utils.print_manager import PrintManager
+from utils.print_manager import PrintSpooler
+from utils.etiquetas_termicas import FORMATOS as FORMATOS_TERMICOS, gerar_etiquetas
+from utils.pdf_pedidos import gerar_packlist_pdf, gerar_relatorio_pedidos_pdf
 import base64
+import hashlib
 import platform
 import json
-import tempfile
 import subprocess
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import landscape
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from io import BytesIO
+from utils.perfil_rerun import secao, marco
+from utils.instrumentacao import registrar_cache
 
 class PedidoHistoricoView:
+    # PDFs de etiquetas guardados na sessão (seleções distintas)
+    MAX_PDFS_EM_CACHE = 5
+    # Histórico paginado: colunas de ordenação (ver COLUNAS_ORDENACAO do controlador) e tamanhos de página
+    ORDENACAO_HISTORICO = {
+        "Data": "Data",
+        "Numero_Pedido": "Número",
+        "Status": "Status",
+        "Maquina": "Máquina",
+        "Semiacabado": "Semiacabado",
+    }
+    TAMANHOS_PAGINA = [25, 50, 100, 200]
+
     def __init__(self, controller: PedidoController):
         self.controller = controller
         self.config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
@@ -185,55 +193,90 @@ class PedidoHistoricoView:
         except:
             return {}
 
-    def _imprimir_arquivo(self, arquivo_path, impressora):
-        """Imprime um arquivo usando comandos do sistema operacional"""
-        if impressora == 'PDF Virtual':
-            return False  # Indica que deve usar o download
-            
-        try:
-            if platform.system() == 'Windows':
-                # Primeiro tenta com SumatraPDF
-                sumatra_path = r"C:\Program Files\SumatraPDF\SumatraPDF.exe"
-                if os.path.exists(sumatra_path):
-                    cmd = [sumatra_path, "-print-to", impressora, arquivo_path]
-                    subprocess.run(cmd, check=True)
-                    return True
-                else:
-                    # Se não tem SumatraPDF, tenta com impressão via powershell
-                    ps_command = f'(New-Object -ComObject Shell.Application).Namespace(0).ParseName("{arquivo_path}").InvokeVerb("Print")'
-                    subprocess.run(['powershell', '-Command', ps_command], check=True)
-                    return True
-            else:
-                # Linux/Mac usando lpr
-                cmd = ["lpr", "-P", impressora, arquivo_path]
-                subprocess.run(cmd, check=True)
-                return True
-        except:
-            return False
-
     def _gerar_packlist_pdf(self, pedidos):
-        buffer = BytesIO()
-        largura_etiqueta = 60 * mm
-        altura_etiqueta = 30 * mm
-        margem = 0 * mm
-        c = canvas.Canvas(buffer, pagesize=landscape((largura_etiqueta + 2*margem, altura_etiqueta + 2*margem)))
-        for pedido in pedidos:
-            c.setFont("Helvetica", 8)
-            y = altura_etiqueta + margem - 6*mm
-            # Linha 1: Número do Pedido - Data/Hora
-            c.drawString(margem + 2*mm, y, f"{pedido.get('Numero_Pedido','')} - {pedido.get('Data','')}")
-            y -= 6*mm
-            # Linha 2: Maq
-            c.drawString(margem + 2*mm, y, f"Maq: {pedido.get('Maquina','')}")
-            y -= 6*mm
-            # Linha 3: Coord e Posto
-            c.drawString(margem + 2*mm, y, f"Coord: {pedido.get('Coordenada','')} - Posto: {pedido.get('Posto','')}")
-            y -= 6*mm
-            # Linha 4: Pag e Semi
-            c.drawString(margem + 2*mm, y, f"Pag: {pedido.get('Pagoda','')} - Semi: {pedido.get('Semiacabado','')}")
-            c.showPage()
-        c.save()
-        return buffer.getvalue()
+        # Lotes grandes são gerados em blocos, em paralelo (utils/pdf_paralelo.py)
+        return gerar_packlist_pdf(pedidos)
+
+    @staticmethod
+    def _status_alterados(df_display: pd.DataFrame, estado_editor) -> dict:
+        """{número: novo status} das linhas cujo Status foi editado no st.data_editor"""
+        linhas_editadas = (estado_editor or {}).get("edited_rows", {})
+        alterados = {}
+        for posicao, colunas in linhas_editadas.items():
+            novo_status = colunas.get("Status")
+            linha = df_display.iloc[int(posicao)]
+            if novo_status is not None and novo_status != linha["Status"]:
+                alterados[linha["Número"]] = novo_status
+        return alterados
+
+    def _pedidos_no_periodo(self, filtros: dict, hora_inicial, hora_final) -> pd.DataFrame:
+        """Pedidos dos filtros do histórico com horário entre hora_inicial e hora_final"""
+        return self.controller.buscar_pedidos(**filtros, hora_inicial=hora_inicial, hora_final=hora_final)
+
+    def _pedidos_para_etiqueta(self, df_periodo: pd.DataFrame) -> list:
+        """Campos das etiquetas de cada pedido do período"""
+        df_etiquetas = df_periodo[['Numero_Pedido', 'Data', 'Maquina', 'Posto', 'Coordenada', 'Pagoda', 'Semiacabado']].copy()
+        df_etiquetas['Data'] = df_etiquetas['Data'].dt.strftime('%d/%m/%Y %H:%M')
+        return df_etiquetas.to_dict('records')
+
+    def _packlist_pdf_em_cache(self, pedidos: list) -> bytes:
+        """PDF de etiquetas reaproveitado na sessão enquanto a seleção de pedidos não mudar"""
+        chave = hashlib.sha256(json.dumps(pedidos, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        cache = st.session_state.setdefault('cache_pdf_etiquetas', {})
+        registrar_cache("pdf_etiquetas", chave in cache)
+        if chave not in cache:
+            cache[chave] = self._gerar_packlist_pdf(pedidos)
+            # Mantém só as seleções mais recentes
+            for antiga in list(cache)[:-self.MAX_PDFS_EM_CACHE]:
+                del cache[antiga]
+        return cache[chave]
+
+    def _imprimir_etiquetas_termicas(self, pedidos: list, formato: str, impressora: str, nome_arquivo: str):
+        """
+        Coloca as etiquetas ZPL/EPL na fila de impressão; os pedidos só passam a CONCLUÍDO
+        quando a impressora confirmar. Se não der para enfileirar, oferece o arquivo para download.
+        """
+        with secao("etiquetas_termicas"):
+            dados = gerar_etiquetas(pedidos, formato)
+        numeros = [pedido['Numero_Pedido'] for pedido in pedidos]
+        controller = self.controller
+        responsavel = f'Sistema ({formato} Impresso)'
+
+        def concluir_pedidos(trabalho):
+            # Chamado pela thread da fila de impressão
+            controller.atualizar_status_pedidos(dict.fromkeys(numeros, 'CONCLUÍDO'), responsavel)
+
+        try:
+            id_trabalho = PrintSpooler.get_instance().enviar_dados(dados, impressora, titulo=nome_arquivo,
+                                                                   ao_concluir=concluir_pedidos)
+        except OSError as e:
+            st.error(f"❌ Não foi possível enviar as etiquetas para a fila de impressão: {str(e)}")
+            st.download_button(f"Baixar {formato}", dados, file_name=f"{nome_arquivo}.{formato.lower()}",
+                               mime="text/plain", use_container_width=True)
+            return
+        st.session_state.setdefault('trabalhos_etiquetas', {})[id_trabalho] = f"{nome_arquivo}.{formato.lower()}"
+        st.success(f"✅ {len(pedidos)} etiqueta(s) na fila de impressão de {impressora} ({formato}); "
+                   f"os pedidos serão marcados como CONCLUÍDO quando a impressão terminar")
+
+    def _mostrar_trabalhos_etiquetas_com_erro(self):
+        """Etiquetas térmicas desta sessão que falharam de vez: pedidos não foram concluídos, arquivo para download"""
+        trabalhos = st.session_state.get('trabalhos_etiquetas', {})
+        if not trabalhos:
+            return
+        spooler = PrintSpooler.get_instance()
+        for id_trabalho, nome_arquivo in list(trabalhos.items()):
+            trabalho = spooler.status(id_trabalho)
+            if trabalho is None or trabalho['status'] == 'CONCLUIDO':
+                del trabalhos[id_trabalho]
+            elif trabalho['status'] == 'ERRO':
+                st.error(f"❌ As etiquetas {nome_arquivo} não foram impressas ({trabalho['erro']}); "
+                         f"os pedidos continuam sem CONCLUÍDO. Reenvie pela fila de impressão ou baixe o arquivo.")
+                try:
+                    with open(trabalho['arquivo'], 'rb') as f:
+                        st.download_button(f"Baixar {nome_arquivo}", f.read(), file_name=nome_arquivo,
+                                           mime="text/plain", key=f"baixar_{id_trabalho}")
+                except OSError:
+                    pass
 
     def mostrar_interface(self):
         """Mostra a interface do histórico de pedidos"""
@@ -271,39 +314,55 @@ class PedidoHistoricoView:
                     data_inicial = st.date_input("Data Inicial", value=None)
                 with col5:
                     data_final = st.date_input("Data Final", value=None)
-
-            # Carregar e filtrar dados
-            df_pedidos = self.controller.buscar_pedidos(
-                numero_pedido=filtro_numero if filtro_numero else None,
-                status=filtro_status if filtro_status != "TODOS" else None
-            )
-            # Aplicar filtro de máquina se não for 'TODAS'
-            if 'filtro_maquina' in locals() and filtro_maquina and filtro_maquina != 'TODAS':
-                df_pedidos = df_pedidos[df_pedidos['Maquina'] == filtro_maquina].copy()
-            
-            if df_pedidos.empty:
-                st.info("Nenhum pedido encontrado.")
-                return
-
-            # Criar uma cópia explícita do DataFrame antes de modificar
-            df_pedidos = df_pedidos.copy()
-            
-            # Converter coluna de data para datetime
-            df_pedidos.loc[:, 'Data'] = pd.to_datetime(df_pedidos['Data'], errors='coerce')
-
-            # Aplicar filtros de data se fornecidos
-            if data_inicial is not None:
-                df_pedidos = df_pedidos[df_pedidos['Data'].dt.date >= data_inicial].copy()
-            if data_final is not None:
-                df_pedidos = df_pedidos[df_pedidos['Data'].dt.date <= data_final].copy()
+            marco("filtros")
+
+            # Filtros aplicados no controlador/serviço; a tabela recebe só a página atual
+            filtros = {
+                'numero_pedido': filtro_numero or None,
+                'status': filtro_status if filtro_status != "TODOS" else None,
+                'maquina': filtro_maquina if filtro_maquina != "TODAS" else None,
+                'data_inicial': data_inicial,
+                'data_final': data_final,
+            }
 
             # Exibir a tabela com seleção
             with st.expander("📋 Lista de Pedidos", expanded=True):
-                total_pedidos = len(df_pedidos)
+                col_ordem, col_direcao, col_tamanho = st.columns([2, 2, 1])
+                with col_ordem:
+                    ordenar_por = st.selectbox("Ordenar por", list(self.ORDENACAO_HISTORICO),
+                                               format_func=self.ORDENACAO_HISTORICO.get)
+                with col_direcao:
+                    decrescente = st.radio("Ordem", ["Decrescente", "Crescente"], horizontal=True) == "Decrescente"
+                with col_tamanho:
+                    tamanho_pagina = st.selectbox("Por página", self.TAMANHOS_PAGINA, index=1)
+
+                # Volta para a primeira página quando a consulta muda
+                consulta = (tuple(filtros.items()), ordenar_por, decrescente, tamanho_pagina)
+                if st.session_state.get('historico_consulta') != consulta:
+                    st.session_state['historico_consulta'] = consulta
+                    st.session_state['historico_pagina'] = 1
+                pagina = st.session_state.get('historico_pagina', 1)
+
+                df_pagina, total_pedidos = self.controller.buscar_pedidos_pagina(
+                    pagina, tamanho_pagina, ordenar_por, decrescente, **filtros
+                )
+                total_paginas = max((total_pedidos + tamanho_pagina - 1) // tamanho_pagina, 1)
+                if pagina > total_paginas:
+                    # A consulta encolheu (ex.: pedidos concluídos por outra estação)
+                    pagina = st.session_state['historico_pagina'] = total_paginas
+                    df_pagina, total_pedidos = self.controller.buscar_pedidos_pagina(
+                        pagina, tamanho_pagina, ordenar_por, decrescente, **filtros
+                    )
+                marco("carregar_dados")
+
+                if total_pedidos == 0:
+                    st.info("Nenhum pedido encontrado.")
+                    return
+
                 st.write(f"Total de pedidos: {total_pedidos}")
-                
+
                 # Formatar DataFrame para exibição
-                df_display = df_pedidos[[
+                df_display = df_pagina[[
                     "Numero_Pedido", "Semiacabado", "Pagoda", "Posto", "Coordenada", "Maquina", "Data", "Serial", "Modelo", "Status"
                 ]].copy()
 
@@ -313,15 +372,14 @@ class PedidoHistoricoView:
                 ]
                 
                 # Formatar a coluna de data
-                df_display["Data"] = df_display["Data"].dt.strftime("%d/%m/%Y %H:%M")
+                df_display["Data"] = pd.to_datetime(df_display["Data"], errors='coerce').dt.strftime("%d/%m/%Y %H:%M")
 
                 # Adicionar coluna de seleção no início
                 df_display.insert(0, 'Selecionar', False)
 
-                # Salvar DataFrame original para comparação
-                df_display_original = df_display.copy()
-
-                edited_df = st.data_editor(
+                chave_editor = (f"historico_editor_{hash(consulta)}_{pagina}_"
+                                f"{st.session_state.get('historico_editor_versao', 0)}")
+                st.data_editor(
                     df_display,
                     hide_index=True,
                     use_container_width=True,
@@ -339,33 +397,32 @@ class PedidoHistoricoView:
                         )
                     },
                     disabled=["Número", "Data", "Serial", "Máquina", "Posto", "Coordenada", 
-                            "Modelo"]
+                            "Modelo"],
+                    # Edições não passam de uma página para outra
+                    key=chave_editor
                 )
 
-                # Detectar alterações de status
-                status_alterados = []
-                for idx, row in edited_df.iterrows():
-                    status_original = df_display_original.loc[idx, "Status"]
-                    status_novo = row["Status"]
-                    if status_original != status_novo:
-                        status_alterados.append({
-                            'numero_pedido': row['Número'],
-                            'novo_status': status_novo
-                        })
+                col_pagina, col_info = st.columns([1, 4])
+                with col_pagina:
+                    st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key='historico_pagina')
+                with col_info:
+                    inicio = (pagina - 1) * tamanho_pagina
+                    st.caption(f"Página {pagina} de {total_paginas} · pedidos {inicio + 1}–"
+                               f"{min(inicio + tamanho_pagina, total_pedidos)} de {total_pedidos}")
+
+                # Alterações de status a partir do delta do editor ({linha: {coluna: valor}})
+                status_alterados = self._status_alterados(df_display, st.session_state.get(chave_editor))
 
                 # Se houver alterações, exibir botão para salvar
                 if status_alterados:
                     if st.button("Salvar Alterações", type="primary"):
-                        for alteracao in status_alterados:
-                            try:
-                                self.controller.atualizar_status_pedido(
-                                    numero_pedido=alteracao['numero_pedido'],
-                                    novo_status=alteracao['novo_status'],
-                                    responsavel="Usuário do Sistema"
-                                )
-                            except Exception as e:
-                                st.error(f"Erro ao atualizar status do pedido {alteracao['numero_pedido']}: {str(e)}")
+                        erros = self.controller.atualizar_status_pedidos(status_alterados, "Usuário do Sistema")
+                        for numero_pedido, erro in erros.items():
+                            st.error(f"Erro ao atualizar status do pedido {numero_pedido}: {erro}")
+                        # Editor novo: o delta antigo não pode ser aplicado aos dados já atualizados
+                        st.session_state['historico_editor_versao'] = st.session_state.get('historico_editor_versao', 0) + 1
                         st.rerun()
+            marco("tabela")
 
             # Nova seção para Packlist
             st.markdown("### 📃 Gerar lista")
@@ -381,96 +438,78 @@ class PedidoHistoricoView:
             with col_periodo2:
                 periodo_fim = st.time_input("Hora Final", datetime.now().replace(hour=17, minute=0))
             
-            # Filtrar pedidos pelo período selecionado
-            df_periodo = df_pedidos.copy()
-            df_periodo['Hora'] = df_periodo['Data'].dt.time
-            df_periodo = df_periodo[
-                (df_periodo['Hora'] >= periodo_inicio) & 
-                (df_periodo['Hora'] <= periodo_fim)
-            ]
-
             with col_preview:
                 if st.button("👁️ Pré-visualizar", type="primary", use_container_width=True):
                     st.session_state.mostrar_preview = not st.session_state.mostrar_preview
 
             with col_download:
-                if not df_periodo.empty:
-                    # Preparar dados para o PDF
-                    pedidos_lista = []
-                    for _, row in df_periodo.iterrows():
-                        pedido = {
-                            'Numero_Pedido': row['Numero_Pedido'],
-                            'Data': row['Data'].strftime('%d/%m/%Y %H:%M'),
-                            'Maquina': row['Maquina'],
-                            'Posto': row['Posto'],
-                            'Coordenada': row['Coordenada'],
-                            'Pagoda': row['Pagoda'],
-                            'Semiacabado': row['Semiacabado']
-                        }
-                        pedidos_lista.append(pedido)
-                    
-                    # Gerar PDF
-                    pdf_bytes = self._gerar_packlist_pdf(pedidos_lista)
-                    
-                    # Botão de download igual ao pré-visualizar
-                    if st.button("🔖 Processar Lista", type="primary", use_container_width=True):
-                        b64 = base64.b64encode(pdf_bytes).decode()
-                        href = f'<a href="data:application/pdf;base64,{b64}" download="etiquetas_{periodo_inicio.strftime('%H%M')}_{periodo_fim.strftime('%H%M')}.pdf" style="display:block;text-align:center;padding:0.5rem 1rem;background-color:#1a2b3a;color:white;border-radius:0.5rem;text-decoration:none;font-weight:500;margin-top:0.5rem;">Gerar Etiquetas</a>'
-                        st.markdown(href, unsafe_allow_html=True)
-                        # Atualizar status silenciosamente após download
-                        for _, row in df_periodo.iterrows():
+                # Os pedidos do período só são carregados ao processar a lista
+                if st.button("🔖 Processar Lista", type="primary", use_container_width=True):
+                    df_periodo = self._pedidos_no_periodo(filtros, periodo_inicio, periodo_fim)
+                    if df_periodo.empty:
+                        st.warning("Nenhum pedido encontrado no período selecionado.")
+                    else:
+                        # As etiquetas só são geradas ao processar a lista
+                        pedidos_lista = self._pedidos_para_etiqueta(df_periodo)
+                        nome_arquivo = f"etiquetas_{periodo_inicio.strftime('%H%M')}_{periodo_fim.strftime('%H%M')}"
+                        formato = self._carregar_config().get('formato_etiqueta', 'PDF')
+                        impressora = self._carregar_impressora_padrao()
+                        if formato in FORMATOS_TERMICOS and impressora and impressora != 'PDF Virtual':
+                            # Impressora térmica: ZPL/EPL enviado direto, sem PDF; status atualizado ao imprimir
+                            self._imprimir_etiquetas_termicas(pedidos_lista, formato, impressora, nome_arquivo)
+                        else:
+                            # O PDF é reaproveitado para a mesma seleção
+                            with secao("pdf_etiquetas"):
+                                pdf_bytes = self._packlist_pdf_em_cache(pedidos_lista)
+                            b64 = base64.b64encode(pdf_bytes).decode()
+                            href = f'<a href="data:application/pdf;base64,{b64}" download="{nome_arquivo}.pdf" style="display:block;text-align:center;padding:0.5rem 1rem;background-color:#1a2b3a;color:white;border-radius:0.5rem;text-decoration:none;font-weight:500;margin-top:0.5rem;">Gerar Etiquetas</a>'
+                            st.markdown(href, unsafe_allow_html=True)
+                            # Atualizar status silenciosamente após download
                             try:
-                                self.controller.atualizar_status_pedido(
-                                    numero_pedido=row['Numero_Pedido'],
-                                    novo_status='CONCLUÍDO',
-                                    responsavel='Sistema (PDF Gerado)'
+                                self.controller.atualizar_status_pedidos(
+                                    dict.fromkeys(df_periodo['Numero_Pedido'], 'CONCLUÍDO'), 'Sistema (PDF Gerado)'
                                 )
                             except:
                                 pass
+                self._mostrar_trabalhos_etiquetas_com_erro()
 
             with col_export:
-                if not df_periodo.empty:
-                    if st.button("🧾 Exportar pedidos", type="secondary", use_container_width=True):
-                        # Buscar todos os pedidos PENDENTE
-                        df_pendentes = self.controller.buscar_pedidos(status="PENDENTE")
-                        if df_pendentes.empty:
-                            st.warning("Nenhum pedido PENDENTE encontrado.")
-                        else:
-                            # Converter coluna de data para datetime
-                            df_pendentes['Data'] = pd.to_datetime(df_pendentes['Data'], errors='coerce')
-                            # Filtrar pelo horário selecionado
-                            df_pendentes['Hora'] = df_pendentes['Data'].dt.time
-                            df_pendentes_periodo = df_pendentes[
-                                (df_pendentes['Hora'] >= periodo_inicio) &
-                                (df_pendentes['Hora'] <= periodo_fim)
-                            ]
-                            if df_pendentes_periodo.empty:
-                                st.warning("Nenhum pedido PENDENTE encontrado no horário selecionado.")
-                            else:
-                                # Gerar PDF visual mostrando status como PROCESSO
-                                df_pdf = df_pendentes_periodo.copy()
-                                df_pdf['Status'] = 'PROCESSO'
-                                pdf_bytes = self._gerar_pdf_visual_pedidos(df_pdf)
-                                b64 = base64.b64encode(pdf_bytes).decode()
-                                href = f'<a href="data:application/pdf;base64,{b64}" download="pedidos_pendentes_{periodo_inicio.strftime('%H%M')}_{periodo_fim.strftime('%H%M')}.pdf" style="display:block;text-align:center;padding:0.5rem 1rem;background-color:#1a2b3a;color:white;border-radius:0.5rem;text-decoration:none;font-weight:500;margin-top:0.5rem;">Gerar Lista</a>'
-                                st.markdown(href, unsafe_allow_html=True)
-                                # Atualizar status para CONCLUÍDO após exportar
-                                for _, row in df_pendentes_periodo.iterrows():
-                                    try:
-                                        self.controller.atualizar_status_pedido(
-                                            numero_pedido=row['Numero_Pedido'],
-                                            novo_status='CONCLUÍDO',
-                                            responsavel='Sistema (PDF Exportado)'
-                                        )
-                                    except Exception as e:
-                                        st.warning(f"Erro ao atualizar status do pedido {row['Numero_Pedido']}: {str(e)}")
-
-            # Mostrar total de pedidos encontrados
-            if not df_periodo.empty:
-                st.caption(f"Pedidos encontrados no período: {len(df_periodo)}")
+                if st.button("🧾 Exportar pedidos", type="secondary", use_container_width=True):
+                    # Pedidos PENDENTE no horário selecionado
+                    df_pendentes_periodo = self.controller.buscar_pedidos(
+                        status="PENDENTE", hora_inicial=periodo_inicio, hora_final=periodo_fim
+                    )
+                    if df_pendentes_periodo.empty and self.controller.buscar_pedidos(status="PENDENTE").empty:
+                        st.warning("Nenhum pedido PENDENTE encontrado.")
+                    elif df_pendentes_periodo.empty:
+                        st.warning("Nenhum pedido PENDENTE encontrado no horário selecionado.")
+                    else:
+                        # Gerar PDF visual mostrando status como PROCESSO
+                        df_pdf = df_pendentes_periodo.assign(Status='PROCESSO')
+                        with secao("pdf_pedidos"):
+                            pdf_bytes = self._gerar_pdf_visual_pedidos(df_pdf)
+                        b64 = base64.b64encode(pdf_bytes).decode()
+                        nome_arquivo = f"pedidos_pendentes_{periodo_inicio.strftime('%H%M')}_{periodo_fim.strftime('%H%M')}.pdf"
+                        href = f'<a href="data:application/pdf;base64,{b64}" download="{nome_arquivo}" style="display:block;text-align:center;padding:0.5rem 1rem;background-color:#1a2b3a;color:white;border-radius:0.5rem;text-decoration:none;font-weight:500;margin-top:0.5rem;">Gerar Lista</a>'
+                        st.markdown(href, unsafe_allow_html=True)
+                        # Atualizar status para CONCLUÍDO após exportar
+                        try:
+                            erros = self.controller.atualizar_status_pedidos(
+                                dict.fromkeys(df_pendentes_periodo['Numero_Pedido'], 'CONCLUÍDO'),
+                                'Sistema (PDF Exportado)'
+                            )
+                        except Exception as e:
+                            st.warning(f"Erro ao atualizar status dos pedidos exportados: {str(e)}")
+                            erros = {}
+                        for numero_pedido, erro in erros.items():
+                            st.warning(f"Erro ao atualizar status do pedido {numero_pedido}: {erro}")
+
+            marco("lista_periodo")
 
             # Mostrar ou ocultar a pré-visualização baseado no estado
             if st.session_state.mostrar_preview:
+                df_periodo = self._pedidos_no_periodo(filtros, periodo_inicio, periodo_fim)
+                st.caption(f"Pedidos encontrados no período: {len(df_periodo)}")
                 if not df_periodo.empty:
                     st.markdown("##### Pré-visualização das Etiquetas")
                     st.caption(f"Mostrando {len(df_periodo)} etiquetas do período selecionado. O tamanho real será 60x30mm.")
@@ -495,6 +534,7 @@ class PedidoHistoricoView:
                                     }
                                     preview_html = self._gerar_preview_etiqueta(pedido_dict)
                                     st.markdown(preview_html, unsafe_allow_html=True)
+                    marco("preview")
 
         except Exception as e:
             st.error(f"Erro ao carregar pedidos: {str(e)}")
@@ -620,25 +660,4 @@ Status: {pedido['status']}
 
     def _gerar_pdf_visual_pedidos(self, df_pedidos):
         """Gera um PDF visual com todos os pedidos recebidos (PENDENTE/PROCESSO)"""
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, "Pedidos Recebidos (PENDENTE/PROCESSO)", ln=True, align="C")
-        pdf.ln(5)
-        for idx, row in df_pedidos.iterrows():
-            pdf.set_font("Arial", size=11)
-            pdf.cell(0, 8, f"Número: {row['Numero_Pedido']}  |  Semiacabado: {row['Semiacabado']}  |  Pagoda: {row['Pagoda']}", ln=True)
-            pdf.set_font("Arial", size=10)
-            pdf.cell(0, 7, f"Posto: {row['Posto']}  |  Coordenada: {row['Coordenada']}  |  Máquina: {row['Maquina']}", ln=True)
-            pdf.cell(0, 7, f"Data: {row['Data']}  |  Serial: {row['Serial']}  |  Modelo: {row['Modelo']}", ln=True)
-            pdf.cell(0, 7, f"Status: {row['Status']}", ln=True)
-            pdf.ln(4)
-            pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-            pdf.ln(2)
-        output = pdf.output(dest='S')
-        if isinstance(output, str):
-            pdf_bytes = output.encode('latin1')
-        else:
-            pdf_bytes = bytes(output)
-        return pdf_bytes
\ No newline at end of file
+        return gerar_relatorio_pedidos_pdf(df_pedidos.to_dict('records'))